@@ -8,7 +8,6 @@ setup_requires = [
 ]
 install_requires = [
     'aiohttp~=3.8.0',
-    'aiotusclient~=0.1.4',
     'appdirs~=1.4.4',
     'async_timeout>=4.0',
     'attrs>=20.3',
@@ -35,8 +34,10 @@ test_requires = [
     'pytest-cov',
     'pytest-mock',
     'pytest-asyncio>=0.18.2',
+    'pytest-benchmark>=3.4.1',
     'aioresponses>=0.7.3',
     'codecov',
+    'ujson>=4.0',
 ]
 lint_requires = [
     'flake8>=4.0.1',
@@ -48,6 +49,12 @@ typecheck_requires = [
     'types-python-dateutil',
     'types-tabulate',
 ]
+fastjson_requires = [
+    'orjson>=3.6.0',
+]
+zstd_requires = [
+    'zstandard>=0.15.0',
+]
 dev_requires: List[str] = [
     # 'pytest-sugar>=0.9.1',
 ]
@@ -110,6 +117,8 @@ setup(
         'lint': lint_requires,
         'typecheck': typecheck_requires,
         'docs': docs_requires,
+        'fastjson': fastjson_requires,
+        'zstd': zstd_requires,
     },
     data_files=[],
     package_data={
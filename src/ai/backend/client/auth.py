@@ -1,9 +1,13 @@
+import collections
 from datetime import datetime
 import enum
+import functools
 import hashlib
 import hmac
+import threading
 from typing import (
     Mapping,
+    OrderedDict,
     Tuple,
 )
 
@@ -28,6 +32,44 @@ class AuthToken:
     content = attr.ib(default=None)                 # type: str
 
 
+_SIGNING_KEY_CACHE_SIZE = 128
+
+# (secret key digest, date, hostname, hash type) -> derived signing key
+_signing_key_cache: OrderedDict[Tuple[bytes, str, str, str], bytes] = collections.OrderedDict()
+_signing_key_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_empty_body_hash(hash_type: str) -> str:
+    return hashlib.new(hash_type, b'').hexdigest()
+
+
+def _derive_signing_key(secret_key: str, date: str, hostname: str, hash_type: str) -> bytes:
+    """
+    Returns the signing key derived from the secret key, the date, and the hostname.
+    As it changes only per day and per host, the recently used keys are kept in
+    a small LRU cache indexed by a digest of the secret key instead of the key itself.
+    """
+    cache_key = (
+        hashlib.sha256(secret_key.encode()).digest(),
+        date,
+        hostname,
+        hash_type,
+    )
+    with _signing_key_cache_lock:
+        sign_key = _signing_key_cache.get(cache_key)
+        if sign_key is not None:
+            _signing_key_cache.move_to_end(cache_key)
+            return sign_key
+    sign_key = hmac.new(secret_key.encode(), date.encode(), hash_type).digest()
+    sign_key = hmac.new(sign_key, hostname.encode(), hash_type).digest()
+    with _signing_key_cache_lock:
+        _signing_key_cache[cache_key] = sign_key
+        while len(_signing_key_cache) > _SIGNING_KEY_CACHE_SIZE:
+            _signing_key_cache.popitem(last=False)
+    return sign_key
+
+
 def generate_signature(
     *,
     method: str,
@@ -43,9 +85,8 @@ def generate_signature(
     '''
     Generates the API request signature from the given parameters.
     '''
-    hash_type = hash_type
     hostname = endpoint._val.netloc  # type: ignore
-    body_hash = hashlib.new(hash_type, b'').hexdigest()
+    body_hash = _get_empty_body_hash(hash_type)
 
     sign_str = '{}\n{}\n{}\nhost:{}\ncontent-type:{}\nx-backendai-version:{}\n{}'.format(  # noqa
         method.upper(),
@@ -58,9 +99,7 @@ def generate_signature(
     )
     sign_bytes = sign_str.encode()
 
-    sign_key = hmac.new(secret_key.encode(),
-                        date.strftime('%Y%m%d').encode(), hash_type).digest()
-    sign_key = hmac.new(sign_key, hostname.encode(), hash_type).digest()
+    sign_key = _derive_signing_key(secret_key, date.strftime('%Y%m%d'), hostname, hash_type)
 
     signature = hmac.new(sign_key, sign_bytes, hash_type).hexdigest()
     headers = {
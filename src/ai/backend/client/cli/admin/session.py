@@ -13,6 +13,7 @@ import click
 from ai.backend.client.session import Session
 from ai.backend.client.output.fields import session_fields, session_fields_v5
 from ai.backend.client.output.types import FieldSpec
+from ai.backend.client.graphql import build_query
 from . import admin
 from ..main import main
 from ..pretty import print_fail
@@ -240,7 +241,7 @@ def _info_cmd(docs: str = None):
                 print_fail("In API v5 or later, the session ID must be given in the UUID format.")
                 sys.exit(1)
             v = {'id': session_id}
-            q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+            q = build_query(q, fields)
             try:
                 resp = session_.Admin.query(q, v)
             except Exception as e:
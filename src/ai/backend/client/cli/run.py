@@ -5,6 +5,7 @@ import getpass
 import itertools
 import json
 import secrets
+import shlex
 import string
 import sys
 import traceback
@@ -291,6 +292,14 @@ def prepare_mount_arg(
 @click.option('--basedir', metavar='PATH', type=click.Path(), default=None,
               help='Base directory path of uploaded files. '
                    'All uploaded files must reside inside this directory.')
+@click.option('--upload-archive', type=click.Choice(['tar', 'gzip', 'zstd']), default=None,
+              help='Upload the files as a single tar archive (optionally compressed) '
+                   'generated on the fly and extract it in the session before cleaning. '
+                   'It is much faster for many small files.')
+@click.option('--stage-files', 'staging_vfolder', metavar='VFOLDER', default=None,
+              help='Upload the files only once into the staging area of the given virtual folder '
+                   'and copy them into each session mounting it, instead of uploading them '
+                   'to every session.  Only the files not staged yet are uploaded.')
 # execution environment
 @click.option('-e', '--env', metavar='KEY=VAL', type=str, multiple=True,
               help='Environment variable (may appear multiple times)')
@@ -357,6 +366,7 @@ def run(image, files, name,                                 # base args
         callback_url,
         code, terminal,                                     # query-mode options
         clean, build, exec, basedir,                        # batch-mode options
+        upload_archive, staging_vfolder,
         env,                                                # execution environment
         bootstrap_script, rm, stats, tag, quiet,            # extra options
         env_range, build_range, exec_range, max_parallel,   # experiment support
@@ -389,11 +399,22 @@ def run(image, files, name,                                 # base args
         print('You should provide the command-line code snippet using '
               '"-c" option if run without files.', file=sys.stderr)
         sys.exit(1)
+    if upload_archive and staging_vfolder:
+        print('You can use only either "--upload-archive" or "--stage-files".', file=sys.stderr)
+        sys.exit(1)
 
     envs = prepare_env_arg(env)
     resources = prepare_resource_arg(resources)
     resource_opts = prepare_resource_arg(resource_opts)
     mount, mount_map = prepare_mount_arg(mount)
+    # The command to copy the staged files in the sessions.
+    staged_copy_cmd = None
+    if staging_vfolder and files:
+        if staging_vfolder not in mount:
+            mount.append(staging_vfolder)
+        staging_mount_path = mount_map.get(staging_vfolder, staging_vfolder)
+        if not staging_mount_path.startswith('/'):
+            staging_mount_path = f'/home/work/{staging_mount_path}'
 
     if env_range is None: env_range = []      # noqa
     if build_range is None: build_range = []  # noqa
@@ -450,6 +471,22 @@ def run(image, files, name,                                 # base args
                 print('env = {!r}, build = {!r}, exec = {!r}'
                       .format(pretty_env, case[1], case[2]))
 
+    def _get_prepare_opts(compute_session):
+        # Extract the uploaded archive or copy the staged files as a separate batch step
+        # before the clean step, since the heuristic clean ("*") cannot be chained
+        # with other commands.
+        if staged_copy_cmd is not None:
+            prepare_cmd = staged_copy_cmd
+        elif upload_archive:
+            prepare_cmd = compute_session.get_upload_archive_extract_command(upload_archive)
+        else:
+            return None
+        return {
+            'clean': prepare_cmd,
+            'build': '',
+            'exec': '',
+        }
+
     def _run_legacy(session, idx, name, envs,
                     clean_cmd, build_cmd, exec_cmd):
         try:
@@ -508,13 +545,18 @@ def run(image, files, name,                                 # base args
             if files:
                 vprint_wait('[{0}] Uploading source files...'.format(idx))
                 ret = compute_session.upload(files, basedir=basedir,
-                                    show_progress=True)
+                                    show_progress=True, archive=upload_archive)
                 if ret.status // 100 != 2:
                     print_fail('[{0}] Uploading source files failed!'.format(idx))
                     print('{0}: {1}\n{2}'.format(
                         ret.status, ret.reason, ret.text()))
                     return
                 vprint_done('[{0}] Uploading done.'.format(idx))
+                prepare_opts = _get_prepare_opts(compute_session)
+                if prepare_opts is not None:
+                    exec_loop_sync(sys.stdout, sys.stderr, compute_session, 'batch', '',
+                                   opts=prepare_opts,
+                                   vprint_done=vprint_done)
                 opts = {
                     'clean': clean_cmd,
                     'build': build_cmd,
@@ -623,17 +665,25 @@ def run(image, files, name,                                 # base args
             def indexed_vprint_done(msg):
                 vprint_done('[{0}] '.format(idx) + msg)
             if files:
-                if not is_multi:
-                    vprint_wait('[{0}] Uploading source files...'.format(idx))
-                ret = await compute_session.upload(files, basedir=basedir,
-                                          show_progress=not is_multi)
-                if ret.status // 100 != 2:
-                    print_fail('[{0}] Uploading source files failed!'.format(idx))
-                    print('{0}: {1}\n{2}'.format(
-                        ret.status, ret.reason, ret.text()), file=stderr)
-                    raise RuntimeError('Uploading source files has failed!')
-                if not is_multi:
-                    vprint_done('[{0}] Uploading done.'.format(idx))
+                if staged_copy_cmd is None:
+                    if not is_multi:
+                        vprint_wait('[{0}] Uploading source files...'.format(idx))
+                    ret = await compute_session.upload(files, basedir=basedir,
+                                              show_progress=not is_multi,
+                                              archive=upload_archive)
+                    if ret.status // 100 != 2:
+                        print_fail('[{0}] Uploading source files failed!'.format(idx))
+                        print('{0}: {1}\n{2}'.format(
+                            ret.status, ret.reason, ret.text()), file=stderr)
+                        raise RuntimeError('Uploading source files has failed!')
+                    if not is_multi:
+                        vprint_done('[{0}] Uploading done.'.format(idx))
+                prepare_opts = _get_prepare_opts(compute_session)
+                if prepare_opts is not None:
+                    await exec_loop(stdout, stderr, compute_session, 'batch', '',
+                                    opts=prepare_opts,
+                                    vprint_done=indexed_vprint_done,
+                                    is_multi=is_multi)
                 opts = {
                     'clean': clean_cmd,
                     'build': build_cmd,
@@ -688,6 +738,7 @@ def run(image, files, name,                                 # base args
                     stderr.close()
 
     async def _run_cases():
+        nonlocal staged_copy_cmd
         loop = current_loop()
         if name is None:
             name_prefix = f'pysdk-{secrets.token_hex(5)}'
@@ -698,6 +749,15 @@ def run(image, files, name,                                 # base args
             print_info('Check out the stdout/stderr logs stored in '
                        '~/.cache/backend.ai/client-logs directory.')
         async with AsyncSession() as session:
+            if staging_vfolder and files:
+                vprint_wait('Staging source files in the virtual folder "{0}"...'
+                            .format(staging_vfolder))
+                script_path = await session.VFolder(staging_vfolder).stage_files(
+                    files, basedir=basedir, show_progress=not quiet,
+                )
+                staged_copy_cmd = 'sh {0}'.format(
+                    shlex.quote(f'{staging_mount_path}/{script_path}'))
+                vprint_done('Staging done.')
             tasks = []
             # TODO: limit max-parallelism using aiojobs
             for idx, case in enumerate(case_set.keys()):
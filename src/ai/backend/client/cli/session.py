@@ -572,7 +572,10 @@ def upload(session_id, files):
 @click.argument('files', nargs=-1)
 @click.option('--dest', type=Path, default='.',
               help='Destination path to store downloaded file(s)')
-def download(session_id, files, dest):
+@click.option('--no-streaming', is_flag=True,
+              help='Extract the received archive after saving it as a temporary file, '
+                   'instead of extracting it while receiving it.')
+def download(session_id, files, dest, no_streaming):
     """
     Download files from a compute session's home directory.
     If the source path is in a storage folder mount, the operation is
@@ -594,7 +597,7 @@ def download(session_id, files, dest):
             print_wait('Downloading file(s) from {}...'
                        .format(session_id))
             kernel = session.ComputeSession(session_id)
-            kernel.download(files, dest, show_progress=True)
+            kernel.download(files, dest, show_progress=True, streaming=not no_streaming)
             print_done('Downloaded to {}.'.format(dest.resolve()))
         except Exception as e:
             print_error(e)
@@ -14,6 +14,7 @@ from ai.backend.client.session import Session
 
 from ..compat import asyncio_run
 from ..session import AsyncSession
+from ..transfer import SyncDirection, TransferOrder
 from .main import main
 from .pretty import print_done, print_error, print_fail, print_info, print_wait, print_warn
 from .params import ByteSizeParamType, ByteSizeParamCheckType, CommaSeparatedKVListParamType
@@ -186,7 +187,23 @@ def info(name):
                    'The value must shape like "X1=Y1,X2=Y2...". '
                    'Each Yn address must at least include the IP address '
                    'or the hostname and may include the protocol part and the port number to replace.')
-def upload(name, filenames, base_dir, chunk_size, override_storage_proxy):
+@click.option('--max-retries', type=int, default=5,
+              help='Retry the interrupted transfer of each file up to the given times in a row.')
+@click.option('--segments', type=click.IntRange(min=1), default=1,
+              help='Split large files into up to the given number of parts '
+                   'and upload them concurrently if the storage proxy supports it.')
+@click.option('--checksum', is_flag=True,
+              help='Let the storage proxy verify the checksum of each chunk if it supports it.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              help='The number of files transferred at the same time.')
+@click.option('--max-bandwidth', type=ByteSizeParamType(), default=None,
+              help='Limit the total transfer rate in bytes per second '
+                   'with binary suffixes (e.g., "100m").')
+@click.option('--order', type=click.Choice([o.value for o in TransferOrder]),
+              default=TransferOrder.AS_GIVEN.value,
+              help='The order to transfer the files.')
+def upload(name, filenames, base_dir, chunk_size, override_storage_proxy,
+           max_retries, segments, checksum, jobs, max_bandwidth, order):
     '''
     TUS Upload a file to the virtual folder from the current working directory.
     The files with the same names will be overwirtten.
@@ -203,6 +220,12 @@ def upload(name, filenames, base_dir, chunk_size, override_storage_proxy):
                 chunk_size=chunk_size,
                 show_progress=True,
                 address_map=override_storage_proxy or APIConfig.DEFAULTS['storage_proxy_address_map'],
+                max_retries=max_retries,
+                segments=segments,
+                checksum=checksum,
+                jobs=jobs,
+                max_bytes_per_sec=max_bandwidth,
+                order=TransferOrder(order),
             )
             print_done('Done.')
         except Exception as e:
@@ -227,10 +250,26 @@ def upload(name, filenames, base_dir, chunk_size, override_storage_proxy):
                    'The value must shape like "X1=Y1,X2=Y2...". '
                    'Each Yn address must at least include the IP address '
                    'or the hostname and may include the protocol part and the port number to replace.')
-def download(name, filenames, base_dir, chunk_size, override_storage_proxy):
+@click.option('--max-retries', type=int, default=5,
+              help='Retry the interrupted transfer of each file up to the given times in a row.')
+@click.option('--segments', type=click.IntRange(min=1), default=1,
+              help='Split large files into up to the given number of byte ranges '
+                   'and download them concurrently over multiple connections.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              help='The number of files transferred at the same time.')
+@click.option('--max-bandwidth', type=ByteSizeParamType(), default=None,
+              help='Limit the total transfer rate in bytes per second '
+                   'with binary suffixes (e.g., "100m").')
+@click.option('--order', type=click.Choice([o.value for o in TransferOrder]),
+              default=TransferOrder.AS_GIVEN.value,
+              help='The order to transfer the files.')
+def download(name, filenames, base_dir, chunk_size, override_storage_proxy, max_retries, segments,
+             jobs, max_bandwidth, order):
     '''
     Download a file from the virtual folder to the current working directory.
     The files with the same names will be overwirtten.
+    If the download of a file is interrupted, running the same command again
+    continues it from the partially downloaded file ("<filename>.partial").
 
     \b
     NAME: Name of a virtual folder.
@@ -244,6 +283,11 @@ def download(name, filenames, base_dir, chunk_size, override_storage_proxy):
                 chunk_size=chunk_size,
                 show_progress=True,
                 address_map=override_storage_proxy or APIConfig.DEFAULTS['storage_proxy_address_map'],
+                max_retries=max_retries,
+                segments=segments,
+                jobs=jobs,
+                max_bytes_per_sec=max_bandwidth,
+                order=TransferOrder(order),
             )
             print_done('Done.')
         except Exception as e:
@@ -251,6 +295,79 @@ def download(name, filenames, base_dir, chunk_size, override_storage_proxy):
             sys.exit(1)
 
 
+@vfolder.command(context_settings={'show_default': True})  # bug: pallets/click#1565 (fixed in 8.0)
+@click.argument('local_dir', type=Path)
+@click.argument('target', type=str, metavar='NAME[:PATH]')
+@click.option('--direction', type=click.Choice([d.value for d in SyncDirection]),
+              default=SyncDirection.UPLOAD.value,
+              help='Upload the local changes to the virtual folder or download the remote changes.')
+@click.option('--checksum', is_flag=True,
+              help='Also compare the SHA-256 digests of the local files touched since the last sync '
+                   'to skip the ones whose contents are not changed.')
+@click.option('--dry-run', is_flag=True,
+              help='Only show the files to be transferred without transferring them.')
+@click.option('--chunk-size', type=ByteSizeParamType(),
+              default=humanize.naturalsize(DEFAULT_CHUNK_SIZE, binary=True, gnu=True),
+              help='Transfer the file with the given chunk size with binary suffixes (e.g., "16m").')
+@click.option('--override-storage-proxy',
+              type=CommaSeparatedKVListParamType(), default=None,
+              help='Overrides storage proxy address. '
+                   'The value must shape like "X1=Y1,X2=Y2...". '
+                   'Each Yn address must at least include the IP address '
+                   'or the hostname and may include the protocol part and the port number to replace.')
+@click.option('--max-retries', type=int, default=5,
+              help='Retry the interrupted transfer of each file up to the given times in a row.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              help='The number of files transferred at the same time.')
+@click.option('--max-bandwidth', type=ByteSizeParamType(), default=None,
+              help='Limit the total transfer rate in bytes per second '
+                   'with binary suffixes (e.g., "100m").')
+@click.option('--order', type=click.Choice([o.value for o in TransferOrder]),
+              default=TransferOrder.AS_GIVEN.value,
+              help='The order to transfer the files.')
+def sync(local_dir, target, direction, checksum, dry_run, chunk_size, override_storage_proxy,
+         max_retries, jobs, max_bandwidth, order):
+    '''
+    Synchronize a local directory and a directory in the virtual folder
+    by transferring only the new and changed files.
+    The files are compared by their sizes and modification times, and the states of
+    the synchronized files are cached locally to skip the unchanged ones quickly.
+    No files are deleted in either side.
+
+    \b
+    LOCAL_DIR: Path of the local directory.
+    NAME[:PATH]: Name of a virtual folder and optionally the path of the directory inside it.
+    '''
+    name, _, path = target.partition(':')
+    with Session() as session:
+        try:
+            result = session.VFolder(name).sync(
+                local_dir,
+                path or '.',
+                direction=SyncDirection(direction),
+                checksum=checksum,
+                dry_run=dry_run,
+                chunk_size=chunk_size,
+                show_progress=True,
+                address_map=override_storage_proxy or APIConfig.DEFAULTS['storage_proxy_address_map'],
+                max_retries=max_retries,
+                jobs=jobs,
+                max_bytes_per_sec=max_bandwidth,
+                order=TransferOrder(order),
+            )
+            if dry_run:
+                for relpath in result['transferred']:
+                    print(relpath)
+                print_info('{} file(s) to transfer, {} file(s) unchanged.'.format(
+                    len(result['transferred']), len(result['skipped'])))
+            else:
+                print_done('Done. {} file(s) transferred, {} file(s) unchanged.'.format(
+                    len(result['transferred']), len(result['skipped'])))
+        except Exception as e:
+            print_error(e)
+            sys.exit(1)
+
+
 @vfolder.command()
 @click.argument('name', type=str)
 @click.argument('filename', type=Path)
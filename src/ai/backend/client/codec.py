@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+import json
+from pathlib import Path
+from typing import Any, Mapping, Type, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+try:
+    import ujson
+except ImportError:
+    ujson = None  # type: ignore
+
+__all__ = (
+    'ExtendedJSONEncoder',
+    'JSONCodec',
+    'StdlibJSONCodec',
+    'OrjsonCodec',
+    'UjsonCodec',
+)
+
+
+def _encode_extended(obj: Any) -> Any:
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
+def _convert_key(key: Any) -> str:
+    # Follows the conversion of the non-string keys by the json module.
+    if isinstance(key, str):
+        return str.__str__(key)
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, int):
+        return int.__repr__(key)
+    if isinstance(key, float):
+        return json.dumps(float(key))
+    raise TypeError(f'keys must be str, int, float, bool or None, not {key.__class__.__name__}')
+
+
+def _convert_extended(obj: Any) -> Any:
+    # Converts the objects into the plain JSON types in advance for the libraries which
+    # serialize some types natively in a different way from the json module, such as
+    # ujson encoding Decimal as floats and orjson rejecting namedtuples while encoding
+    # UUID and datetime, so that all codecs produce the same documents.
+    if obj is None or obj is True or obj is False:
+        return obj
+    if isinstance(obj, str):
+        return str.__str__(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, dict):
+        return {_convert_key(k): _convert_extended(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_convert_extended(v) for v in obj]
+    return _encode_extended(obj)
+
+
+class ExtendedJSONEncoder(json.JSONEncoder):
+
+    def default(self, obj: Any) -> Any:
+        if isinstance(obj, (Path, Decimal)):
+            return _encode_extended(obj)
+        return super().default(obj)
+
+
+class JSONCodec(metaclass=ABCMeta):
+    """
+    Encodes the request bodies and decodes the response bodies in JSON.
+
+    All codecs serialize :class:`~pathlib.Path` and :class:`~decimal.Decimal`
+    values as strings like :class:`ExtendedJSONEncoder`, and accept the same types
+    as it does, raising :exc:`TypeError` for the others.
+    """
+
+    name: str
+
+    @staticmethod
+    def load(name: str) -> JSONCodec:
+        """
+        Returns the codec of the given name.  ``"auto"`` chooses the fastest one
+        among the installed JSON libraries.
+        """
+        name = name.strip()
+        if name == 'auto':
+            for native_cls in (OrjsonCodec, UjsonCodec):
+                if native_cls.is_available():
+                    return native_cls()
+            return StdlibJSONCodec()
+        try:
+            cls = _cls_map[name]
+        except KeyError:
+            raise ValueError(
+                f'Unknown JSON codec "{name}" '
+                f'(available: auto, {", ".join(_cls_map.keys())})',
+            )
+        if not cls.is_available():
+            raise ValueError(f'The JSON codec "{name}" requires the "{name}" package to be installed.')
+        return cls()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Encodes the given object into a UTF-8 encoded JSON document.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes], *, ordered: bool = False) -> Any:
+        """
+        Decodes the given JSON document.
+        If *ordered* is set, the objects are decoded as :class:`~collections.OrderedDict`
+        instead of plain dicts.
+        """
+        raise NotImplementedError
+
+
+class StdlibJSONCodec(JSONCodec):
+    """
+    Uses the :mod:`json` module in the standard library.
+    """
+
+    name = 'stdlib'
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, cls=ExtendedJSONEncoder).encode('utf-8')
+
+    def loads(self, data: Union[str, bytes], *, ordered: bool = False) -> Any:
+        if ordered:
+            return json.loads(data, object_pairs_hook=OrderedDict)
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Uses `orjson <https://github.com/ijl/orjson>`_.
+    Since it cannot decode into ordered dicts, the ordered decoding falls back
+    to the standard library.
+    """
+
+    name = 'orjson'
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return orjson is not None
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(_convert_extended(obj))
+
+    def loads(self, data: Union[str, bytes], *, ordered: bool = False) -> Any:
+        if ordered:
+            return json.loads(data, object_pairs_hook=OrderedDict)
+        return orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """
+    Uses `ujson <https://github.com/ultrajson/ultrajson>`_.
+    Since it cannot decode into ordered dicts, the ordered decoding falls back
+    to the standard library.
+    """
+
+    name = 'ujson'
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return ujson is not None
+
+    def dumps(self, obj: Any) -> bytes:
+        return ujson.dumps(_convert_extended(obj), ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data: Union[str, bytes], *, ordered: bool = False) -> Any:
+        if ordered:
+            return json.loads(data, object_pairs_hook=OrderedDict)
+        return ujson.loads(data)
+
+
+_cls_map: Mapping[str, Type[JSONCodec]] = {
+    'stdlib': StdlibJSONCodec,
+    'orjson': OrjsonCodec,
+    'ujson': UjsonCodec,
+}
@@ -20,6 +20,9 @@ from typing import (
 import appdirs
 from yarl import URL
 
+from .codec import JSONCodec
+from .load_balancing import EndpointCircuitBreaker, LoadBalancer
+
 __all__ = [
     'parse_api_version',
     'get_config',
@@ -143,6 +146,20 @@ def _clean_address_map(v: Union[str, Mapping]) -> Mapping:
     return override_map
 
 
+def _clean_load_balancer(v: Union[LoadBalancer, str]) -> Optional[LoadBalancer]:
+    if isinstance(v, LoadBalancer):
+        return v
+    if not v:
+        return None
+    return LoadBalancer.load(LoadBalancer.clean_config(v))
+
+
+def _clean_json_codec(v: Union[JSONCodec, str]) -> JSONCodec:
+    if isinstance(v, JSONCodec):
+        return v
+    return JSONCodec.load(v)
+
+
 class APIConfig:
     """
     Represents a set of API client configurations.
@@ -178,6 +195,54 @@ class APIConfig:
         access key) to be automatically mounted upon any
         :func:`Kernel.get_or_create()
         <ai.backend.client.kernel.Kernel.get_or_create>` calls.
+    :param load_balancer: The client-side load balancing policy used when multiple
+        endpoints are configured.  It may be either a
+        :class:`~ai.backend.client.load_balancing.LoadBalancer` instance or
+        a string in the form of ``"name:arg1,arg2,..."`` such as ``"simple_rr"``,
+        ``"periodic_rr:30"`` (rotate every 30 seconds), or ``"lowest_latency"``
+        (``"lowest_latency:100,0.3,p99"`` to route on the 99th percentile of the last
+        100 latency samples).
+        The load balancer reorders the endpoints after every request and is also fed
+        with the per-endpoint latency and failure statistics.
+        If not set, the endpoints are rotated only upon connection failures.
+    :param endpoint_failure_threshold: The number of consecutive connection failures
+        to temporarily eject an endpoint from the rotation when multiple endpoints
+        are configured.  Setting it to zero disables the ejection.
+    :param endpoint_ejection_period: The initial duration in seconds to keep a failing
+        endpoint ejected.  The duration doubles upon repeated failures and the ejected
+        endpoints are probed in the background by the sessions to reinstate them
+        once they are healthy.
+    :param api_version_cache_ttl: The duration in seconds to reuse the negotiated server
+        API version cached in the local cache directory per endpoint, without making
+        the version negotiation request when opening new sessions.
+        Setting it to zero disables the cache.
+    :param connection_pool_size: The maximum number of simultaneous connections
+        kept in the connection pool shared by all requests of a session.
+        Zero means no limit.
+    :param connection_pool_size_per_host: The maximum number of simultaneous connections
+        to the same host (including the storage proxies).  Zero means no limit.
+    :param keepalive_timeout: The duration in seconds to keep idle connections alive
+        for reuse by subsequent requests.
+    :param dns_cache_ttl: The duration in seconds to cache resolved host addresses.
+        Zero disables the DNS cache.
+    :param stream_prefetch_depth: The maximum number of items that streaming API functions
+        may produce ahead of the consumer when called via
+        :class:`~ai.backend.client.session.Session`.
+    :param json_codec: The JSON library used to encode the request bodies and decode
+        the response bodies.  It may be either a :class:`~ai.backend.client.codec.JSONCodec`
+        instance or one of ``"auto"`` (the default), ``"orjson"``, ``"ujson"``, and ``"stdlib"``.
+        ``"auto"`` uses orjson or ujson if installed and falls back to the standard library.
+    :param json_ordered_dict: Decode the JSON objects in the responses as
+        :class:`~collections.OrderedDict` (the default) instead of plain dicts.
+        Turning it off makes decoding large responses much faster with the native
+        JSON libraries.  It may be overridden per call of the ``json()`` method of responses.
+    :param gql_persisted_queries: Send only the hashes of the GraphQL query documents
+        as the persisted query IDs and the full documents only when the server asks them.
+        Enable it only when the manager (or the gateway in front of it) supports
+        the automatic persisted queries.
+    :param gql_batch_window: The duration in seconds to wait for more GraphQL queries
+        issued concurrently in a session to merge them into a single request.
+        Zero (the default) disables the batching.
     """
 
     DEFAULTS: Mapping[str, Union[str, Mapping]] = {
@@ -190,6 +255,19 @@ class APIConfig:
         'storage_proxy_address_map': {},
         'connection_timeout': '10.0',
         'read_timeout': '0',
+        'load_balancer': '',
+        'endpoint_failure_threshold': '3',
+        'endpoint_ejection_period': '30.0',
+        'api_version_cache_ttl': '3600.0',
+        'connection_pool_size': '100',
+        'connection_pool_size_per_host': '0',
+        'keepalive_timeout': '15.0',
+        'dns_cache_ttl': '10',
+        'stream_prefetch_depth': '8',
+        'json_codec': 'auto',
+        'json_ordered_dict': 'yes',
+        'gql_persisted_queries': 'no',
+        'gql_batch_window': '0',
     }
     """
     The default values for config parameterse settable via environment variables
@@ -198,6 +276,8 @@ class APIConfig:
 
     _endpoints: List[URL]
     _group: str
+    _load_balancer: Optional[LoadBalancer]
+    _circuit_breaker: Optional[EndpointCircuitBreaker]
     _hash_type: str
     _skip_sslcert_validation: bool
 
@@ -218,6 +298,19 @@ class APIConfig:
         connection_timeout: float = None,
         read_timeout: float = None,
         announcement_handler: Callable[[str], None] = None,
+        load_balancer: Union[LoadBalancer, str] = None,
+        endpoint_failure_threshold: int = None,
+        endpoint_ejection_period: float = None,
+        api_version_cache_ttl: float = None,
+        connection_pool_size: int = None,
+        connection_pool_size_per_host: int = None,
+        keepalive_timeout: float = None,
+        dns_cache_ttl: int = None,
+        stream_prefetch_depth: int = None,
+        json_codec: Union[JSONCodec, str] = None,
+        json_ordered_dict: bool = None,
+        gql_persisted_queries: bool = None,
+        gql_batch_window: float = None,
     ) -> None:
         from . import get_user_agent
         self._endpoints = (
@@ -267,6 +360,44 @@ class APIConfig:
         self._read_timeout = read_timeout if read_timeout is not None else \
             get_env('READ_TIMEOUT', self.DEFAULTS['read_timeout'], clean=float)
         self._announcement_handler = announcement_handler
+        self._load_balancer = _clean_load_balancer(load_balancer) if load_balancer is not None else \
+            get_env('LOAD_BALANCER', self.DEFAULTS['load_balancer'], clean=_clean_load_balancer)
+        failure_threshold = endpoint_failure_threshold if endpoint_failure_threshold is not None else \
+            get_env('ENDPOINT_FAILURE_THRESHOLD', self.DEFAULTS['endpoint_failure_threshold'], clean=int)
+        ejection_period = endpoint_ejection_period if endpoint_ejection_period is not None else \
+            get_env('ENDPOINT_EJECTION_PERIOD', self.DEFAULTS['endpoint_ejection_period'], clean=float)
+        if failure_threshold > 0:
+            self._circuit_breaker = EndpointCircuitBreaker(
+                failure_threshold=failure_threshold,
+                ejection_period=ejection_period,
+            )
+        else:
+            self._circuit_breaker = None
+        self._api_version_cache_ttl = api_version_cache_ttl if api_version_cache_ttl is not None else \
+            get_env('API_VERSION_CACHE_TTL', self.DEFAULTS['api_version_cache_ttl'], clean=float)
+        self._connection_pool_size = connection_pool_size if connection_pool_size is not None else \
+            get_env('CONNECTION_POOL_SIZE', self.DEFAULTS['connection_pool_size'], clean=int)
+        self._connection_pool_size_per_host = connection_pool_size_per_host \
+            if connection_pool_size_per_host is not None else \
+            get_env(
+                'CONNECTION_POOL_SIZE_PER_HOST',
+                self.DEFAULTS['connection_pool_size_per_host'],
+                clean=int,
+            )
+        self._keepalive_timeout = keepalive_timeout if keepalive_timeout is not None else \
+            get_env('KEEPALIVE_TIMEOUT', self.DEFAULTS['keepalive_timeout'], clean=float)
+        self._dns_cache_ttl = dns_cache_ttl if dns_cache_ttl is not None else \
+            get_env('DNS_CACHE_TTL', self.DEFAULTS['dns_cache_ttl'], clean=int)
+        self._stream_prefetch_depth = stream_prefetch_depth if stream_prefetch_depth is not None else \
+            get_env('STREAM_PREFETCH_DEPTH', self.DEFAULTS['stream_prefetch_depth'], clean=int)
+        self._json_codec = _clean_json_codec(json_codec) if json_codec is not None else \
+            get_env('JSON_CODEC', self.DEFAULTS['json_codec'], clean=_clean_json_codec)
+        self._json_ordered_dict = json_ordered_dict if json_ordered_dict is not None else \
+            get_env('JSON_ORDERED_DICT', self.DEFAULTS['json_ordered_dict'], clean=bool_env)
+        self._gql_persisted_queries = gql_persisted_queries if gql_persisted_queries is not None else \
+            get_env('GQL_PERSISTED_QUERIES', self.DEFAULTS['gql_persisted_queries'], clean=bool_env)
+        self._gql_batch_window = gql_batch_window if gql_batch_window is not None else \
+            get_env('GQL_BATCH_WINDOW', self.DEFAULTS['gql_batch_window'], clean=float)
 
     @property
     def is_anonymous(self) -> bool:
@@ -290,9 +421,58 @@ class APIConfig:
         if len(self._endpoints) > 1:
             item = self._endpoints.pop(0)
             self._endpoints.append(item)
+            self._demote_ejected_endpoints()
 
     def load_balance_endpoints(self):
-        pass
+        if len(self._endpoints) > 1:
+            if self._load_balancer is not None:
+                self._load_balancer.rotate(self._endpoints)
+            self._demote_ejected_endpoints()
+
+    def _demote_ejected_endpoints(self) -> None:
+        # Move the ejected endpoints to the back while keeping the order of the others.
+        # If all endpoints are ejected, we just keep trying them in the current order.
+        if self._circuit_breaker is None:
+            return
+        available = []
+        ejected = []
+        for endpoint in self._endpoints:
+            if self._circuit_breaker.is_ejected(endpoint):
+                ejected.append(endpoint)
+            else:
+                available.append(endpoint)
+        if ejected and available:
+            self._endpoints[:] = available + ejected
+
+    def record_endpoint_latency(self, endpoint: URL, latency: float) -> None:
+        """
+        Reports the time taken to get the response headers from the given endpoint
+        to the configured load balancer.
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_success(endpoint)
+        if self._load_balancer is not None:
+            self._load_balancer.record_latency(endpoint, latency)
+
+    def record_endpoint_failure(self, endpoint: URL) -> None:
+        """
+        Reports a connection failure of the given endpoint to the configured load balancer
+        and the endpoint circuit breaker.
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure(endpoint)
+        if self._load_balancer is not None:
+            self._load_balancer.record_failure(endpoint)
+
+    @property
+    def circuit_breaker(self) -> Optional[EndpointCircuitBreaker]:
+        """The circuit breaker that tracks the health of the configured endpoints."""
+        return self._circuit_breaker
+
+    @property
+    def load_balancer(self) -> Optional[LoadBalancer]:
+        """The configured client-side load balancer for multiple endpoints."""
+        return self._load_balancer
 
     @property
     def endpoint_type(self) -> str:
@@ -361,6 +541,56 @@ class APIConfig:
         """The maximum allowed waiting time for the first byte of the response from the server."""
         return self._read_timeout
 
+    @property
+    def api_version_cache_ttl(self) -> float:
+        """The duration to reuse the locally cached server API version."""
+        return self._api_version_cache_ttl
+
+    @property
+    def connection_pool_size(self) -> int:
+        """The maximum number of simultaneous connections of a session."""
+        return self._connection_pool_size
+
+    @property
+    def connection_pool_size_per_host(self) -> int:
+        """The maximum number of simultaneous connections to the same host."""
+        return self._connection_pool_size_per_host
+
+    @property
+    def keepalive_timeout(self) -> float:
+        """The duration to keep idle connections alive."""
+        return self._keepalive_timeout
+
+    @property
+    def dns_cache_ttl(self) -> int:
+        """The duration to cache resolved host addresses."""
+        return self._dns_cache_ttl
+
+    @property
+    def stream_prefetch_depth(self) -> int:
+        """The maximum number of items prefetched by streaming API functions in sync sessions."""
+        return self._stream_prefetch_depth
+
+    @property
+    def json_codec(self) -> JSONCodec:
+        """The JSON codec to encode the request bodies and decode the response bodies."""
+        return self._json_codec
+
+    @property
+    def json_ordered_dict(self) -> bool:
+        """Whether to decode the JSON objects in the responses as ordered dicts by default."""
+        return self._json_ordered_dict
+
+    @property
+    def gql_persisted_queries(self) -> bool:
+        """Whether to send the GraphQL queries as the persisted query IDs."""
+        return self._gql_persisted_queries
+
+    @property
+    def gql_batch_window(self) -> float:
+        """The duration in seconds to collect the concurrent GraphQL queries into a batch."""
+        return self._gql_batch_window
+
     @property
     def announcement_handler(self) -> Optional[Callable[[str], None]]:
         '''The announcement handler to display server-set announcements.'''
@@ -1,7 +1,8 @@
-from typing import Any, Mapping, Optional
+from typing import Any, Mapping, Optional, Sequence
 
 from .base import api_function, BaseFunction
 from ..exceptions import BackendAPIError
+from ..graphql import get_query_hash
 from ..request import Request
 from ..session import api_session
 
@@ -9,6 +10,15 @@ __all__ = (
     'Admin',
 )
 
+# The errors returned by the servers supporting the automatic persisted queries
+# when they do not know the query hash or do not support persisted queries.
+_persisted_query_miss_codes = frozenset({
+    'PersistedQueryNotFound',
+    'PERSISTED_QUERY_NOT_FOUND',
+    'PersistedQueryNotSupported',
+    'PERSISTED_QUERY_NOT_SUPPORTED',
+})
+
 
 class Admin(BaseFunction):
     """
@@ -50,26 +60,69 @@ class Admin(BaseFunction):
         Internal async implementation of the query() method,
         which may be reused by other functional APIs to make GQL requests.
         """
-        gql_query = {
-            'query': query,
-            'variables': variables if variables else {},
-        }
-        if api_session.get().api_version >= (6, '20210815'):
-            rqst = Request('POST', '/admin/gql')
-            rqst.set_json(gql_query)
-            async with rqst.fetch() as resp:
-                response = await resp.json()
-                errors = response.get("errors", [])
-                if errors:
-                    raise BackendAPIError(400, reason="Bad request", data={
-                        'type': 'https://api.backend.ai/probs/graphql-error',
-                        'title': 'GraphQL-generated error',
-                        'data': errors,
-                    })
-                else:
-                    return response["data"]
+        session = api_session.get()
+        if session.api_version >= (6, '20210815'):
+            variables = variables if variables else {}
+            if session.gql_batcher is not None:
+                response = await session.gql_batcher.execute(query, variables)
+            else:
+                response = await cls._execute_gql(query, variables)
+            errors = response.get("errors", [])
+            if errors:
+                raise BackendAPIError(400, reason="Bad request", data={
+                    'type': 'https://api.backend.ai/probs/graphql-error',
+                    'title': 'GraphQL-generated error',
+                    'data': errors,
+                })
+            else:
+                return response["data"]
         else:
+            gql_query = {
+                'query': query,
+                'variables': variables if variables else {},
+            }
             rqst = Request('POST', '/admin/graphql')
             rqst.set_json(gql_query)
             async with rqst.fetch() as resp:
                 return await resp.json()
+
+    @classmethod
+    async def _execute_gql(cls, query: str, variables: Mapping[str, Any]) -> Any:
+        """
+        Sends the GraphQL query and returns the response body including the errors.
+        """
+        if api_session.get().config.gql_persisted_queries:
+            extensions = {
+                'persistedQuery': {'version': 1, 'sha256Hash': get_query_hash(query)},
+            }
+            response = await cls._post_gql({
+                'variables': variables,
+                'extensions': extensions,
+            })
+            if _is_persisted_query_miss(response.get("errors", [])):
+                # Register the full document upon the first use of the query.
+                response = await cls._post_gql({
+                    'query': query,
+                    'variables': variables,
+                    'extensions': extensions,
+                })
+            return response
+        return await cls._post_gql({
+            'query': query,
+            'variables': variables,
+        })
+
+    @classmethod
+    async def _post_gql(cls, gql_query: Mapping[str, Any]) -> Any:
+        rqst = Request('POST', '/admin/gql')
+        rqst.set_json(gql_query)
+        async with rqst.fetch() as resp:
+            return await resp.json()
+
+
+def _is_persisted_query_miss(errors: Sequence[Mapping[str, Any]]) -> bool:
+    for error in errors:
+        code = (error.get('extensions') or {}).get('code')
+        if code in _persisted_query_miss_codes or error.get('message') in _persisted_query_miss_codes:
+            return True
+    return False
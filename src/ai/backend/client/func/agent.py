@@ -13,6 +13,7 @@ from ai.backend.client.output.fields import agent_fields
 from ai.backend.client.request import Request
 from ai.backend.client.session import api_session
 from ai.backend.client.pagination import generate_paginated_results
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 
 __all__ = (
@@ -66,6 +67,8 @@ class Agent(BaseFunction):
         page_size: int = 20,
         filter: str = None,
         order: str = None,
+        keyset: bool = False,
+        cursor: str = None,
     ) -> PaginatedResult:
         """
         Lists the keypairs.
@@ -82,6 +85,8 @@ class Agent(BaseFunction):
             fields,
             page_size=page_size,
             page_offset=page_offset,
+            keyset=keyset,
+            cursor=cursor,
         )
 
     @api_function
@@ -96,7 +101,7 @@ class Agent(BaseFunction):
                 agent(agent_id: $agent_id) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'agent_id': agent_id}
         data = await api_session.get().Admin._query(query, variables)
         return data['agent']
@@ -1,7 +1,7 @@
 import functools
 import inspect
 
-from ..session import api_session, AsyncSession
+from ..session import api_batch, api_session, AsyncSession
 
 __all__ = (
     'APIFunctionMeta',
@@ -28,9 +28,14 @@ def _wrap_method(cls, orig_name, meth):
             return coro
         else:
             if inspect.isasyncgen(coro):
-                return _api_session.worker_thread.execute_generator(coro)
-            else:
-                return _api_session.worker_thread.execute(coro)
+                return _api_session.worker_thread.execute_generator(
+                    coro,
+                    prefetch=_api_session.config.stream_prefetch_depth,
+                )
+            _api_batch = api_batch.get()
+            if _api_batch is not None:
+                return _api_batch.add(coro)
+            return _api_session.worker_thread.execute(coro)
 
     return _method
 
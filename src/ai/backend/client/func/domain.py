@@ -3,6 +3,7 @@ from typing import Iterable, Sequence
 
 from ai.backend.client.output.fields import domain_fields
 from ai.backend.client.output.types import FieldSpec
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 from ..session import api_session
 
@@ -61,7 +62,7 @@ class Domain(BaseFunction):
                 domains {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         data = await api_session.get().Admin._query(query)
         return data['domains']
 
@@ -83,7 +84,7 @@ class Domain(BaseFunction):
                 domain(name: $name) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'name': name}
         data = await api_session.get().Admin._query(query, variables)
         return data['domain']
@@ -109,7 +110,7 @@ class Domain(BaseFunction):
                 }
             }
         """)
-        query = query.replace('$fields', ' '.join(fields))
+        query = build_query(query, fields)
         variables = {
             'name': name,
             'input': {
@@ -3,6 +3,7 @@ from typing import Iterable, Sequence
 
 from ai.backend.client.output.fields import group_fields
 from ai.backend.client.output.types import FieldSpec
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 from ..session import api_session
 
@@ -66,7 +67,7 @@ class Group(BaseFunction):
                 groups_by_name(name: $name, domain_name: $domain_name) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(fields))
+        query = build_query(query, fields)
         variables = {
             'name': name,
             'domain_name': domain_name,
@@ -94,7 +95,7 @@ class Group(BaseFunction):
                 groups(domain_name: $domain_name) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'domain_name': domain_name}
         data = await api_session.get().Admin._query(query, variables)
         return data['groups']
@@ -119,7 +120,7 @@ class Group(BaseFunction):
                 group(id: $gid) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'gid': gid}
         data = await api_session.get().Admin._query(query, variables)
         return data['group']
@@ -144,7 +145,7 @@ class Group(BaseFunction):
                 }
             }
         """)
-        query = query.replace('$fields', ' '.join(fields))
+        query = build_query(query, fields)
         variables = {
             'name': name,
             'input': {
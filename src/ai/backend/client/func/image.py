@@ -2,6 +2,7 @@ from typing import Optional, Sequence
 
 from ai.backend.client.output.fields import image_fields
 from ai.backend.client.output.types import FieldSpec
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 from ..request import Request
 from ..session import api_session
@@ -43,7 +44,7 @@ class Image(BaseFunction):
             '    $fields' \
             '  }' \
             '}'
-        q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+        q = build_query(q, fields)
         variables = {
             'is_operation': operation,
         }
@@ -9,6 +9,7 @@ from ai.backend.client.pagination import generate_paginated_results
 from ai.backend.client.session import api_session
 from ai.backend.client.output.fields import keypair_fields
 from ai.backend.client.output.types import FieldSpec, PaginatedResult
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 
 __all__ = (
@@ -67,7 +68,7 @@ class KeyPair(BaseFunction):
             '    ok msg keypair { $fields }' \
             '  }' \
             '}'
-        q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+        q = build_query(q, fields)
         variables = {
             'user_id': user_id,
             'input': {
@@ -153,7 +154,7 @@ class KeyPair(BaseFunction):
                 '    $fields' \
                 '  }' \
                 '}'
-        q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+        q = build_query(q, fields)
         variables: Dict[str, Any] = {
             'is_active': is_active,
         }
@@ -175,6 +176,8 @@ class KeyPair(BaseFunction):
         page_size: int = 20,
         filter: str = None,
         order: str = None,
+        keyset: bool = False,
+        cursor: str = None,
     ) -> PaginatedResult[dict]:
         """
         Lists the keypairs.
@@ -194,6 +197,8 @@ class KeyPair(BaseFunction):
             fields,
             page_offset=page_offset,
             page_size=page_size,
+            keyset=keyset,
+            cursor=cursor,
         )
 
     @api_function
@@ -210,7 +215,7 @@ class KeyPair(BaseFunction):
             '    $fields' \
             '  }' \
             '}'
-        q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+        q = build_query(q, fields)
         data = await api_session.get().Admin._query(q)
         return data['keypair']
 
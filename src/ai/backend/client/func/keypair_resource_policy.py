@@ -2,6 +2,7 @@ from typing import Iterable, Sequence
 
 from ai.backend.client.output.fields import keypair_resource_policy_fields
 from ai.backend.client.output.types import FieldSpec
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 from ..session import api_session
 
@@ -66,7 +67,7 @@ class KeypairResourcePolicy(BaseFunction):
             '    ok msg resource_policy { $fields }' \
             '  }' \
             '}'
-        q = q.replace('$fields', ' '.join(fields))
+        q = build_query(q, fields)
         variables = {
             'name': name,
             'input': {
@@ -154,7 +155,7 @@ class KeypairResourcePolicy(BaseFunction):
             '    $fields' \
             '  }' \
             '}'
-        q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+        q = build_query(q, fields)
         data = await api_session.get().Admin._query(q)
         return data['keypair_resource_policies']
 
@@ -176,7 +177,7 @@ class KeypairResourcePolicy(BaseFunction):
             '    $fields' \
             '  }' \
             '}'
-        q = q.replace('$fields', ' '.join(f.field_ref for f in fields))
+        q = build_query(q, fields)
         variables = {
             'name': name,
         }
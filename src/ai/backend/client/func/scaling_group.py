@@ -4,6 +4,7 @@ from typing import Iterable, Mapping, Sequence
 
 from ai.backend.client.output.fields import scaling_group_fields
 from ai.backend.client.output.types import FieldSpec
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 from ..request import Request
 from ..session import api_session
@@ -78,7 +79,7 @@ class ScalingGroup(BaseFunction):
                 }
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'is_active': None}
         data = await api_session.get().Admin._query(query, variables)
         return data['scaling_groups']
@@ -101,7 +102,7 @@ class ScalingGroup(BaseFunction):
                 scaling_group(name: $name) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'name': name}
         data = await api_session.get().Admin._query(query, variables)
         return data['scaling_group']
@@ -124,7 +125,7 @@ class ScalingGroup(BaseFunction):
                 }
             }
         """)
-        query = query.replace('$fields', ' '.join(fields))
+        query = build_query(query, fields)
         variables = {
             'name': name,
             'input': {
@@ -157,7 +158,7 @@ class ScalingGroup(BaseFunction):
                 }
             }
         """)
-        query = query.replace('$fields', ' '.join(fields))
+        query = build_query(query, fields)
         variables = {
             'name': name,
             'input': {
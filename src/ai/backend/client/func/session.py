@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import gzip
+import io
 import json
 import os
 from pathlib import Path
 import secrets
 import tarfile
 import tempfile
+import threading
 from typing import (
     Any,
     AsyncIterator,
@@ -16,6 +20,7 @@ from typing import (
     Mapping,
     Optional,
     Sequence,
+    Tuple,
     Union,
     cast,
 )
@@ -23,13 +28,19 @@ from uuid import UUID
 
 import aiohttp
 from aiohttp import hdrs
+import janus
 from tqdm import tqdm
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
 from ai.backend.client.output.fields import session_fields
 from ai.backend.client.output.types import FieldSpec, PaginatedResult
 from .base import api_function, BaseFunction
 from ..compat import current_loop
-from ..config import DEFAULT_CHUNK_SIZE
+from ..config import DEFAULT_CHUNK_SIZE, MAX_INFLIGHT_CHUNKS
 from ..exceptions import BackendClientError
 from ..pagination import generate_paginated_results
 from ..request import (
@@ -68,6 +79,162 @@ def drop(d: Mapping[str, Any], value_to_drop: Any) -> Mapping[str, Any]:
     return modified
 
 
+# The file name suffixes and the extraction commands of the upload archives.
+_upload_archive_formats: Mapping[str, Tuple[str, str]] = {
+    'tar': ('.tar', 'tar -xf'),
+    'gzip': ('.tar.gz', 'tar -xzf'),
+    'zstd': ('.tar.zst', 'tar --zstd -xf'),
+}
+_upload_archive_name = '.backend.ai-upload'
+
+
+class _UploadAborted(Exception):
+    pass
+
+
+class _QueueWriter(io.RawIOBase):
+    """
+    A binary stream putting the written chunks into a synchronous queue.
+    The writes are aborted when *stop_event* is set.
+    """
+
+    def __init__(self, q: janus.SyncQueue[bytes], stop_event: threading.Event) -> None:
+        super().__init__()
+        self._q = q
+        self._stop_event = stop_event
+        # Set when the stream is abandoned to discard the remaining buffered data.
+        self.discard = False
+
+    def writable(self) -> bool:
+        return True
+
+    def put(self, chunk: bytes) -> None:
+        while True:
+            if self._stop_event.is_set():
+                raise _UploadAborted
+            try:
+                self._q.put(chunk, timeout=0.1)
+                return
+            except janus.SyncQueueFull:
+                continue
+
+    def write(self, buffer: Any) -> int:
+        chunk = bytes(buffer)
+        if chunk and not self.discard:
+            self.put(chunk)
+        return len(chunk)
+
+
+def _write_tar_stream(
+    q: janus.SyncQueue[bytes],
+    files: Sequence[Tuple[Path, str]],
+    archive: str,
+    pbar: tqdm,
+    stop_event: threading.Event,
+) -> None:
+    """
+    Writes a tar archive of the given files with their archive names into the queue,
+    compressing it if requested, and finally puts an empty chunk.
+    """
+    writer = _QueueWriter(q, stop_event)
+    buffered = io.BufferedWriter(writer, buffer_size=256 * 1024)
+    stream: Any
+    if archive == 'gzip':
+        stream = gzip.GzipFile(fileobj=buffered, mode='wb', compresslevel=6)
+    elif archive == 'zstd':
+        stream = zstandard.ZstdCompressor().stream_writer(buffered, closefd=False)
+    else:
+        stream = buffered
+    try:
+        with tarfile.open(fileobj=stream, mode='w|') as tarf:
+            for file_path, arcname in files:
+                tarinfo = tarf.gettarinfo(str(file_path), arcname)
+                if tarinfo.isreg():
+                    with ProgressReportingReader(str(file_path), tqdm_instance=pbar) as f:
+                        tarf.addfile(tarinfo, f)
+                else:
+                    tarf.addfile(tarinfo)
+        if stream is not buffered:
+            stream.close()
+        buffered.flush()
+        writer.put(b'')
+    except _UploadAborted:
+        writer.discard = True
+    except BaseException:
+        writer.discard = True
+        # Let the sender stop waiting for more chunks.
+        try:
+            writer.put(b'')
+        except _UploadAborted:
+            pass
+        raise
+
+
+class _QueueReader(io.RawIOBase):
+    """
+    A binary stream reading the chunks from a synchronous queue
+    until an empty chunk is received.
+    """
+
+    def __init__(self, q: janus.SyncQueue[bytes]) -> None:
+        super().__init__()
+        self._q = q
+        self._buffer = memoryview(b'')
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._buffer:
+            if self.eof:
+                return 0
+            chunk = self._q.get()
+            self._q.task_done()
+            if not chunk:
+                self.eof = True
+                return 0
+            self._buffer = memoryview(chunk)
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def drain(self) -> None:
+        """
+        Discards the remaining chunks until the end of the stream.
+        """
+        while not self.eof:
+            chunk = self._q.get()
+            self._q.task_done()
+            if not chunk:
+                self.eof = True
+
+
+def _extract_tar_stream(
+    q: janus.SyncQueue[bytes],
+    dest: Union[str, Path],
+    stop_event: threading.Event,
+) -> List[str]:
+    """
+    Extracts the tar archive streamed through the queue as the chunks arrive,
+    and returns the names of the extracted members.
+    """
+    reader = _QueueReader(q)
+    try:
+        with tarfile.open(fileobj=io.BufferedReader(reader), mode='r|*') as tarf:
+            tarf.extractall(path=dest)
+            return tarf.getnames()
+    except BaseException:
+        # Let the producer stop sending the chunks.
+        stop_event.set()
+        raise
+    finally:
+        # Consume the rest of the stream (e.g., the trailing padding blocks)
+        # so that the producer is never blocked by the full queue.
+        reader.drain()
+
+
 class ComputeSession(BaseFunction):
     """
     Provides various interactions with compute sessions in Backend.AI.
@@ -104,12 +271,18 @@ class ComputeSession(BaseFunction):
         page_size: int = 20,
         filter: str = None,
         order: str = None,
+        keyset: bool = False,
+        cursor: str = None,
     ) -> PaginatedResult[dict]:
         """
         Fetches the list of users. Domain admins can only get domain users.
 
         :param is_active: Fetches active or inactive users only if not None.
         :param fields: Additional per-user query fields to fetch.
+        :param keyset: Fetches the page by the sort keys in *order* instead of the offset,
+                       which costs the same for any depth of pages.
+        :param cursor: The ``next_cursor`` of the previous page to continue the keyset
+                       pagination.
         """
         return await generate_paginated_results(
             'compute_session_list',
@@ -122,6 +295,8 @@ class ComputeSession(BaseFunction):
             fields,
             page_offset=page_offset,
             page_size=page_size,
+            keyset=keyset,
+            cursor=cursor,
         )
 
     @api_function
@@ -729,7 +904,8 @@ class ComputeSession(BaseFunction):
     @api_function
     async def upload(self, files: Sequence[Union[str, Path]],
                      basedir: Union[str, Path] = None,
-                     show_progress: bool = False):
+                     show_progress: bool = False,
+                     archive: str = None):
         """
         Uploads the given list of files to the compute session.
         You may refer them in the batch-mode execution or from the code
@@ -747,6 +923,14 @@ class ComputeSession(BaseFunction):
         :param basedir: The directory prefix where the files reside.
             The default value is the current working directory.
         :param show_progress: Displays a progress bar during uploads.
+        :param archive: If set to one of ``"tar"``, ``"gzip"`` and ``"zstd"``,
+            the files are sent as a single tar archive (compressed with the given
+            method) generated on the fly, instead of sending each file separately.
+            The archive is stored in the working directory of the compute session,
+            and it should be extracted there using the command returned by
+            :meth:`get_upload_archive_extract_command`.
+            ``"zstd"`` requires the ``zstandard`` package in the client-side and
+            the ``zstd`` command in the compute session.
         """
         params = {}
         if self.owner_access_key:
@@ -756,41 +940,95 @@ class ComputeSession(BaseFunction):
             Path.cwd() if basedir is None
             else Path(basedir).resolve()
         )
-        files = [Path(file).resolve() for file in files]
+        if archive is not None:
+            if archive not in _upload_archive_formats:
+                raise ValueError(f'Unsupported upload archive format: {archive}')
+            if archive == 'zstd' and zstandard is None:
+                raise ValueError('The zstd compression requires the "zstandard" package.')
+        file_paths = [Path(file).resolve() for file in files]
         total_size = 0
-        for file_path in files:
-            total_size += Path(file_path).stat().st_size
+        for file_path in file_paths:
+            total_size += file_path.stat().st_size
+        arcnames = []
+        for file_path in file_paths:
+            try:
+                arcnames.append(str(file_path.relative_to(base_path)))
+            except ValueError:
+                msg = 'File "{0}" is outside of the base directory "{1}".' \
+                      .format(file_path, base_path)
+                raise ValueError(msg) from None
         tqdm_obj = tqdm(desc='Uploading files',
                         unit='bytes', unit_scale=True,
                         total=total_size,
                         disable=not show_progress)
         with tqdm_obj:
-            attachments = []
-            for file_path in files:
-                try:
-                    attachments.append(AttachedFile(
-                        str(Path(file_path).relative_to(base_path)),
-                        ProgressReportingReader(str(file_path),
-                                                tqdm_instance=tqdm_obj),
-                        'application/octet-stream',
-                    ))
-                except ValueError:
-                    msg = 'File "{0}" is outside of the base directory "{1}".' \
-                          .format(file_path, base_path)
-                    raise ValueError(msg) from None
-
             rqst = Request(
                 'POST', f'/{prefix}/{self.name}/upload',
                 params=params,
             )
-            rqst.attach_files(attachments)
-            async with rqst.fetch() as resp:
-                return resp
+            if archive is None:
+                rqst.attach_files([
+                    AttachedFile(
+                        arcname,
+                        ProgressReportingReader(str(file_path),
+                                                tqdm_instance=tqdm_obj),
+                        'application/octet-stream',
+                    )
+                    for file_path, arcname in zip(file_paths, arcnames)
+                ])
+                async with rqst.fetch() as resp:
+                    return resp
+
+            # Generate the archive in a worker thread while sending it.
+            q: janus.Queue[bytes] = janus.Queue(MAX_INFLIGHT_CHUNKS)
+            stop_event = threading.Event()
+            archive_fut = current_loop().run_in_executor(
+                None, _write_tar_stream,
+                q.sync_q, [*zip(file_paths, arcnames)], archive, tqdm_obj, stop_event,
+            )
+
+            async def _stream_archive() -> AsyncIterator[bytes]:
+                while True:
+                    chunk = await q.async_q.get()
+                    q.async_q.task_done()
+                    if not chunk:
+                        break
+                    yield chunk
+                # Fail the request if the archive is incomplete.
+                await archive_fut
+
+            rqst.attach_files([AttachedFile(
+                _upload_archive_name + _upload_archive_formats[archive][0],
+                _stream_archive(),
+                'application/octet-stream',
+            )])
+            try:
+                async with rqst.fetch() as resp:
+                    pass
+            finally:
+                stop_event.set()
+                await asyncio.wait([archive_fut])
+                q.close()
+                await q.wait_closed()
+            # Raise the error of the worker thread if any.
+            archive_fut.result()
+            return resp
+
+    @staticmethod
+    def get_upload_archive_extract_command(archive: str) -> str:
+        """
+        Returns the shell command to extract and remove the archive uploaded by
+        :meth:`upload` with the given *archive* format in the working directory.
+        """
+        suffix, extract_cmd = _upload_archive_formats[archive]
+        archive_name = _upload_archive_name + suffix
+        return f'{extract_cmd} {archive_name} && rm -f {archive_name}'
 
     @api_function
     async def download(self, files: Sequence[Union[str, Path]],
                        dest: Union[str, Path] = '.',
-                       show_progress: bool = False):
+                       show_progress: bool = False,
+                       streaming: bool = True):
         """
         Downloads the given list of files from the compute session.
 
@@ -799,6 +1037,9 @@ class ComputeSession(BaseFunction):
             ``/home/work`` in the compute session container.
         :param dest: The destination directory in the client-side.
         :param show_progress: Displays a progress bar during downloads.
+        :param streaming: Extracts the archives in a worker thread as they are
+            being received.  If false, each archive is extracted after it is
+            completely saved as a temporary file.
         """
         params = {}
         if self.owner_access_key:
@@ -828,6 +1069,36 @@ class ComputeSession(BaseFunction):
                     assert part.headers.get(hdrs.CONTENT_TRANSFER_ENCODING, 'binary').lower() in (
                         'binary', '8bit', '7bit',
                     )
+                    if streaming:
+                        q: janus.Queue[bytes] = janus.Queue(MAX_INFLIGHT_CHUNKS)
+                        stop_event = threading.Event()
+                        try:
+                            extract_fut = loop.run_in_executor(
+                                None, _extract_tar_stream, q.sync_q, dest, stop_event,
+                            )
+                            try:
+                                while not stop_event.is_set():
+                                    chunk = await part.read_chunk(DEFAULT_CHUNK_SIZE)
+                                    if not chunk:
+                                        break
+                                    await q.async_q.put(chunk)
+                                    pbar.update(len(chunk))
+                            except BaseException as e:
+                                # The extractor fails with the truncated archive, but
+                                # the transfer error is the one to be reported.
+                                await q.async_q.put(b'')
+                                try:
+                                    await extract_fut
+                                except Exception as extract_error:
+                                    raise e from extract_error
+                                raise
+                            await q.async_q.put(b'')
+                            names = await extract_fut
+                        finally:
+                            q.close()
+                            await q.wait_closed()
+                        file_names.extend(names)
+                        continue
                     fp = tempfile.NamedTemporaryFile(suffix='.tar',
                                                      delete=False)
                     while True:
@@ -7,6 +7,7 @@ from ai.backend.client.session import api_session
 from ai.backend.client.output.fields import storage_fields
 from ai.backend.client.output.types import FieldSpec, PaginatedResult
 from ai.backend.client.pagination import generate_paginated_results
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 
 __all__ = (
@@ -80,7 +81,7 @@ class Storage(BaseFunction):
                 storage_volume(id: $vfolder_host) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'vfolder_host': vfolder_host}
         data = await api_session.get().Admin._query(query, variables)
         return data['storage_volume']
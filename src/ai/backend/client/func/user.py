@@ -15,6 +15,7 @@ from ai.backend.client.session import api_session
 from ai.backend.client.output.fields import user_fields
 from ai.backend.client.output.types import FieldSpec, PaginatedResult
 from ai.backend.client.pagination import generate_paginated_results
+from ai.backend.client.graphql import build_query
 from .base import api_function, BaseFunction
 
 __all__ = (
@@ -121,7 +122,7 @@ class User(BaseFunction):
                 users(status: $status, group_id: $group) {$fields}
             }
         """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {
             'status': status,
             'group': group,
@@ -141,6 +142,8 @@ class User(BaseFunction):
         page_size: int = 20,
         filter: str = None,
         order: str = None,
+        keyset: bool = False,
+        cursor: str = None,
     ) -> PaginatedResult[dict]:
         """
         Fetches the list of users. Domain admins can only get domain users.
@@ -149,6 +152,10 @@ class User(BaseFunction):
                        (active, inactive, deleted, before-verification).
         :param group: Fetch users in a specific group.
         :param fields: Additional per-user query fields to fetch.
+        :param keyset: Fetches the page by the sort keys in *order* instead of the offset,
+                       which costs the same for any depth of pages.
+        :param cursor: The ``next_cursor`` of the previous page to continue the keyset
+                       pagination.
         """
         return await generate_paginated_results(
             'user_list',
@@ -161,6 +168,8 @@ class User(BaseFunction):
             fields,
             page_offset=page_offset,
             page_size=page_size,
+            keyset=keyset,
+            cursor=cursor,
         )
 
     @api_function
@@ -189,7 +198,7 @@ class User(BaseFunction):
                     user(email: $email) {$fields}
                 }
             """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'email': email}
         data = await api_session.get().Admin._query(query, variables if email is not None else None)
         return data['user']
@@ -220,7 +229,7 @@ class User(BaseFunction):
                     user_from_uuid(user_id: $user_id) {$fields}
                 }
             """)
-        query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
+        query = build_query(query, fields)
         variables = {'user_id': str(user_uuid)}
         data = await api_session.get().Admin._query(query, variables if user_uuid is not None else None)
         return data['user_from_uuid']
@@ -254,7 +263,7 @@ class User(BaseFunction):
                 }
             }
         """)
-        query = query.replace('$fields', ' '.join(fields))
+        query = build_query(query, fields)
         variables = {
             'email': email,
             'input': {
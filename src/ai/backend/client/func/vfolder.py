@@ -1,32 +1,68 @@
 import asyncio
-from pathlib import Path
+import base64
+import hashlib
+import json
+import os
+from pathlib import Path, PurePath, PurePosixPath
+import shlex
+import tempfile
 from typing import (
+    Any,
+    Container,
+    Dict,
+    List,
     Mapping,
     Optional,
     Sequence,
+    Set,
+    Tuple,
     Union,
 )
+import warnings
 
 import aiohttp
+import attr
 import janus
 from tqdm import tqdm
 
 from yarl import URL
-from aiotusclient import client
 
 from ai.backend.client.output.fields import vfolder_fields
 from ai.backend.client.output.types import FieldSpec, PaginatedResult
 from .base import api_function, BaseFunction
 from ..compat import current_loop
-from ..config import DEFAULT_CHUNK_SIZE, MAX_INFLIGHT_CHUNKS
+from ..config import DEFAULT_CHUNK_SIZE, MAX_INFLIGHT_CHUNKS, local_cache_path
 from ..exceptions import BackendClientError
 from ..pagination import generate_paginated_results
 from ..request import Request
+from ..session import api_session
+from ..transfer import (
+    FileRangePayload,
+    MmapFileReader,
+    SyncDirection,
+    SyncManifest,
+    SyncManifestEntry,
+    TransferOrder,
+    TransferScheduler,
+    hash_file,
+)
 
 __all__ = (
     'VFolder',
 )
 
+_DOWNLOAD_RETRY_DELAY = 1.0
+_MAX_DOWNLOAD_RETRY_DELAY = 30.0
+_TUS_VERSION = '1.0.0'
+# The checksum algorithms of the TUS checksum extension in the order of preference.
+_TUS_CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+# 409 Conflict (mismatched offsets) and 460 Checksum Mismatch are recovered by
+# resuming from the offset reported by the storage proxy.
+_TUS_RESYNC_STATUSES = frozenset({409, 460})
+_MIN_SEGMENT_SIZE = 8 * (2**20)  # 8 MiB
+# The directory keeping the content-addressed files uploaded by VFolder.stage_files().
+_STAGING_DIR = PurePosixPath('.backend.ai-staging')
+
 _default_list_fields = (
     vfolder_fields['host'],
     vfolder_fields['name'],
@@ -38,6 +74,110 @@ _default_list_fields = (
 )
 
 
+def _parse_content_range(value: Optional[str]) -> Optional[int]:
+    """
+    Returns the total size in a Content-Range header such as ``bytes 0-99/1000``
+    or ``bytes */1000``.
+    """
+    if value is None:
+        return None
+    _, _, total = value.rpartition('/')
+    try:
+        return int(total)
+    except ValueError:
+        return None
+
+
+def _is_retriable_status(status: int) -> bool:
+    return status == 408 or status == 429 or status >= 500
+
+
+def _next_retry_count(
+    e: Exception,
+    retry_count: int,
+    max_retries: int,
+    made_progress: bool,
+    *,
+    extra_retriable_statuses: Container[int] = (),
+) -> int:
+    """
+    Returns the updated retry count after a failed transfer attempt,
+    or re-raises the error if it should not be retried anymore.
+    """
+    if (
+        isinstance(e, aiohttp.ClientResponseError)
+        and not _is_retriable_status(e.status)
+        and e.status not in extra_retriable_statuses
+    ):
+        raise e
+    # Give the full retry budget again if the last attempt has made progress.
+    retry_count = 1 if made_progress else retry_count + 1
+    if retry_count > max_retries:
+        raise e
+    return retry_count
+
+
+def _get_retry_delay(retry_count: int) -> float:
+    return min(
+        _DOWNLOAD_RETRY_DELAY * (2 ** (retry_count - 1)),
+        _MAX_DOWNLOAD_RETRY_DELAY,
+    )
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _compute_upload_checksum(
+    reader: MmapFileReader,
+    offset: int,
+    length: int,
+    algorithm: str,
+) -> str:
+    """
+    Returns the value of the ``Upload-Checksum`` header for the given range of the file.
+    """
+    with reader.view(offset, length) as chunk:
+        digest = hashlib.new(algorithm, chunk).digest()
+    return f"{algorithm} {base64.b64encode(digest).decode('ascii')}"
+
+
+def _load_state(path: Path) -> Optional[Mapping[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _save_segment_state(
+    path: Path,
+    size: int,
+    validator: Optional[str],
+    segments: Sequence[Sequence[int]],
+) -> None:
+    path.write_text(json.dumps({'size': size, 'validator': validator, 'segments': segments}))
+
+
+def _get_resume_validator(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Returns the validator of the response to be sent as the ``If-Range`` header
+    when resuming the download later.
+    """
+    etag = headers.get('ETag')
+    # The weak entity tags cannot be used for the range requests.
+    if etag is not None and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def _save_resume_state(path: Path, validator: Optional[str], size: Optional[int]) -> None:
+    path.write_text(json.dumps({'validator': validator, 'size': size}))
+
+
 class VFolder(BaseFunction):
 
     def __init__(self, name: str):
@@ -97,12 +237,18 @@ class VFolder(BaseFunction):
         page_size: int = 20,
         filter: str = None,
         order: str = None,
+        keyset: bool = False,
+        cursor: str = None,
     ) -> PaginatedResult[dict]:
         """
         Fetches the list of vfolders. Domain admins can only get domain vfolders.
 
         :param group: Fetch vfolders in a specific group.
         :param fields: Additional per-vfolder query fields to fetch.
+        :param keyset: Fetches the page by the sort keys in *order* instead of the offset,
+                       which costs the same for any depth of pages.
+        :param cursor: The ``next_cursor`` of the previous page to continue the keyset
+                       pagination.
         """
         return await generate_paginated_results(
             'vfolder_list',
@@ -114,6 +260,8 @@ class VFolder(BaseFunction):
             fields,
             page_offset=page_offset,
             page_size=page_size,
+            keyset=keyset,
+            cursor=cursor,
         )
 
     @api_function
@@ -159,6 +307,319 @@ class VFolder(BaseFunction):
             self.name = new_name
             return await resp.text()
 
+    async def _request_download_url(
+        self,
+        relpath: Union[str, Path],
+        address_map: Optional[Mapping[str, str]] = None,
+    ) -> URL:
+        rqst = Request('POST',
+                       '/folders/{}/request-download'.format(self.name))
+        rqst.set_json({
+            'path': str(relpath),
+        })
+        async with rqst.fetch() as resp:
+            download_info = await resp.json()
+            overriden_url = download_info['url']
+            if address_map:
+                if download_info['url'] in address_map:
+                    overriden_url = address_map[download_info['url']]
+                else:
+                    raise BackendClientError(
+                        'Overriding storage proxy addresses are given, '
+                        'but no url matches with any of them.\n',
+                    )
+            return URL(overriden_url).with_query({
+                'token': download_info['token'],
+            })
+
+    async def _download_file(
+        self,
+        relpath: Union[str, Path],
+        file_path: Path,
+        *,
+        chunk_size: int,
+        show_progress: bool,
+        address_map: Optional[Mapping[str, str]],
+        max_retries: int,
+        segments: int = 1,
+        scheduler: TransferScheduler = None,
+        overwrite: bool = False,
+    ) -> None:
+        if scheduler is None:
+            scheduler = TransferScheduler()
+        if file_path.exists() and not overwrite:
+            raise RuntimeError('The target file already exists', file_path.name)
+        # The data is written to a separate file until the download completes
+        # so that interrupted downloads can be continued later.
+        partial_path = file_path.with_name(file_path.name + '.partial')
+        # The progress of the segmented downloads is kept in another file
+        # as their partial files are preallocated.
+        state_path = file_path.with_name(file_path.name + '.partial.segments')
+        # The validator and the total size of the file are kept along with
+        # the sequential partial file to check if it is still valid when resuming.
+        resume_path = file_path.with_name(file_path.name + '.partial.resume')
+        if show_progress:
+            print(f"Downloading to {file_path} ...")
+        if (segments > 1 or state_path.exists()) and hasattr(os, 'pwrite'):
+            completed = await self._download_file_segmented(
+                relpath, partial_path, state_path,
+                segments=segments,
+                chunk_size=chunk_size,
+                show_progress=show_progress,
+                address_map=address_map,
+                max_retries=max_retries,
+                scheduler=scheduler,
+            )
+            if completed:
+                resume_path.unlink(missing_ok=True)
+                partial_path.replace(file_path)
+                return
+        if state_path.exists():
+            # The preallocated partial file cannot be continued sequentially.
+            state_path.unlink()
+            partial_path.unlink(missing_ok=True)
+
+        def _write_file(path: Path, mode: str, q: janus._SyncQueueProxy[bytes]):
+            with open(path, mode) as f:
+                while True:
+                    chunk = q.get()
+                    if not chunk:
+                        return
+                    f.write(chunk)
+                    q.task_done()
+
+        # Reuse the pooled connections of the current API session.
+        client = api_session.get().aiohttp_session
+        retry_count = 0
+        with tqdm(
+            unit='bytes',
+            unit_scale=True,
+            unit_divisor=1024,
+            disable=not show_progress,
+        ) as pbar:
+            while True:
+                offset = partial_path.stat().st_size if partial_path.exists() else 0
+                resume_state = (_load_state(resume_path) if offset > 0 else None) or {}
+                if resume_state.get('validator') is None:
+                    # The partial file cannot be resumed without knowing if the file
+                    # on the server is still the same one.
+                    offset = 0
+                received = 0
+                try:
+                    # The download tokens may expire during retries.
+                    download_url = await self._request_download_url(relpath, address_map)
+                    headers: Dict[str, str] = {}
+                    if offset > 0:
+                        headers['Range'] = f'bytes={offset}-'
+                        headers['If-Range'] = resume_state['validator']
+                    async with client.get(download_url, ssl=False, headers=headers) as raw_resp:
+                        if raw_resp.status == 416:
+                            # The partial file is either already complete or stale.
+                            total_size = _parse_content_range(raw_resp.headers.get('Content-Range'))
+                            if total_size == offset:
+                                break
+                            partial_path.unlink()
+                            resume_path.unlink(missing_ok=True)
+                            continue
+                        raw_resp.raise_for_status()
+                        if offset > 0 and raw_resp.status == 206:
+                            total_size = _parse_content_range(raw_resp.headers.get('Content-Range'))
+                            if total_size != resume_state['size']:
+                                # The file has been replaced with another one of a different size.
+                                partial_path.unlink()
+                                resume_path.unlink(missing_ok=True)
+                                continue
+                        else:
+                            # The server has ignored the range or the file has been modified,
+                            # so it sends the whole file.
+                            offset = 0
+                            total_size = raw_resp.content_length
+                        _save_resume_state(
+                            resume_path,
+                            _get_resume_validator(raw_resp.headers),
+                            total_size,
+                        )
+                        expected_size = raw_resp.content_length
+                        pbar.reset(total=(offset + expected_size) if expected_size is not None else None)
+                        pbar.update(offset)
+                        q: janus.Queue[bytes] = janus.Queue(MAX_INFLIGHT_CHUNKS)
+                        try:
+                            loop = current_loop()
+                            writer_fut = loop.run_in_executor(
+                                None, _write_file,
+                                partial_path, 'ab' if offset > 0 else 'wb', q.sync_q,
+                            )
+                            await asyncio.sleep(0)
+                            while True:
+                                chunk = await raw_resp.content.read(chunk_size)
+                                if not chunk:
+                                    break
+                                received += len(chunk)
+                                pbar.update(len(chunk))
+                                await q.async_q.put(chunk)
+                                await scheduler.consume(len(chunk))
+                        finally:
+                            await q.async_q.put(b'')
+                            await writer_fut
+                            q.close()
+                            await q.wait_closed()
+                        if expected_size is not None and received < expected_size:
+                            raise aiohttp.ClientPayloadError(
+                                f'The download has ended prematurely '
+                                f'({offset + received} of {offset + expected_size} bytes)',
+                            )
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retry_count = _next_retry_count(e, retry_count, max_retries, received > 0)
+                    delay = _get_retry_delay(retry_count)
+                    if show_progress:
+                        pbar.write(
+                            f"Download interrupted ({e!r}); "
+                            f"retrying in {delay:.1f} seconds ({retry_count}/{max_retries}) ...",
+                        )
+                    await asyncio.sleep(delay)
+        resume_path.unlink(missing_ok=True)
+        partial_path.replace(file_path)
+
+    async def _download_file_segmented(
+        self,
+        relpath: Union[str, Path],
+        partial_path: Path,
+        state_path: Path,
+        *,
+        segments: int,
+        chunk_size: int,
+        show_progress: bool,
+        address_map: Optional[Mapping[str, str]],
+        max_retries: int,
+        scheduler: TransferScheduler,
+    ) -> bool:
+        """
+        Downloads a file by fetching multiple byte ranges of it concurrently and
+        writing them at their offsets of the preallocated partial file.
+        Returns ``False`` without downloading if the storage proxy does not support
+        range requests or the file is too small to split.
+        """
+        client = api_session.get().aiohttp_session
+        download_url = await self._request_download_url(relpath, address_map)
+        # Check the support of range requests and the total size at once.
+        async with client.get(download_url, ssl=False, headers={'Range': 'bytes=0-0'}) as raw_resp:
+            validator = None
+            if raw_resp.status == 416:
+                total_size = None
+            else:
+                raw_resp.raise_for_status()
+                total_size = None
+                if raw_resp.status == 206:
+                    total_size = _parse_content_range(raw_resp.headers.get('Content-Range'))
+                    validator = _get_resume_validator(raw_resp.headers)
+        state = _load_state(state_path)
+        ranges: List[List[int]]
+        if (
+            state is not None
+            and total_size is not None
+            and state.get('size') == total_size
+            # The file may have been replaced with another one of the same size.
+            and validator is not None
+            and state.get('validator') == validator
+            and partial_path.exists()
+        ):
+            ranges = [[*r] for r in state['segments']]
+        else:
+            if state is not None:
+                # The stale state cannot be used to resume the download.
+                state_path.unlink()
+                partial_path.unlink(missing_ok=True)
+            if total_size is None:
+                return False
+            num_segments = min(segments, -(-total_size // _MIN_SEGMENT_SIZE))
+            if num_segments <= 1:
+                return False
+            segment_size = -(-total_size // num_segments)
+            # Each range is represented as [start, current position, end].
+            ranges = [
+                [start, start, min(start + segment_size, total_size)]
+                for start in range(0, total_size, segment_size)
+            ]
+            with open(partial_path, 'wb') as f:
+                f.truncate(total_size)
+        assert total_size is not None
+        _save_segment_state(state_path, total_size, validator, ranges)
+        loop = current_loop()
+
+        async def _download_segment(r: List[int], pbar: tqdm) -> None:
+            nonlocal download_url
+            retry_count = 0
+            while r[1] < r[2]:
+                received = 0
+                try:
+                    headers = {'Range': f'bytes={r[1]}-{r[2] - 1}'}
+                    if validator is not None:
+                        headers['If-Range'] = validator
+                    async with client.get(download_url, ssl=False, headers=headers) as raw_resp:
+                        raw_resp.raise_for_status()
+                        if raw_resp.status != 206:
+                            if validator is not None:
+                                # The file has been replaced, so the received segments
+                                # are discarded when the download is continued later.
+                                raise BackendClientError(
+                                    'The file has been modified during the download.',
+                                )
+                            raise BackendClientError('The storage proxy has ignored the range request.')
+                        while r[1] < r[2]:
+                            chunk = await raw_resp.content.read(min(chunk_size, r[2] - r[1]))
+                            if not chunk:
+                                break
+                            await loop.run_in_executor(None, _pwrite_all, fd, chunk, r[1])
+                            r[1] += len(chunk)
+                            received += len(chunk)
+                            pbar.update(len(chunk))
+                            await scheduler.consume(len(chunk))
+                        if r[1] < r[2]:
+                            raise aiohttp.ClientPayloadError(
+                                f'The download of the range {r[0]}-{r[2] - 1} has ended prematurely',
+                            )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retry_count = _next_retry_count(e, retry_count, max_retries, received > 0)
+                    delay = _get_retry_delay(retry_count)
+                    if show_progress:
+                        pbar.write(
+                            f"Download of a segment interrupted ({e!r}); "
+                            f"retrying in {delay:.1f} seconds ({retry_count}/{max_retries}) ...",
+                        )
+                    await asyncio.sleep(delay)
+                    # The download token may have expired.
+                    download_url = await self._request_download_url(relpath, address_map)
+
+        fd = os.open(partial_path, os.O_WRONLY)
+        try:
+            with tqdm(
+                total=total_size,
+                initial=sum(r[1] - r[0] for r in ranges),
+                unit='bytes',
+                unit_scale=True,
+                unit_divisor=1024,
+                disable=not show_progress,
+            ) as pbar:
+                tasks = [
+                    asyncio.ensure_future(_download_segment(r, pbar))
+                    for r in ranges if r[1] < r[2]
+                ]
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    for t in tasks:
+                        t.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
+        except BaseException:
+            _save_segment_state(state_path, total_size, validator, ranges)
+            raise
+        finally:
+            os.close(fd)
+        state_path.unlink()
+        return True
+
     @api_function
     async def download(
         self,
@@ -168,71 +629,297 @@ class VFolder(BaseFunction):
         chunk_size: int = DEFAULT_CHUNK_SIZE,
         show_progress: bool = False,
         address_map: Optional[Mapping[str, str]] = None,
+        max_retries: int = 5,
+        segments: int = 1,
+        jobs: int = 1,
+        max_bytes_per_sec: Optional[int] = None,
+        order: TransferOrder = TransferOrder.AS_GIVEN,
     ) -> None:
+        """
+        Downloads the given files from the virtual folder.
+
+        Each file is first written as ``<filename>.partial`` and renamed when completed.
+        If such a partial file exists, the download continues from its end using
+        HTTP range requests, validated with the ETag or Last-Modified of the file
+        saved as ``<filename>.partial.resume`` so that the download restarts from the
+        beginning when the file has been modified in the meantime.
+        Interrupted transfers are retried with exponential backoff up to
+        *max_retries* times in a row.
+
+        If *segments* is greater than one, large files are split into up to the given
+        number of byte ranges which are downloaded concurrently over separate connections.
+        It helps to saturate high-bandwidth links with long round-trip times.
+
+        Up to *jobs* files are downloaded at the same time in the given *order*,
+        and the total throughput may be limited by *max_bytes_per_sec*.
+        """
         base_path = (Path.cwd() if basedir is None else Path(basedir).resolve())
-        for relpath in relative_paths:
-            file_path = base_path / relpath
-            rqst = Request('POST',
-                           '/folders/{}/request-download'.format(self.name))
-            rqst.set_json({
-                'path': str(relpath),
+        scheduler = TransferScheduler(jobs, max_bytes_per_sec=max_bytes_per_sec, order=order)
+        if scheduler.order != TransferOrder.AS_GIVEN:
+            file_sizes = await self._get_file_sizes(relative_paths)
+            relative_paths = scheduler.sort(relative_paths, lambda p: file_sizes.get(str(Path(p))))
+
+        async def _download(relpath: Union[str, Path]) -> None:
+            await self._download_file(
+                relpath, base_path / relpath,
+                chunk_size=chunk_size,
+                show_progress=show_progress,
+                address_map=address_map,
+                max_retries=max_retries,
+                segments=segments,
+                scheduler=scheduler,
+            )
+
+        await scheduler.run(relative_paths, _download)
+
+    async def _upload_file(
+        self,
+        file_path: Path,
+        base_path: Path,
+        *,
+        chunk_size: int,
+        address_map: Optional[Mapping[str, str]],
+        show_progress: bool,
+        scheduler: TransferScheduler,
+        target_path: Optional[str] = None,
+        max_retries: int = 5,
+        segments: int = 1,
+        checksum: bool = False,
+    ) -> None:
+        file_size = file_path.stat().st_size
+        if target_path is None:
+            target_path = str(file_path.relative_to(base_path))
+        rqst = Request('POST',
+                       '/folders/{}/request-upload'.format(self.name))
+        rqst.set_json({
+            'path': target_path,
+            'size': int(file_size),
+        })
+        async with rqst.fetch() as resp:
+            upload_info = await resp.json()
+            overriden_url = upload_info['url']
+            if address_map:
+                if upload_info['url'] in address_map:
+                    overriden_url = address_map[upload_info['url']]
+                else:
+                    raise BackendClientError(
+                        'Overriding storage proxy addresses are given, '
+                        'but no url matches with any of them.\n',
+                    )
+            upload_url = URL(overriden_url).with_query({
+                'token': upload_info['token'],
             })
-            async with rqst.fetch() as resp:
-                download_info = await resp.json()
-                overriden_url = download_info['url']
-                if address_map:
-                    if download_info['url'] in address_map:
-                        overriden_url = address_map[download_info['url']]
-                    else:
-                        raise BackendClientError(
-                            'Overriding storage proxy addresses are given, '
-                            'but no url matches with any of them.\n',
-                        )
+        if show_progress:
+            print(f"Uploading {file_path} via {upload_info['url']} ...")
+        extensions: Set[str] = set()
+        algorithms: Sequence[str] = []
+        if checksum or segments > 1:
+            extensions, algorithms = await self._get_tus_options(upload_url)
+        checksum_algorithm = None
+        if checksum:
+            if 'checksum' in extensions:
+                checksum_algorithm = next(
+                    (a for a in _TUS_CHECKSUM_ALGORITHMS if a in algorithms),
+                    'sha1',  # mandatory for the servers supporting the extension
+                )
+            else:
+                warnings.warn(
+                    'The storage proxy does not support the checksum extension of TUS. '
+                    'The chunks are uploaded without checksums.',
+                )
+        num_segments = 1
+        if 'concatenation' in extensions:
+            num_segments = min(segments, -(-file_size // _MIN_SEGMENT_SIZE))
+        with MmapFileReader(file_path) as reader, tqdm(
+            total=file_size,
+            unit='bytes',
+            unit_scale=True,
+            unit_divisor=1024,
+            disable=not show_progress,
+        ) as pbar:
+            if num_segments <= 1:
+                await self._upload_range(
+                    upload_url, reader, 0, file_size,
+                    chunk_size=chunk_size,
+                    checksum_algorithm=checksum_algorithm,
+                    max_retries=max_retries,
+                    show_progress=show_progress,
+                    scheduler=scheduler,
+                    pbar=pbar,
+                )
+                return
+            # Upload the parts of the file concurrently as the partial uploads
+            # and let the storage proxy concatenate them.
+            segment_size = -(-file_size // num_segments)
+            ranges = [
+                (start, min(start + segment_size, file_size))
+                for start in range(0, file_size, segment_size)
+            ]
+            partial_urls = [
+                await self._create_partial_upload(upload_url, end - start)
+                for start, end in ranges
+            ]
+            tasks = [
+                asyncio.ensure_future(self._upload_range(
+                    partial_url, reader, start, end,
+                    chunk_size=chunk_size,
+                    checksum_algorithm=checksum_algorithm,
+                    max_retries=max_retries,
+                    show_progress=show_progress,
+                    scheduler=scheduler,
+                    pbar=pbar,
+                ))
+                for partial_url, (start, end) in zip(partial_urls, ranges)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            await self._concat_partial_uploads(upload_url, partial_urls)
 
-                download_url = URL(overriden_url).with_query({
-                    'token': download_info['token'],
-                })
-
-            def _write_file(file_path: Path, q: janus._SyncQueueProxy[bytes]):
-                with open(file_path, 'wb') as f:
-                    while True:
-                        chunk = q.get()
-                        if not chunk:
-                            return
-                        f.write(chunk)
-                        q.task_done()
-
-            if show_progress:
-                print(f"Downloading to {file_path} ...")
-            async with aiohttp.ClientSession() as client:
-                # TODO: ranged requests to continue interrupted downloads with automatic retries
-                async with client.get(download_url, ssl=False) as raw_resp:
-                    size = int(raw_resp.headers['Content-Length'])
-                    if file_path.exists():
-                        raise RuntimeError('The target file already exists', file_path.name)
-                    q: janus.Queue[bytes] = janus.Queue(MAX_INFLIGHT_CHUNKS)
-                    try:
-                        with tqdm(
-                            total=size,
-                            unit='bytes',
-                            unit_scale=True,
-                            unit_divisor=1024,
-                            disable=not show_progress,
-                        ) as pbar:
-                            loop = current_loop()
-                            writer_fut = loop.run_in_executor(None, _write_file, file_path, q.sync_q)
-                            await asyncio.sleep(0)
-                            while True:
-                                chunk = await raw_resp.content.read(chunk_size)
-                                pbar.update(len(chunk))
-                                if not chunk:
-                                    break
-                                await q.async_q.put(chunk)
-                    finally:
-                        await q.async_q.put(b'')
-                        await writer_fut
-                        q.close()
-                        await q.wait_closed()
+    async def _get_tus_options(self, upload_url: URL) -> Tuple[Set[str], Sequence[str]]:
+        """
+        Returns the TUS extensions and the checksum algorithms supported by the storage proxy.
+        """
+        client = api_session.get().aiohttp_session
+        try:
+            async with client.options(
+                upload_url, ssl=False, headers={'Tus-Resumable': _TUS_VERSION},
+            ) as raw_resp:
+                if raw_resp.status >= 400:
+                    return set(), []
+                extensions = raw_resp.headers.get('Tus-Extension', '')
+                algorithms = raw_resp.headers.get('Tus-Checksum-Algorithm', '')
+        except aiohttp.ClientError:
+            return set(), []
+        return (
+            {ext.strip() for ext in extensions.split(',') if ext.strip()},
+            [algo.strip().lower() for algo in algorithms.split(',') if algo.strip()],
+        )
+
+    async def _get_upload_offset(self, upload_url: URL) -> int:
+        client = api_session.get().aiohttp_session
+        async with client.head(
+            upload_url, ssl=False, headers={'Tus-Resumable': _TUS_VERSION},
+        ) as raw_resp:
+            raw_resp.raise_for_status()
+            return int(raw_resp.headers['Upload-Offset'])
+
+    async def _create_partial_upload(self, upload_url: URL, length: int) -> URL:
+        client = api_session.get().aiohttp_session
+        headers = {
+            'Tus-Resumable': _TUS_VERSION,
+            'Upload-Concat': 'partial',
+            'Upload-Length': str(length),
+        }
+        async with client.post(upload_url, ssl=False, headers=headers) as raw_resp:
+            raw_resp.raise_for_status()
+            return upload_url.join(URL(raw_resp.headers['Location']))
+
+    async def _concat_partial_uploads(self, upload_url: URL, partial_urls: Sequence[URL]) -> None:
+        client = api_session.get().aiohttp_session
+        headers = {
+            'Tus-Resumable': _TUS_VERSION,
+            'Upload-Concat': 'final;' + ' '.join(str(url) for url in partial_urls),
+        }
+        async with client.post(upload_url, ssl=False, headers=headers) as raw_resp:
+            raw_resp.raise_for_status()
+
+    async def _upload_range(
+        self,
+        upload_url: URL,
+        reader: MmapFileReader,
+        start: int,
+        end: int,
+        *,
+        chunk_size: int,
+        checksum_algorithm: Optional[str],
+        max_retries: int,
+        show_progress: bool,
+        scheduler: TransferScheduler,
+        pbar: tqdm,
+    ) -> None:
+        """
+        Uploads the given range of the file to the TUS upload URL chunk by chunk.
+
+        The checksum of the next chunk is computed in a thread pool while the current
+        chunk is being sent.  If a chunk fails, it resumes from the offset reported
+        by the storage proxy.
+        """
+        client = api_session.get().aiohttp_session
+        loop = current_loop()
+        total = end - start
+        offset = 0
+        retry_count = 0
+        needs_resync = False
+        # The offset and the future of the checksum computed in advance.
+        next_checksum: Optional[Tuple[int, asyncio.Future]] = None
+        checksum_futs: List[asyncio.Future] = []
+
+        def _compute_checksum(offset: int) -> asyncio.Future:
+            assert checksum_algorithm is not None
+            fut = loop.run_in_executor(
+                None, _compute_upload_checksum,
+                reader, start + offset, min(chunk_size, total - offset), checksum_algorithm,
+            )
+            checksum_futs[:] = [f for f in checksum_futs if not f.done()]
+            checksum_futs.append(fut)
+            return fut
+
+        try:
+            while True:
+                try:
+                    if needs_resync:
+                        acked_offset = await self._get_upload_offset(upload_url)
+                        pbar.update(acked_offset - offset)
+                        offset = acked_offset
+                        needs_resync = False
+                    if offset >= total:
+                        break
+                    length = min(chunk_size, total - offset)
+                    headers = {
+                        'Tus-Resumable': _TUS_VERSION,
+                        'Upload-Offset': str(offset),
+                    }
+                    if checksum_algorithm is not None:
+                        if next_checksum is not None and next_checksum[0] == offset:
+                            checksum_fut = next_checksum[1]
+                        else:
+                            checksum_fut = _compute_checksum(offset)
+                        next_checksum = None
+                        headers['Upload-Checksum'] = await checksum_fut
+                        if offset + length < total:
+                            next_checksum = (offset + length, _compute_checksum(offset + length))
+                    await scheduler.consume(length)
+                    # The chunk is sent directly from the file without being copied.
+                    payload = FileRangePayload(reader, start + offset, length)
+                    async with client.patch(
+                        upload_url, data=payload, headers=headers, ssl=False,
+                    ) as raw_resp:
+                        raw_resp.raise_for_status()
+                        new_offset = int(raw_resp.headers['Upload-Offset'])
+                    pbar.update(new_offset - offset)
+                    offset = new_offset
+                    retry_count = 0
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retry_count = _next_retry_count(
+                        e, retry_count, max_retries, False,
+                        extra_retriable_statuses=_TUS_RESYNC_STATUSES,
+                    )
+                    delay = _get_retry_delay(retry_count)
+                    if show_progress:
+                        pbar.write(
+                            f"Upload interrupted ({e!r}); "
+                            f"retrying in {delay:.1f} seconds ({retry_count}/{max_retries}) ...",
+                        )
+                    await asyncio.sleep(delay)
+                    needs_resync = True
+        finally:
+            # Let the pending computations finish before the file is unmapped.
+            await asyncio.gather(*checksum_futs, return_exceptions=True)
 
     @api_function
     async def upload(
@@ -243,59 +930,403 @@ class VFolder(BaseFunction):
         chunk_size: int = DEFAULT_CHUNK_SIZE,
         address_map: Optional[Mapping[str, str]] = None,
         show_progress: bool = False,
+        max_retries: int = 5,
+        segments: int = 1,
+        checksum: bool = False,
+        jobs: int = 1,
+        max_bytes_per_sec: Optional[int] = None,
+        order: TransferOrder = TransferOrder.AS_GIVEN,
     ) -> None:
+        """
+        Uploads the given files to the virtual folder.
+
+        If a chunk fails to upload, the upload continues from the offset reported by
+        the storage proxy up to *max_retries* times in a row.
+
+        If *segments* is greater than 1 and the storage proxy supports the concatenation
+        extension of TUS, large files are split into up to the given number of parts
+        uploaded concurrently.  If *checksum* is set, each chunk is sent with its checksum
+        to be verified by the storage proxy.
+
+        Up to *jobs* files are uploaded at the same time in the given *order*,
+        and the total throughput may be limited by *max_bytes_per_sec*.
+        """
         base_path = (Path.cwd() if basedir is None else Path(basedir).resolve())
         if basedir:
-            files = [basedir / Path(file) for file in files]
+            file_paths = [base_path / Path(file) for file in files]
         else:
-            files = [Path(file).resolve() for file in files]
-        for file_path in files:
-            file_size = Path(file_path).stat().st_size
-            rqst = Request('POST',
-                           '/folders/{}/request-upload'.format(self.name))
-            rqst.set_json({
-                'path': "{}".format(str(Path(file_path).relative_to(base_path))),
-                'size': int(file_size),
-            })
-            async with rqst.fetch() as resp:
-                upload_info = await resp.json()
-                overriden_url = upload_info['url']
-                if address_map:
-                    if upload_info['url'] in address_map:
-                        overriden_url = address_map[upload_info['url']]
-                    else:
-                        raise BackendClientError(
-                            'Overriding storage proxy addresses are given, '
-                            'but no url matches with any of them.\n',
-                        )
-                upload_url = URL(overriden_url).with_query({
-                    'token': upload_info['token'],
-                })
-            tus_client = client.TusClient()
-            if basedir:
-                input_file = open(base_path / file_path, "rb")
-            else:
-                input_file = open(str(Path(file_path).relative_to(base_path)), "rb")
-            print(f"Uploading {base_path / file_path} via {upload_info['url']} ...")
-            # TODO: refactor out the progress bar
-            uploader = tus_client.async_uploader(
-                file_stream=input_file,
-                url=upload_url,
-                upload_checksum=False,
+            file_paths = [Path(file).resolve() for file in files]
+        scheduler = TransferScheduler(jobs, max_bytes_per_sec=max_bytes_per_sec, order=order)
+        file_paths = scheduler.sort(file_paths, lambda p: p.stat().st_size)
+
+        async def _upload(file_path: Path) -> None:
+            await self._upload_file(
+                file_path, base_path,
                 chunk_size=chunk_size,
+                address_map=address_map,
+                show_progress=show_progress,
+                scheduler=scheduler,
+                max_retries=max_retries,
+                segments=segments,
+                checksum=checksum,
             )
-            return await uploader.upload()
+
+        await scheduler.run(file_paths, _upload)
+
+    async def _walk_remote(
+        self,
+        root: PurePosixPath,
+    ) -> Tuple[Dict[str, Tuple[int, float]], Set[str]]:
+        """
+        Returns the sizes and modification times of all files and the set of
+        all directories (including the given path itself as ``"."`` if it exists)
+        under the given path in the virtual folder, keyed by their paths relative to it.
+        """
+        files: Dict[str, Tuple[int, float]] = {}
+        dirs: Set[str] = set()
+        pending = [PurePosixPath('.')]
+        while pending:
+            reldir = pending.pop()
+            result = await self._list_files(root / reldir)
+            if result.get('error_msg'):
+                if reldir == PurePosixPath('.'):
+                    # The root path does not exist yet.
+                    break
+                raise BackendClientError(result['error_msg'])
+            dirs.add(str(reldir))
+            items = result.get('files', [])
+            if isinstance(items, str):
+                items = json.loads(items)
+            for item in items:
+                relpath = reldir / item['filename']
+                if item['mode'].startswith('d'):
+                    dirs.add(str(relpath))
+                    pending.append(relpath)
+                else:
+                    files[str(relpath)] = (int(item['size']), float(item['mtime']))
+        return files, dirs
 
     @api_function
-    async def mkdir(self, path: Union[str, Path]):
+    async def sync(
+        self,
+        local_dir: Union[str, Path],
+        remote_path: Union[str, PurePosixPath] = '.',
+        *,
+        direction: SyncDirection = SyncDirection.UPLOAD,
+        checksum: bool = False,
+        dry_run: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        address_map: Optional[Mapping[str, str]] = None,
+        show_progress: bool = False,
+        max_retries: int = 5,
+        jobs: int = 1,
+        max_bytes_per_sec: Optional[int] = None,
+        order: TransferOrder = TransferOrder.AS_GIVEN,
+    ) -> Mapping[str, Sequence[str]]:
+        """
+        Synchronizes a local directory and a directory in the virtual folder recursively
+        by transferring only the new and changed files in the given *direction*.
+        The files are never deleted from the destination.
+
+        The files are compared by their sizes and modification times.
+        The states of the synchronized files are kept in a local manifest cache so that
+        the files untouched since the last synchronization are skipped immediately.
+        If *checksum* is set, the local files touched but having the same content
+        as the last synchronized one (by their SHA-256 digests) are also skipped,
+        and the digests are hashed again only for the touched files.
+
+        Returns the lists of the transferred and skipped files by their relative paths.
+        If *dry_run* is set, nothing is transferred.
+        """
+        direction = SyncDirection(direction)
+        local_path = Path(local_dir).resolve()
+        remote_root = PurePosixPath(remote_path)
+        manifest = SyncManifest.for_target(
+            local_cache_path / 'vfolder-sync', local_path, self.name, str(remote_root),
+        )
+        manifest.load()
+        remote_files, remote_dirs = await self._walk_remote(remote_root)
+        loop = current_loop()
+
+        local_files: Dict[str, os.stat_result] = {}
+        if local_path.is_dir():
+            for dirpath, _, filenames in os.walk(local_path):
+                for filename in filenames:
+                    if filename.endswith(('.partial', '.partial.segments', '.partial.resume')):
+                        continue
+                    abspath = Path(dirpath) / filename
+                    relpath = abspath.relative_to(local_path).as_posix()
+                    local_files[relpath] = abspath.stat()
+        elif direction == SyncDirection.UPLOAD:
+            raise BackendClientError(f'The local directory does not exist: {local_path}')
+
+        async def _get_hash(relpath: str) -> Optional[str]:
+            if not checksum:
+                return None
+            entry = manifest.get(relpath)
+            if entry is not None and entry.sha256 is not None \
+                    and manifest.is_unchanged(relpath, local_files[relpath]):
+                return entry.sha256
+            return await loop.run_in_executor(None, hash_file, local_path / relpath)
+
+        async def _needs_upload(relpath: str) -> bool:
+            stat = local_files[relpath]
+            remote = remote_files.get(relpath)
+            if remote is None:
+                return True
+            entry = manifest.get(relpath)
+            if entry is None:
+                return not (remote[0] == stat.st_size and remote[1] >= stat.st_mtime)
+            if entry.remote_size != remote[0] or \
+                    (entry.remote_mtime is not None and entry.remote_mtime != remote[1]):
+                # The remote file has been changed by others.
+                return True
+            if manifest.is_unchanged(relpath, stat):
+                return False
+            if checksum and entry.sha256 is not None:
+                digest = await _get_hash(relpath)
+                if digest == entry.sha256:
+                    # Only touched without changing the content.
+                    manifest.update(relpath, attr.evolve(
+                        entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                    ))
+                    return False
+            return True
+
+        def _needs_download(relpath: str) -> bool:
+            remote = remote_files[relpath]
+            stat = local_files.get(relpath)
+            if stat is None:
+                return True
+            entry = manifest.get(relpath)
+            if entry is not None and manifest.is_unchanged(relpath, stat) \
+                    and entry.remote_size == remote[0] and entry.remote_mtime == remote[1]:
+                return False
+            return not (remote[0] == stat.st_size and stat.st_mtime >= remote[1])
+
+        scheduler = TransferScheduler(jobs, max_bytes_per_sec=max_bytes_per_sec, order=order)
+        if direction == SyncDirection.UPLOAD:
+            candidates = sorted(local_files)
+            upload_needs: Dict[str, bool] = {}
+
+            async def _check_upload(relpath: str) -> None:
+                upload_needs[relpath] = await _needs_upload(relpath)
+
+            # Check the files (hashing them if necessary) as many as the transfer jobs at once.
+            await scheduler.run(candidates, _check_upload)
+            to_transfer = [relpath for relpath in candidates if upload_needs[relpath]]
+        else:
+            candidates = sorted(remote_files)
+            to_transfer = [relpath for relpath in candidates if _needs_download(relpath)]
+        to_transfer_set = set(to_transfer)
+        skipped = [relpath for relpath in candidates if relpath not in to_transfer_set]
+        if dry_run:
+            manifest.save()
+            return {'transferred': to_transfer, 'skipped': skipped}
+
+        if direction == SyncDirection.UPLOAD:
+            to_transfer = scheduler.sort(to_transfer, lambda p: local_files[p].st_size)
+            # Create the missing directories, from the parents to the children.
+            missing_dirs: Set[PurePosixPath] = set()
+            for relpath in to_transfer:
+                for parent in PurePosixPath(relpath).parents:
+                    if str(parent) not in remote_dirs:
+                        missing_dirs.add(remote_root / parent)
+            if '.' not in remote_dirs:
+                missing_dirs.update(remote_root.parents)
+            missing_dirs.discard(PurePosixPath('.'))
+            for d in sorted(missing_dirs, key=lambda p: len(p.parts)):
+                await self._mkdir(d)
+        else:
+            to_transfer = scheduler.sort(to_transfer, lambda p: remote_files[p][0])
+
+        async def _transfer(relpath: str) -> None:
+            file_path = local_path / relpath
+            if direction == SyncDirection.UPLOAD:
+                stat = local_files[relpath]
+                digest = await _get_hash(relpath)
+                await self._upload_file(
+                    file_path, local_path,
+                    chunk_size=chunk_size,
+                    address_map=address_map,
+                    show_progress=show_progress,
+                    scheduler=scheduler,
+                    target_path=str(remote_root / relpath),
+                    max_retries=max_retries,
+                )
+                manifest.update(relpath, SyncManifestEntry(
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    sha256=digest,
+                    remote_size=stat.st_size,
+                ))
+            else:
+                remote_size, remote_mtime = remote_files[relpath]
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                await self._download_file(
+                    str(remote_root / relpath), file_path,
+                    chunk_size=chunk_size,
+                    show_progress=show_progress,
+                    address_map=address_map,
+                    max_retries=max_retries,
+                    scheduler=scheduler,
+                    overwrite=True,
+                )
+                # Keep the modification time to detect the changes next time.
+                os.utime(file_path, (remote_mtime, remote_mtime))
+                stat = file_path.stat()
+                manifest.update(relpath, SyncManifestEntry(
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    remote_size=remote_size,
+                    remote_mtime=remote_mtime,
+                ))
+
+        try:
+            await scheduler.run(to_transfer, _transfer)
+        finally:
+            # Remember the remote states of the files found in sync for the next time.
+            for relpath in skipped:
+                entry = manifest.get(relpath)
+                remote = remote_files.get(relpath)
+                stat = local_files.get(relpath)
+                if remote is None or stat is None:
+                    continue
+                if entry is None or not manifest.is_unchanged(relpath, stat):
+                    entry = SyncManifestEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                manifest.update(relpath, attr.evolve(
+                    entry, remote_size=remote[0], remote_mtime=remote[1],
+                ))
+            manifest.save()
+        return {'transferred': to_transfer, 'skipped': skipped}
+
+    @api_function
+    async def stage_files(
+        self,
+        files: Sequence[Union[str, Path]],
+        *,
+        basedir: Union[str, Path] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        address_map: Optional[Mapping[str, str]] = None,
+        show_progress: bool = False,
+        max_retries: int = 5,
+        jobs: int = 1,
+        max_bytes_per_sec: Optional[int] = None,
+    ) -> str:
+        """
+        Uploads the given files into the content-addressed staging area of the virtual
+        folder, so that the same set of files can be copied into many compute sessions
+        mounting the virtual folder without uploading them to each session.
+
+        The files are stored by their SHA-256 digests, and only the contents not staged
+        yet are uploaded.  The digests are cached locally by the sizes and modification
+        times of the files to avoid hashing the unchanged files again.
+
+        Returns the path of a shell script inside the virtual folder which copies
+        the files into the current working directory keeping their relative paths
+        to *basedir* (the current working directory by default).
+        """
+        base_path = (Path.cwd() if basedir is None else Path(basedir).resolve())
+        file_paths = [Path(file).resolve() for file in files]
+        relpaths = []
+        for file_path in file_paths:
+            try:
+                relpaths.append(file_path.relative_to(base_path).as_posix())
+            except ValueError:
+                raise ValueError(
+                    f'File "{file_path}" is outside of the base directory "{base_path}".',
+                ) from None
+        manifest = SyncManifest.for_target(
+            local_cache_path / 'vfolder-staging', base_path, self.name, str(_STAGING_DIR),
+        )
+        manifest.load()
+        loop = current_loop()
+        digests: List[str] = []
+        sizes: List[int] = []
+        for file_path, relpath in zip(file_paths, relpaths):
+            stat = file_path.stat()
+            entry = manifest.get(relpath)
+            if entry is not None and entry.sha256 is not None and manifest.is_unchanged(relpath, stat):
+                digest = entry.sha256
+            else:
+                digest = await loop.run_in_executor(None, hash_file, file_path)
+                manifest.update(relpath, SyncManifestEntry(
+                    size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=digest,
+                ))
+            digests.append(digest)
+            sizes.append(stat.st_size)
+        manifest.save()
+
+        remote_files, remote_dirs = await self._walk_remote(_STAGING_DIR)
+        for d in (PurePosixPath('.'), PurePosixPath('objects'), PurePosixPath('manifests')):
+            if str(d) not in remote_dirs:
+                await self._mkdir(_STAGING_DIR / d)
+        to_upload: Dict[str, Path] = {}
+        for file_path, digest, size in zip(file_paths, digests, sizes):
+            # The empty files are created by the script without uploading.
+            if size > 0 and remote_files.get(f'objects/{digest}', (None,))[0] != size:
+                to_upload.setdefault(digest, file_path)
+        scheduler = TransferScheduler(jobs, max_bytes_per_sec=max_bytes_per_sec)
+
+        async def _upload(digest: str) -> None:
+            await self._upload_file(
+                to_upload[digest], base_path,
+                chunk_size=chunk_size,
+                address_map=address_map,
+                show_progress=show_progress,
+                scheduler=scheduler,
+                target_path=str(_STAGING_DIR / 'objects' / digest),
+                max_retries=max_retries,
+            )
+
+        await scheduler.run([*to_upload], _upload)
+
+        lines = [
+            '#!/bin/sh',
+            '# Copies the files staged by Backend.AI Client SDK into the current directory.',
+            'set -e',
+            'staging_dir="$(cd "$(dirname "$0")/.." && pwd)"',
+        ]
+        created_dirs = set()
+        for relpath, digest, size in zip(relpaths, digests, sizes):
+            parent = PurePosixPath(relpath).parent
+            if parent != PurePosixPath('.') and parent not in created_dirs:
+                lines.append(f'mkdir -p {shlex.quote(str(parent))}')
+                created_dirs.add(parent)
+            if size > 0:
+                lines.append(f'cp "$staging_dir/objects/{digest}" {shlex.quote(relpath)}')
+            else:
+                lines.append(f': > {shlex.quote(relpath)}')
+        script = ('\n'.join(lines) + '\n').encode('utf-8')
+        script_path = _STAGING_DIR / 'manifests' / f'{hashlib.sha256(script).hexdigest()}.sh'
+        if f'manifests/{script_path.name}' not in remote_files:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                tmp_path = Path(tmpdir) / script_path.name
+                tmp_path.write_bytes(script)
+                await self._upload_file(
+                    tmp_path, Path(tmpdir),
+                    chunk_size=chunk_size,
+                    address_map=address_map,
+                    show_progress=False,
+                    scheduler=scheduler,
+                    target_path=str(script_path),
+                    max_retries=max_retries,
+                )
+        return str(script_path)
+
+    async def _mkdir(self, path: Union[str, PurePath]) -> str:
         rqst = Request('POST',
                        '/folders/{}/mkdir'.format(self.name))
         rqst.set_json({
-            'path': path,
+            'path': str(path),
         })
         async with rqst.fetch() as resp:
             return await resp.text()
 
+    @api_function
+    async def mkdir(self, path: Union[str, Path]):
+        return await self._mkdir(path)
+
     @api_function
     async def rename_file(self, target_path: str, new_name: str):
         rqst = Request('POST',
@@ -333,13 +1364,33 @@ class VFolder(BaseFunction):
 
     @api_function
     async def list_files(self, path: Union[str, Path] = '.'):
+        return await self._list_files(path)
+
+    async def _list_files(self, path: Union[str, PurePath] = '.'):
         rqst = Request('GET', '/folders/{}/files'.format(self.name))
         rqst.set_json({
-            'path': path,
+            'path': str(path),
         })
         async with rqst.fetch() as resp:
             return await resp.json()
 
+    async def _get_file_sizes(
+        self,
+        relative_paths: Sequence[Union[str, Path]],
+    ) -> Mapping[str, Optional[int]]:
+        """
+        Returns the sizes of the given files by listing their parent directories.
+        """
+        sizes: Dict[str, Optional[int]] = {}
+        for parent in {Path(p).parent for p in relative_paths}:
+            result = await self._list_files(parent)
+            files = result.get('files', [])
+            if isinstance(files, str):
+                files = json.loads(files)
+            for item in files:
+                sizes[str(parent / item['filename'])] = item['size']
+        return {str(Path(p)): sizes.get(str(Path(p))) for p in relative_paths}
+
     @api_function
     async def invite(self, perm: str, emails: Sequence[str]):
         rqst = Request('POST', '/folders/{}/invite'.format(self.name))
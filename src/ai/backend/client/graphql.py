@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import re
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import attr
+
+from .output.types import FieldSpec
+
+__all__ = (
+    'build_query',
+    'get_query_hash',
+    'QueryBatcher',
+)
+
+# Matches the string literals to keep them intact, and the comments and whitespace runs
+# to collapse.
+_minify_pattern = re.compile(r'"(?:\\.|[^"\\])*"|(?:\s|#[^\n]*)+')
+_placeholder = re.compile(r'\$(\w+)')
+
+
+def _minify(query: str) -> str:
+    return _minify_pattern.sub(
+        lambda m: m.group(0) if m.group(0).startswith('"') else ' ',
+        query,
+    ).strip()
+
+
+@functools.lru_cache(maxsize=512)
+def _build_query(
+    template: str,
+    field_refs: Tuple[str, ...],
+    replacements: Tuple[Tuple[str, str], ...],
+) -> str:
+    values = {'fields': ' '.join(field_refs), **dict(replacements)}
+    # Substitute in a single pass, leaving the GraphQL variables like "$limit" intact.
+    query = _placeholder.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+    return _minify(query)
+
+
+def build_query(
+    template: str,
+    fields: Iterable[Union[FieldSpec, str]] = (),
+    **replacements: str,
+) -> str:
+    """
+    Builds a GraphQL query document from the template by replacing ``$fields`` with
+    the references of the given fields and ``$<key>`` with the given keyword arguments,
+    collapsing the indentations and line breaks.
+
+    The documents are memoized per the template, the fields and the replacements,
+    so the polling loops reuse the same document object without rebuilding it.
+    """
+    field_refs = tuple(f.field_ref if isinstance(f, FieldSpec) else f for f in fields)
+    return _build_query(template, field_refs, tuple(replacements.items()))
+
+
+@functools.lru_cache(maxsize=512)
+def get_query_hash(query: str) -> str:
+    """
+    Returns the SHA-256 hash of the query document used as its persisted query ID.
+    """
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+_token_pattern = re.compile(
+    r'"(?:\\.|[^"\\])*"|\.\.\.|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|\$?\w+|[^\s\w]',
+)
+
+
+@attr.define(slots=True, frozen=True)
+class _ParsedQuery:
+    var_decls: str
+    selections: List[Tuple[str, str]]  # [(response key, selection without the alias)]
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_query(query: str) -> Optional[_ParsedQuery]:
+    """
+    Splits a query document into the variable declarations and the top-level
+    selections if it is a single query operation which can be merged with the others.
+    """
+    if '"""' in query:
+        return None  # block strings
+    tokens = _token_pattern.findall(query)
+    pos = 0
+    if tokens[:1] == ['query']:
+        pos = 1
+        if pos < len(tokens) and _is_name(tokens[pos]):
+            pos += 1  # skip the operation name
+    var_decls = ''
+    if tokens[pos:pos + 1] == ['(']:
+        end = _find_closing(tokens, pos)
+        if end is None:
+            return None
+        var_decls = ' '.join(tokens[pos + 1:end])
+        pos = end + 1
+    if tokens[pos:pos + 1] != ['{']:
+        return None
+    body_end = _find_closing(tokens, pos)
+    if body_end is None or body_end != len(tokens) - 1:
+        return None  # multiple operations or fragments
+    selections: List[Tuple[str, str]] = []
+    current: List[str] = []
+    idx = pos + 1
+    while idx < body_end:
+        token = tokens[idx]
+        if token == '...':
+            return None
+        if token in ('(', '{', '['):
+            end = _find_closing(tokens, idx)
+            if end is None:
+                return None
+            current.extend(tokens[idx:end + 1])
+            idx = end + 1
+            continue
+        if _is_name(token) and current and current[-1] not in (':', '@'):
+            selections.append(_make_selection(current))
+            current = []
+        if token != ',':
+            current.append(token)
+        idx += 1
+    if current:
+        selections.append(_make_selection(current))
+    return _ParsedQuery(var_decls, selections)
+
+
+def _is_name(token: str) -> bool:
+    return token[0].isalpha() or token[0] == '_'
+
+
+def _find_closing(tokens: List[str], start: int) -> Optional[int]:
+    depth = 0
+    for idx in range(start, len(tokens)):
+        if tokens[idx] in ('(', '{', '['):
+            depth += 1
+        elif tokens[idx] in (')', '}', ']'):
+            depth -= 1
+            if depth == 0:
+                return idx
+    return None
+
+
+def _make_selection(tokens: List[str]) -> Tuple[str, str]:
+    if len(tokens) > 2 and tokens[1] == ':':
+        return tokens[0], ' '.join(tokens[2:])
+    return tokens[0], ' '.join(tokens)
+
+
+def _rename_variables(text: str, prefix: str) -> str:
+    return _token_pattern.sub(
+        lambda m: f'${prefix}{m.group(0)[1:]}' if m.group(0).startswith('$') else m.group(0),
+        text,
+    )
+
+
+@attr.define(slots=True)
+class _BatchedQuery:
+    query: str
+    variables: Mapping[str, Any]
+    parsed: _ParsedQuery
+    future: asyncio.Future
+
+
+class QueryBatcher:
+    """
+    Coalesces the GraphQL queries issued concurrently within a short time window
+    into a single request.
+
+    The top-level fields of each query are aliased and its variables are renamed with
+    a per-query prefix so that the merged document can be split back to the callers,
+    along with the errors whose paths point the aliased fields.
+    The mutations and the documents using fragments are never merged.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        send_func: Callable[[str, Mapping[str, Any]], Awaitable[Mapping[str, Any]]],
+        *,
+        max_batch_size: int = 16,
+    ) -> None:
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._send_func = send_func
+        self._pending: List[_BatchedQuery] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def execute(self, query: str, variables: Mapping[str, Any]) -> Mapping[str, Any]:
+        """
+        Sends the query as a part of the next batch and returns its own part of
+        the response body.
+        """
+        parsed = _parse_query(query)
+        if parsed is None:
+            return await self._send_func(query, variables)
+        loop = asyncio.get_running_loop()
+        item = _BatchedQuery(query, variables, parsed, loop.create_future())
+        self._pending.append(item)
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.ensure_future(self._flush_later())
+        return await item.future
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self._flush_timer = None
+        self._flush()
+
+    def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # The batch is sent in a separate task not to be cancelled along with a caller.
+        task = asyncio.ensure_future(self._send_and_dispatch(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _send_and_dispatch(self, batch: List[_BatchedQuery]) -> None:
+        try:
+            results = await self._send_batch(batch)
+        except asyncio.CancelledError:
+            for item in batch:
+                item.future.cancel()
+            raise
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        else:
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+
+    async def _send_batch(self, batch: List[_BatchedQuery]) -> Sequence[Mapping[str, Any]]:
+        if len(batch) == 1:
+            return [await self._send_func(batch[0].query, batch[0].variables)]
+        var_decls = []
+        selections = []
+        variables: Dict[str, Any] = {}
+        for idx, item in enumerate(batch):
+            prefix = f'b{idx}_'
+            if item.parsed.var_decls:
+                var_decls.append(_rename_variables(item.parsed.var_decls, prefix))
+            for key, selection in item.parsed.selections:
+                selections.append(f'{prefix}{key}: {_rename_variables(selection, prefix)}')
+            variables.update({f'{prefix}{key}': value for key, value in item.variables.items()})
+        query = 'query' + (f'({", ".join(var_decls)})' if var_decls else '') + \
+            ' { ' + ' '.join(selections) + ' }'
+        response = await self._send_func(query, variables)
+        errors = response.get('errors') or []
+        data = response.get('data')
+        if data is None or any(not error.get('path') for error in errors):
+            # A query has failed as a whole, so send them individually
+            # not to fail the other queries.
+            return await asyncio.gather(*[
+                self._send_func(item.query, item.variables) for item in batch
+            ])
+        results = []
+        for idx, item in enumerate(batch):
+            prefix = f'b{idx}_'
+            item_errors = [
+                {**error, 'path': [str(error['path'][0])[len(prefix):], *error['path'][1:]]}
+                for error in errors
+                if str(error['path'][0]).startswith(prefix)
+            ]
+            result: Dict[str, Any] = {
+                'data': {key: data.get(f'{prefix}{key}') for key, _ in item.parsed.selections},
+            }
+            if item_errors:
+                result['errors'] = item_errors
+            results.append(result)
+        return results
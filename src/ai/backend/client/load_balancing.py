@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
-from typing import List, Mapping, Tuple, Type
+from collections import deque
+import time
+from typing import Deque, Dict, List, Mapping, Optional, Tuple, Type, Union
 
 import attr
 from yarl import URL
@@ -17,19 +19,113 @@ class LoadBalancer(metaclass=ABCMeta):
 
     @staticmethod
     def load(config: LoadBalancerConfig) -> LoadBalancer:
-        cls = _cls_map[config.name]
+        try:
+            cls = _cls_map[config.name]
+        except KeyError:
+            raise ValueError(
+                f'Unknown load balancer "{config.name}" '
+                f'(available: {", ".join(_cls_map.keys())})',
+            )
         return cls(*config.args)
 
     @staticmethod
     def clean_config(config: str) -> LoadBalancerConfig:
-        name, _, raw_args = config.partition(':')
-        args = raw_args.split(',')
+        """
+        Parses the load balancer configuration string in the form of
+        ``"name"`` or ``"name:arg1,arg2,..."``.
+        """
+        name, _, raw_args = config.strip().partition(':')
+        args = [arg.strip() for arg in raw_args.split(',')] if raw_args else []
         return LoadBalancerConfig(name, tuple(args))
 
     @abstractmethod
     def rotate(self, endpoints: List[URL]) -> None:
         raise NotImplementedError
 
+    def record_latency(self, endpoint: URL, latency: float) -> None:
+        """
+        Called after each successful request with the elapsed time (in seconds)
+        until the response headers of the given endpoint have arrived.
+        """
+        pass
+
+    def record_failure(self, endpoint: URL) -> None:
+        """
+        Called when a request to the given endpoint has failed due to
+        a connection error.
+        """
+        pass
+
+
+class LatencyStats:
+    """
+    Keeps the sliding-window latency statistics of a single endpoint.
+
+    :param window_size: The number of the most recent samples kept to calculate
+        the percentiles.
+    :param alpha: The smoothing factor of the exponentially weighted moving average.
+    """
+
+    __slots__ = (
+        'alpha',
+        'ewma',
+        'consecutive_failures',
+        'updated_at',
+        '_samples',
+    )
+
+    ewma: Optional[float]
+    consecutive_failures: int
+    updated_at: float
+    _samples: Deque[float]
+
+    def __init__(self, window_size: int = 100, alpha: float = 0.3) -> None:
+        self.alpha = alpha
+        self.ewma = None
+        self.consecutive_failures = 0
+        self.updated_at = time.monotonic()
+        self._samples = deque(maxlen=window_size)
+
+    def add_sample(self, latency: float) -> None:
+        self._samples.append(latency)
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma = self.alpha * latency + (1 - self.alpha) * self.ewma
+        self.consecutive_failures = 0
+        self.updated_at = time.monotonic()
+
+    def add_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.updated_at = time.monotonic()
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures == 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Returns the *q*-th percentile (0 to 100) of the latency samples in the window
+        using the nearest-rank method, or ``None`` if there are no samples yet.
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(99)
+
 
 class SimpleRRLoadBalancer(LoadBalancer):
     """
@@ -46,21 +142,205 @@ class SimpleRRLoadBalancer(LoadBalancer):
 class PeriodicRRLoadBalancer(LoadBalancer):
     """
     Rotates the endpoints upon the specified interval.
+
+    :param interval: The minimum interval in seconds between two rotations.
     """
 
+    def __init__(self, interval: Union[float, str] = 60.0) -> None:
+        self.interval = float(interval)
+        if self.interval < 0:
+            raise ValueError('The rotation interval must not be negative.')
+        self._last_rotated_at = time.monotonic()
+
     def rotate(self, endpoints: List[URL]) -> None:
-        pass
+        if len(endpoints) == 1:
+            return
+        now = time.monotonic()
+        if now - self._last_rotated_at < self.interval:
+            return
+        self._last_rotated_at = now
+        item = endpoints.pop(0)
+        endpoints.append(item)
 
 
 class LowestLatencyLoadBalancer(LoadBalancer):
     """
     Change the endpoints with the lowest average latency for last N requests.
+
+    Healthy endpoints are preferred over the ones that have failed since
+    their last successful response, and the endpoints without any latency
+    samples are tried first so that they get measured at least once.
+
+    As the endpoints behind the fastest one would otherwise never get any request
+    to refresh their statistics, every *explore_interval*-th rotation puts the
+    endpoint measured least recently in front of the others instead, so that
+    the recovered or no-longer-overloaded endpoints are taken back.
+
+    :param window_size: The number of the most recent requests kept per endpoint.
+    :param alpha: The smoothing factor of the exponentially weighted moving average
+        of the latency.
+    :param metric: The latency statistic to compare the endpoints: ``"ewma"``
+        (the exponentially weighted moving average), ``"p50"`` or ``"p99"``
+        (the percentiles of the samples in the window).
+    :param explore_interval: The number of rotations between the retries of
+        the endpoint measured least recently.  Setting it to zero disables them.
     """
 
+    metrics = ('ewma', 'p50', 'p99')
+
+    def __init__(
+        self,
+        window_size: Union[int, str] = 100,
+        alpha: Union[float, str] = 0.3,
+        metric: str = 'ewma',
+        explore_interval: Union[int, str] = 20,
+    ) -> None:
+        self.window_size = int(window_size)
+        self.alpha = float(alpha)
+        self.metric = metric
+        self.explore_interval = int(explore_interval)
+        if self.window_size <= 0:
+            raise ValueError('The latency window size must be a positive integer.')
+        if not (0 < self.alpha <= 1):
+            raise ValueError('The EWMA smoothing factor must be in the range of (0, 1].')
+        if self.metric not in self.metrics:
+            raise ValueError(
+                f'Unknown latency metric "{self.metric}" '
+                f'(available: {", ".join(self.metrics)})',
+            )
+        if self.explore_interval < 0:
+            raise ValueError('The exploration interval must not be negative.')
+        self._stats: Dict[URL, LatencyStats] = {}
+        self._rotations = 0
+
+    @property
+    def stats(self) -> Mapping[URL, LatencyStats]:
+        """The latency statistics collected for each endpoint."""
+        return self._stats
+
+    def _get_stats(self, endpoint: URL) -> LatencyStats:
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = LatencyStats(self.window_size, self.alpha)
+            self._stats[endpoint] = stats
+        return stats
+
+    def record_latency(self, endpoint: URL, latency: float) -> None:
+        self._get_stats(endpoint).add_sample(latency)
+
+    def record_failure(self, endpoint: URL) -> None:
+        self._get_stats(endpoint).add_failure()
+
     def rotate(self, endpoints: List[URL]) -> None:
-        pass
+        if len(endpoints) == 1:
+            return
+
+        def _sort_key(endpoint: URL) -> Tuple[int, int, float]:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                return (0, 0, 0.0)
+            latency = getattr(stats, self.metric)
+            if latency is None:
+                return (stats.consecutive_failures, 0, 0.0)
+            return (stats.consecutive_failures, 1, latency)
+
+        # list.sort() is stable, so ties keep the current order.
+        endpoints.sort(key=_sort_key)
+        self._rotations += 1
+        if self.explore_interval > 0 and self._rotations % self.explore_interval == 0:
+
+            def _updated_at(endpoint: URL) -> float:
+                stats = self._stats.get(endpoint)
+                return float('-inf') if stats is None else stats.updated_at
+
+            stale = min(endpoints[1:], key=_updated_at)
+            endpoints.remove(stale)
+            endpoints.insert(0, stale)
+
+
+class EndpointCircuitBreaker:
+    """
+    Tracks the consecutive connection failures of each endpoint and temporarily
+    ejects the endpoints that have failed too many times so that new requests
+    are sent to the other endpoints first.
+
+    Once the ejection period has passed, the endpoint is given a chance again.
+    If it fails again, it is re-ejected with a doubled period up to *max_ejection_period*.
+    Any successful response (including background probes) reinstates the endpoint,
+    while the failed background probes only keep it ejected until the next probe.
+
+    :param failure_threshold: The number of consecutive failures to eject an endpoint.
+    :param ejection_period: The initial duration in seconds to keep an endpoint ejected.
+    :param max_ejection_period: The upper bound of the exponentially increasing ejection period.
+    :param probe_interval: The interval in seconds to probe the ejected endpoints
+        in the background.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        ejection_period: float = 30.0,
+        max_ejection_period: float = 300.0,
+        probe_interval: float = 5.0,
+    ) -> None:
+        if failure_threshold <= 0:
+            raise ValueError('The failure threshold must be a positive integer.')
+        self.failure_threshold = failure_threshold
+        self.ejection_period = ejection_period
+        self.max_ejection_period = max(ejection_period, max_ejection_period)
+        self.probe_interval = probe_interval
+        self._failures: Dict[URL, int] = {}
+        # endpoint -> (ejected-until timestamp, current ejection period)
+        self._ejections: Dict[URL, Tuple[float, float]] = {}
+
+    def record_success(self, endpoint: URL) -> None:
+        self._failures.pop(endpoint, None)
+        self._ejections.pop(endpoint, None)
+
+    def record_failure(self, endpoint: URL) -> None:
+        failures = self._failures.get(endpoint, 0) + 1
+        self._failures[endpoint] = failures
+        if failures < self.failure_threshold:
+            return
+        prev_ejection = self._ejections.get(endpoint)
+        if prev_ejection is None:
+            period = self.ejection_period
+        else:
+            period = min(prev_ejection[1] * 2, self.max_ejection_period)
+        self._ejections[endpoint] = (time.monotonic() + period, period)
+
+    def record_probe_failure(self, endpoint: URL) -> None:
+        """
+        Keeps the ejected endpoint ejected at least until the next background probe
+        without escalating its ejection period, as the probes are not the requests
+        whose failures indicate a repeated outage.
+        """
+        ejection = self._ejections.get(endpoint)
+        if ejection is None:
+            # It has been reinstated by another request in the meantime.
+            return
+        ejected_until, period = ejection
+        self._ejections[endpoint] = (
+            max(ejected_until, time.monotonic() + self.probe_interval),
+            period,
+        )
+
+    def is_ejected(self, endpoint: URL) -> bool:
+        """
+        Checks if the given endpoint should be avoided for now.
+        """
+        ejection = self._ejections.get(endpoint)
+        if ejection is None:
+            return False
+        return time.monotonic() < ejection[0]
 
-    # TODO: we need to collect and allow access to the latency statistics.
+    @property
+    def ejected_endpoints(self) -> List[URL]:
+        """
+        The endpoints which have been ejected and not reinstated yet,
+        including those whose ejection period has passed.
+        """
+        return [*self._ejections.keys()]
 
 
 _cls_map: Mapping[str, Type[LoadBalancer]] = {
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import sys
 from typing import (
     Any,
@@ -130,16 +132,29 @@ class ConsoleOutputHandler(BaseOutputHandler):
             def infinite_fetch():
                 nonlocal fields
                 current_offset = initial_page_offset
-                while True:
+                # Fetch the next page in the background while the user reads the current one.
+                executor = ThreadPoolExecutor(max_workers=1)
+                try:
                     result = fetch_func(current_offset, page_size)
                     if result.total_count == 0:
                         raise NoItems
-                    current_offset += len(result.items)
-                    if not fields:
-                        fields.extend(result.fields)
-                    yield from result.items
-                    if current_offset >= result.total_count:
-                        break
+                    while True:
+                        current_offset += len(result.items)
+                        next_result = None
+                        if result.items and current_offset < result.total_count:
+                            # Keep the context variables such as the current API session.
+                            next_result = executor.submit(
+                                contextvars.copy_context().run,
+                                fetch_func, current_offset, page_size,
+                            )
+                        if not fields:
+                            fields.extend(result.fields)
+                        yield from result.items
+                        if next_result is None:
+                            break
+                        result = next_result.result()
+                finally:
+                    executor.shutdown(wait=False)
 
             try:
                 echo_via_pager(
@@ -126,6 +126,7 @@ class PaginatedResult(Generic[T]):
     total_count: int
     items: Sequence[T]
     fields: Sequence[FieldSpec]
+    next_cursor: Optional[str] = None
 
 
 class BaseOutputHandler(metaclass=ABCMeta):
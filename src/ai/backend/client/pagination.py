@@ -1,10 +1,23 @@
 from __future__ import annotations
 
-import textwrap
+import asyncio
+import base64
+import binascii
+from collections import deque
+import functools
+import json
 from typing import (
     Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
     Dict,
     Final,
+    List,
+    Mapping,
+    Optional,
     Sequence,
     Tuple,
     TypeVar,
@@ -12,6 +25,7 @@ from typing import (
 
 from .output.types import FieldSpec, PaginatedResult
 from .exceptions import BackendAPIVersionError
+from .graphql import build_query
 from .session import api_session
 
 MAX_PAGE_SIZE: Final = 100
@@ -19,6 +33,43 @@ MAX_PAGE_SIZE: Final = 100
 T = TypeVar('T')
 
 
+# The unique field of the items of each paginated list, which is appended to the sort keys
+# of the keyset pagination so that the rows sharing the same sort key values with
+# the last row of a page are not skipped.
+_keyset_unique_keys: Final = {
+    'agent_list': 'id',
+    'compute_session_list': 'id',
+    'keypair_list': 'access_key',
+    'user_list': 'uuid',
+    'vfolder_list': 'id',
+}
+
+
+_paginated_query_template: Final = '''
+query($limit:Int!, $offset:Int!, $var_decls) {
+  $root_field(
+      limit:$limit, offset:$offset, $var_args) {
+    items { $fields }
+    total_count
+  }
+}'''
+
+
+@functools.lru_cache(maxsize=256)
+def _build_paginated_query(
+    root_field: str,
+    var_signature: Tuple[Tuple[str, str], ...],
+    field_refs: Tuple[str, ...],
+) -> str:
+    return build_query(
+        _paginated_query_template,
+        field_refs,
+        root_field=root_field,
+        var_decls=', '.join(f'${key}: {type_}' for key, type_ in var_signature),
+        var_args=', '.join(f'{key}:${key}' for key, _ in var_signature),
+    )
+
+
 async def execute_paginated_query(
     root_field: str,
     variables: Dict[str, Tuple[Any, str]],
@@ -29,27 +80,11 @@ async def execute_paginated_query(
 ) -> PaginatedResult:
     if limit > MAX_PAGE_SIZE:
         raise ValueError(f"The page size cannot exceed {MAX_PAGE_SIZE}")
-    query = '''
-    query($limit:Int!, $offset:Int!, $var_decls) {
-      $root_field(
-          limit:$limit, offset:$offset, $var_args) {
-        items { $fields }
-        total_count
-      }
-    }'''
-    query = query.replace('$root_field', root_field)
-    query = query.replace('$fields', ' '.join(f.field_ref for f in fields))
-    query = query.replace(
-        '$var_decls',
-        ', '.join(f'${key}: {value[1]}'
-                  for key, value in variables.items()),
+    query = _build_paginated_query(
+        root_field,
+        tuple((key, value[1]) for key, value in variables.items()),
+        tuple(f.field_ref for f in fields),
     )
-    query = query.replace(
-        '$var_args',
-        ', '.join(f'{key}:${key}'
-                  for key in variables.keys()),
-    )
-    query = textwrap.dedent(query).strip()
     var_values = {key: value[0] for key, value in variables.items()}
     var_values['limit'] = limit
     var_values['offset'] = offset
@@ -61,6 +96,135 @@ async def execute_paginated_query(
     )
 
 
+def _check_paginated_variables(variables: Dict[str, Tuple[Any, str]]) -> None:
+    if api_session.get().api_version < (6, '20210815'):
+        if variables['filter'][0] is not None or variables['order'][0] is not None:
+            raise BackendAPIVersionError(
+                "filter and order arguments for paginated lists require v6.20210815 or later.",
+            )
+        # should remove to work with older managers
+        variables.pop('filter')
+        variables.pop('order')
+
+
+def _parse_keyset(order: str) -> List[Tuple[str, bool]]:
+    """
+    Returns the list of the sort keys and whether each key is in the descending order
+    from the ordering expression like ``"-created_at,+id"``.
+    """
+    keyset = []
+    for key in order.split(','):
+        key = key.strip()
+        if not key:
+            continue
+        descending = key.startswith('-')
+        keyset.append((key.lstrip('+-').strip(), descending))
+    if not keyset:
+        raise ValueError("The keyset pagination requires the order expression")
+    return keyset
+
+
+def _format_filter_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(str(value))
+
+
+def _build_keyset_filter(keyset: Sequence[Tuple[str, bool]], values: Sequence[Any]) -> str:
+    """
+    Builds the filter expression to select the rows after the row having the given
+    sort key values, e.g., ``(a > 1) | (a == 1 & b > 2)`` for the keys ``a, b``.
+    """
+    for (key, _), value in zip(keyset, values):
+        if value is None:
+            # The null values are not comparable with the others.
+            raise ValueError(
+                f"The keyset pagination cannot continue after a null value of \"{key}\"",
+            )
+    clauses = []
+    for idx, (key, descending) in enumerate(keyset):
+        terms = [
+            f'{prev_key} == {_format_filter_value(prev_value)}'
+            for (prev_key, _), prev_value in zip(keyset[:idx], values)
+        ]
+        terms.append(f'{key} {"<" if descending else ">"} {_format_filter_value(values[idx])}')
+        clauses.append('(' + ' & '.join(terms) + ')')
+    return ' | '.join(clauses)
+
+
+def _encode_cursor(values: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str, num_keys: int) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from None
+    if not isinstance(values, list) or len(values) != num_keys:
+        raise ValueError(f"The pagination cursor does not match the order expression: {cursor!r}")
+    return values
+
+
+async def execute_keyset_paginated_query(
+    root_field: str,
+    variables: Dict[str, Tuple[Any, str]],
+    fields: Sequence[FieldSpec],
+    *,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> PaginatedResult:
+    """
+    Fetches a page after the position given by *cursor* using the sort keys in the
+    ``order`` variable instead of the offset, so that fetching a deep page costs
+    the same as fetching the first page.
+
+    The unique key of the items is appended to the sort keys as the last tiebreaker
+    if not included in the order expression.
+    The fields of the sort keys are queried together if not included in *fields*,
+    and the returned result has the cursor of the next page if there may be more items.
+    The ``total_count`` is the number of the items from the position of the cursor.
+    """
+    order = variables['order'][0]
+    if not order:
+        raise ValueError("The keyset pagination requires the order expression")
+    unique_key = _keyset_unique_keys.get(root_field)
+    if unique_key is None:
+        raise ValueError(f"The keyset pagination is not supported for {root_field}")
+    keyset = _parse_keyset(order)
+    if unique_key not in (key for key, _ in keyset):
+        keyset.append((unique_key, False))
+        variables = {
+            **variables,
+            'order': (f'{order},+{unique_key}', variables['order'][1]),
+        }
+    field_names = {f.field_name for f in fields}
+    fields = [
+        *fields,
+        *(FieldSpec(key) for key, _ in keyset if key not in field_names),
+    ]
+    if cursor is not None:
+        keyset_filter = _build_keyset_filter(keyset, _decode_cursor(cursor, len(keyset)))
+        user_filter = variables['filter'][0]
+        variables = {
+            **variables,
+            'filter': (
+                f'({user_filter}) & ({keyset_filter})' if user_filter else keyset_filter,
+                variables['filter'][1],
+            ),
+        }
+    result = await execute_paginated_query(
+        root_field, variables, fields,
+        limit=limit, offset=0,
+    )
+    if result.items and len(result.items) >= limit:
+        last_item = result.items[-1]
+        result.next_cursor = _encode_cursor([last_item[key] for key, _ in keyset])
+    return result
+
+
 async def generate_paginated_results(
     root_field: str,
     variables: Dict[str, Tuple[Any, str]],
@@ -68,17 +232,23 @@ async def generate_paginated_results(
     *,
     page_offset: int,
     page_size: int,
+    keyset: bool = False,
+    cursor: Optional[str] = None,
 ) -> PaginatedResult:
     if page_size > MAX_PAGE_SIZE:
         raise ValueError(f"The page size cannot exceed {MAX_PAGE_SIZE}")
-    if api_session.get().api_version < (6, '20210815'):
-        if variables['filter'][0] is not None or variables['order'][0] is not None:
+    if keyset or cursor is not None:
+        if page_offset != 0:
+            raise ValueError("The keyset pagination cannot be used with the page offset")
+        if api_session.get().api_version < (6, '20210815'):
             raise BackendAPIVersionError(
-                "filter and order arguments for paginated lists require v6.20210815 or later.",
+                "The keyset pagination requires v6.20210815 or later.",
             )
-        # should remove to work with older managers
-        variables.pop('filter')
-        variables.pop('order')
+        return await execute_keyset_paginated_query(
+            root_field, variables, fields,
+            limit=page_size, cursor=cursor,
+        )
+    _check_paginated_variables(variables)
     offset = page_offset
     while True:
         limit = page_size
@@ -88,3 +258,119 @@ async def generate_paginated_results(
         )
         offset += page_size
         return result
+
+
+async def _iter_paginated_pages(
+    root_field: str,
+    variables: Dict[str, Tuple[Any, str]],
+    fields: Sequence[FieldSpec],
+    *,
+    page_offset: int,
+    page_size: int,
+    prefetch: int,
+) -> AsyncGenerator[PaginatedResult, None]:
+    if page_size > MAX_PAGE_SIZE:
+        raise ValueError(f"The page size cannot exceed {MAX_PAGE_SIZE}")
+    if prefetch < 0:
+        raise ValueError("The number of prefetched pages cannot be negative")
+    _check_paginated_variables(variables)
+    result = await execute_paginated_query(
+        root_field, variables, fields,
+        limit=page_size, offset=page_offset,
+    )
+    total_count = result.total_count
+    next_offset = page_offset + page_size
+    pending: Deque[asyncio.Task[PaginatedResult]] = deque()
+
+    def _schedule_next_pages() -> None:
+        nonlocal next_offset
+        while len(pending) < max(prefetch, 1) and next_offset < total_count:
+            pending.append(asyncio.create_task(execute_paginated_query(
+                root_field, variables, fields,
+                limit=page_size, offset=next_offset,
+            )))
+            next_offset += page_size
+
+    try:
+        while True:
+            if prefetch > 0:
+                _schedule_next_pages()
+            yield result
+            if not result.items:
+                # The list has shrunk while iterating.
+                break
+            if prefetch == 0:
+                _schedule_next_pages()
+            if not pending:
+                break
+            result = await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def iter_paginated_results(
+    root_field: str,
+    variables: Dict[str, Tuple[Any, str]],
+    fields: Sequence[FieldSpec],
+    *,
+    page_offset: int = 0,
+    page_size: int = MAX_PAGE_SIZE,
+    prefetch: int = 2,
+) -> AsyncIterator[Mapping[str, Any]]:
+    """
+    Iterates over the items of all pages starting from *page_offset*.
+
+    Once the first page tells the total count, up to *prefetch* subsequent pages
+    are fetched in the background while the caller consumes the current page,
+    so that crossing the page boundaries does not stall on the round-trips.
+    """
+    pages = _iter_paginated_pages(
+        root_field, variables, fields,
+        page_offset=page_offset, page_size=page_size, prefetch=prefetch,
+    )
+    try:
+        async for result in pages:
+            for item in result.items:
+                yield item
+    finally:
+        await pages.aclose()
+
+
+async def export_paginated_results(
+    root_field: str,
+    variables: Dict[str, Tuple[Any, str]],
+    fields: Sequence[FieldSpec],
+    write_func: Callable[[Sequence[Mapping[str, Any]]], Awaitable[None]],
+    *,
+    page_offset: int = 0,
+    page_size: int = MAX_PAGE_SIZE,
+    concurrency: int = 8,
+) -> int:
+    """
+    Exports all items starting from *page_offset* in bulk.
+
+    After the first page tells the total count, the following pages are fetched
+    with up to *concurrency* queries in flight, and *write_func* is called with
+    the items of each page in the order of the offsets.
+    A slow writer holds back the queries so that only a bounded number of pages
+    are kept in the memory.
+
+    Returns the number of exported items.
+    """
+    if concurrency < 1:
+        raise ValueError("The concurrency must be a positive integer")
+    count = 0
+    pages = _iter_paginated_pages(
+        root_field, variables, fields,
+        page_offset=page_offset, page_size=page_size, prefetch=concurrency,
+    )
+    try:
+        async for result in pages:
+            if result.items:
+                await write_func(result.items)
+                count += len(result.items)
+    finally:
+        await pages.aclose()
+    return count
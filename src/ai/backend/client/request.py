@@ -3,13 +3,12 @@ from __future__ import annotations
 import asyncio
 from collections import OrderedDict, namedtuple
 from datetime import datetime
-from decimal import Decimal
 import functools
 import io
 import logging
-import json as modjson
 from pathlib import Path
 import sys
+import time
 from typing import (
     Any, Callable, Optional, Union,
     Awaitable, AsyncIterator, Type, TypeVar,
@@ -27,8 +26,12 @@ from multidict import CIMultiDict
 from yarl import URL
 
 from .auth import generate_signature
+from .codec import ExtendedJSONEncoder  # noqa: F401 (for backward compatibility)
 from .exceptions import BackendClientError, BackendAPIError
-from .session import BaseSession, Session as SyncSession, AsyncSession, api_session
+from .session import (
+    BaseSession, Session as SyncSession, AsyncSession, api_session,
+    _is_api_version_mismatch, _refresh_api_version,
+)
 
 log = logging.getLogger('ai.backend.client.request')
 
@@ -78,16 +81,6 @@ async def _coro_return(val: _T) -> _T:
     return val
 
 
-class ExtendedJSONEncoder(modjson.JSONEncoder):
-
-    def default(self, obj: Any) -> Any:
-        if isinstance(obj, Path):
-            return str(obj)
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super().default(obj)
-
-
 class Request:
     """
     The API request object.
@@ -197,7 +190,7 @@ class Request:
         """
         A shortcut for set_content() with JSON objects.
         """
-        self.set_content(modjson.dumps(value, cls=ExtendedJSONEncoder),
+        self.set_content(self.config.json_codec.dumps(value),
                          content_type='application/json')
 
     def attach_files(self, files: Sequence[AttachedFile]) -> None:
@@ -399,6 +392,20 @@ class Request:
         return SSEContextManager(self.session, _rqst_ctx_builder, **kwargs)
 
 
+def _get_json_loads(
+    session: BaseSession,
+    loads: Optional[Callable[..., Any]],
+    ordered: Optional[bool],
+) -> Callable[[str], Any]:
+    if ordered is None:
+        ordered = session.config.json_ordered_dict
+    if loads is not None:
+        if ordered:
+            return functools.partial(loads, object_pairs_hook=OrderedDict)
+        return loads
+    return functools.partial(session.config.json_codec.loads, ordered=ordered)
+
+
 class AsyncResponseMixin:
 
     _session: BaseSession
@@ -407,8 +414,8 @@ class AsyncResponseMixin:
     async def text(self) -> str:
         return await self._raw_response.text()
 
-    async def json(self, *, loads=modjson.loads) -> Any:
-        loads = functools.partial(loads, object_pairs_hook=OrderedDict)
+    async def json(self, *, loads=None, ordered: bool = None) -> Any:
+        loads = _get_json_loads(self._session, loads, ordered)
         return await self._raw_response.json(loads=loads)
 
     async def read(self, n: int = -1) -> bytes:
@@ -429,8 +436,8 @@ class SyncResponseMixin:
             self._raw_response.text(),
         )
 
-    def json(self, *, loads=modjson.loads) -> Any:
-        loads = functools.partial(loads, object_pairs_hook=OrderedDict)
+    def json(self, *, loads=None, ordered: bool = None) -> Any:
+        loads = _get_json_loads(self._session, loads, ordered)
         sync_session = cast(SyncSession, self._session)
         return sync_session.worker_thread.execute(
             self._raw_response.json(loads=loads),
@@ -556,16 +563,24 @@ class FetchContextManager:
         while True:
             try:
                 retry_count += 1
+                endpoint = self.session.config.endpoint
                 self._rqst_ctx = self.rqst_ctx_builder()
                 assert self._rqst_ctx is not None
+                started_at = time.monotonic()
                 raw_resp = await self._rqst_ctx.__aenter__()
+                self.session.config.record_endpoint_latency(
+                    endpoint, time.monotonic() - started_at)
                 if self.check_status and raw_resp.status // 100 != 2:
                     msg = await raw_resp.text()
                     await raw_resp.__aexit__(None, None, None)
+                    if _is_api_version_mismatch(raw_resp.status, msg):
+                        # Let the subsequent requests use the updated API version.
+                        await _refresh_api_version(self.session)
                     raise BackendAPIError(raw_resp.status, raw_resp.reason or '', msg)
                 return self.response_cls(self.session, raw_resp,
                                          async_mode=self._async_mode)
             except aiohttp.ClientConnectionError as e:
+                self.session.config.record_endpoint_failure(endpoint)
                 if retry_count == max_retries:
                     msg = 'Request to the API endpoint has failed.\n' \
                           'Check your network connection and/or the server status.\n' \
@@ -700,10 +715,15 @@ class WebSocketContextManager:
         while True:
             try:
                 retry_count += 1
+                endpoint = self.session.config.endpoint
                 self._ws_ctx = self.ws_ctx_builder()
                 assert self._ws_ctx is not None
+                started_at = time.monotonic()
                 raw_ws = await self._ws_ctx.__aenter__()
+                self.session.config.record_endpoint_latency(
+                    endpoint, time.monotonic() - started_at)
             except aiohttp.ClientConnectionError as e:
+                self.session.config.record_endpoint_failure(endpoint)
                 if retry_count == max_retries:
                     msg = 'Request to the API endpoint has failed.\n' \
                           'Check your network connection and/or the server status.\n' \
@@ -860,9 +880,14 @@ class SSEContextManager:
         while True:
             try:
                 retry_count += 1
+                endpoint = self.session.config.endpoint
+                started_at = time.monotonic()
                 raw_resp = await self.reconnect()
+                self.session.config.record_endpoint_latency(
+                    endpoint, time.monotonic() - started_at)
                 return self.response_cls(self.session, raw_resp, connector=self.reconnect)
             except aiohttp.ClientConnectionError as e:
+                self.session.config.record_endpoint_failure(endpoint)
                 if retry_count == max_retries:
                     msg = 'Request to the API endpoint has failed.\n' \
                           'Check your network connection and/or the server status.\n' \
@@ -2,16 +2,20 @@ from __future__ import annotations
 
 import abc
 import asyncio
-from contextvars import Context, ContextVar, copy_context
-import inspect
+import concurrent.futures
+from contextvars import ContextVar
 import threading
+import time
 from typing import (
     Any,
     AsyncIterator,
     Awaitable,
     Coroutine,
     Iterator,
+    List,
     Literal,
+    Optional,
+    Set,
     Tuple,
     Union,
     TypeVar,
@@ -20,21 +24,57 @@ import queue
 import warnings
 
 import aiohttp
+from aiohttp.client import _RequestContextManager
 from multidict import CIMultiDict
-from .config import APIConfig, MIN_API_VERSION, get_config, parse_api_version
+from yarl import URL
+
+from .config import APIConfig, MIN_API_VERSION, get_config, local_cache_path, parse_api_version
 from .exceptions import APIVersionWarning, BackendAPIError, BackendClientError
+from .graphql import QueryBatcher
 from .types import Sentinel, sentinel
+from .versioning import APIVersionCache
 
 
 __all__ = (
     'BaseSession',
     'Session',
     'AsyncSession',
+    'SessionBatch',
     'api_session',
 )
 
 
 api_session: ContextVar[BaseSession] = ContextVar('api_session')
+api_batch: ContextVar[Optional[SessionBatch]] = ContextVar('api_batch', default=None)
+
+
+def _probe_endpoint(
+    http_session: aiohttp.ClientSession,
+    config: APIConfig,
+    endpoint: URL,
+    *,
+    etag: Optional[str] = None,
+) -> _RequestContextManager:
+    timeout_config = aiohttp.ClientTimeout(
+        total=None, connect=None,
+        sock_connect=config.connection_timeout,
+        sock_read=config.read_timeout,
+    )
+    headers = CIMultiDict([
+        ('User-Agent', config.user_agent),
+    ])
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    probe_url = endpoint / 'func/' if config.endpoint_type == 'session' else endpoint
+    return http_session.get(probe_url, timeout=timeout_config, headers=headers)
+
+
+def _get_api_version_cache() -> APIVersionCache:
+    return APIVersionCache(local_cache_path / 'api-versions.json')
+
+
+def _is_api_version_mismatch(status: int, body: str) -> bool:
+    return status == 400 and 'unsupported api' in body.lower()
 
 
 async def _negotiate_api_version(
@@ -42,20 +82,31 @@ async def _negotiate_api_version(
     config: APIConfig,
 ) -> Tuple[int, str]:
     client_version = parse_api_version(config.version)
+    endpoint = config.endpoint
+    version_cache = _get_api_version_cache() if config.api_version_cache_ttl > 0 else None
+    cached = version_cache.get(endpoint) if version_cache is not None else None
+    try:
+        if cached is not None and cached.is_fresh(config.api_version_cache_ttl):
+            return min(parse_api_version(cached.version), client_version)
+    except ValueError:
+        cached = None
     try:
-        timeout_config = aiohttp.ClientTimeout(
-            total=None, connect=None,
-            sock_connect=config.connection_timeout,
-            sock_read=config.read_timeout,
-        )
-        headers = CIMultiDict([
-            ('User-Agent', config.user_agent),
-        ])
-        probe_url = config.endpoint / 'func/' if config.endpoint_type == 'session' else config.endpoint
-        async with http_session.get(probe_url, timeout=timeout_config, headers=headers) as resp:
-            resp.raise_for_status()
-            server_info = await resp.json()
-            server_version = parse_api_version(server_info['version'])
+        async with _probe_endpoint(
+            http_session, config, endpoint,
+            etag=cached.etag if cached is not None else None,
+        ) as resp:
+            if resp.status == 304 and cached is not None:
+                # The server info has not changed since the last negotiation.
+                raw_server_version = cached.version
+                etag = cached.etag
+            else:
+                resp.raise_for_status()
+                server_info = await resp.json()
+                raw_server_version = server_info['version']
+                etag = resp.headers.get('ETag')
+            server_version = parse_api_version(raw_server_version)
+            if version_cache is not None:
+                version_cache.update(endpoint, raw_server_version, etag)
             if server_version > client_version:
                 warnings.warn(
                     "The server API version is higher than the client. "
@@ -76,6 +127,58 @@ async def _negotiate_api_version(
         return client_version
 
 
+async def _refresh_api_version(session: BaseSession) -> None:
+    """
+    Discards the cached API version of the current endpoint and renegotiates it.
+    This is called when the server rejects the API version of our requests.
+    """
+    if session.proxy_mode:
+        return
+    _get_api_version_cache().invalidate(session.config.endpoint)
+    session.api_version = await _negotiate_api_version(session.aiohttp_session, session.config)
+
+
+async def _probe_ejected_endpoints(
+    http_session: aiohttp.ClientSession,
+    config: APIConfig,
+) -> None:
+    circuit_breaker = config.circuit_breaker
+    assert circuit_breaker is not None
+
+    async def _probe(endpoint: URL) -> None:
+        started_at = time.monotonic()
+        try:
+            async with _probe_endpoint(http_session, config, endpoint) as resp:
+                resp.raise_for_status()
+                latency = time.monotonic() - started_at
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            circuit_breaker.record_probe_failure(endpoint)
+        else:
+            # Reset the failures kept by the load balancer as well to route requests
+            # to the reinstated endpoint again.
+            config.record_endpoint_latency(endpoint, latency)
+
+    while True:
+        await asyncio.sleep(circuit_breaker.probe_interval)
+        ejected_endpoints = circuit_breaker.ejected_endpoints
+        if ejected_endpoints:
+            await asyncio.gather(*[_probe(endpoint) for endpoint in ejected_endpoints])
+
+
+def _create_tcp_connector(config: APIConfig) -> aiohttp.TCPConnector:
+    ssl = None
+    if config.skip_sslcert_validation:
+        ssl = False
+    return aiohttp.TCPConnector(
+        ssl=ssl,
+        limit=config.connection_pool_size,
+        limit_per_host=config.connection_pool_size_per_host,
+        keepalive_timeout=config.keepalive_timeout,
+        use_dns_cache=config.dns_cache_ttl > 0,
+        ttl_dns_cache=config.dns_cache_ttl if config.dns_cache_ttl > 0 else None,
+    )
+
+
 async def _close_aiohttp_session(session: aiohttp.ClientSession) -> None:
     # This is a hacky workaround for premature closing of SSL transports
     # on Windows Proactor event loops.
@@ -122,111 +225,274 @@ async def _close_aiohttp_session(session: aiohttp.ClientSession) -> None:
 _Item = TypeVar('_Item')
 
 
+class _GeneratorStream:
+    """
+    The per-call state to relay the items of an async generator
+    running in the worker thread to the caller thread.
+
+    The producer may run ahead of the consumer by up to *prefetch* items
+    and is suspended only when the buffer is full.
+    """
+
+    __slots__ = (
+        'queue',
+        'prefetch',
+        'lock',
+        'resume_event',
+        'producer_waiting',
+        'interrupted',
+    )
+
+    queue: queue.Queue[Union[Any, Exception, Sentinel]]
+    resume_event: Optional[asyncio.Event]
+    producer_waiting: bool
+    interrupted: bool
+
+    def __init__(self, prefetch: int = 1) -> None:
+        if prefetch <= 0:
+            raise ValueError('The prefetch depth must be a positive integer.')
+        self.queue = queue.Queue()
+        self.prefetch = prefetch
+        self.lock = threading.Lock()
+        # The event is created by the producer inside the worker's event loop.
+        self.resume_event = None
+        self.producer_waiting = False
+        self.interrupted = False
+
+    def should_pause_producer(self) -> bool:
+        with self.lock:
+            if self.queue.qsize() < self.prefetch:
+                return False
+            assert self.resume_event is not None
+            self.resume_event.clear()
+            self.producer_waiting = True
+            return True
+
+    def should_resume_producer(self) -> bool:
+        with self.lock:
+            if self.producer_waiting and self.queue.qsize() < self.prefetch:
+                self.producer_waiting = False
+                return True
+            return False
+
+    def resume(self) -> None:
+        if self.resume_event is not None:
+            self.resume_event.set()
+
+
 class _SyncWorkerThread(threading.Thread):
+    """
+    A thread running a persistent event loop to execute the coroutines
+    submitted from the other threads.
+    Multiple threads may submit coroutines concurrently and each submission gets
+    its own future, so that all of them can be in-flight at the same time.
+    """
 
-    work_queue: queue.Queue[Union[
-        Tuple[Union[AsyncIterator, Coroutine], Context],
-        Sentinel,
-    ]]
-    done_queue: queue.Queue[Union[Any, Exception]]
-    stream_queue: queue.Queue[Union[Any, Exception, Sentinel]]
-    stream_block: threading.Event
-    agen_shutdown: bool
+    loop: asyncio.AbstractEventLoop
+    _loop_ready: threading.Event
+    _active_streams: Set[_GeneratorStream]
 
     __slots__ = (
-        'work_queue',
-        'done_queue',
-        'stream_queue',
-        'stream_block',
-        'agen_shutdown',
+        'loop',
+        '_loop_ready',
+        '_active_streams',
     )
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.work_queue = queue.Queue()
-        self.done_queue = queue.Queue()
-        self.stream_queue = queue.Queue()
-        self.stream_block = threading.Event()
-        self.agen_shutdown = False
+        self._loop_ready = threading.Event()
+        self._active_streams = set()
+
+    def start(self) -> None:
+        super().start()
+        self._loop_ready.wait()
 
     def run(self) -> None:
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        self.loop = loop
+        self._loop_ready.set()
         try:
-            while True:
-                item = self.work_queue.get()
-                if item is sentinel:
-                    break
-                coro, ctx = item
-                if inspect.isasyncgen(coro):
-                    ctx.run(loop.run_until_complete,
-                            self.agen_wrapper(coro))
-                else:
-                    try:
-                        # FIXME: Once python/mypy#12756 is resolved, remove the type-ignore tag.
-                        result = ctx.run(loop.run_until_complete, coro)  # type: ignore
-                    except Exception as e:
-                        self.done_queue.put_nowait(e)
-                    else:
-                        self.done_queue.put_nowait(result)
-                self.work_queue.task_done()
+            loop.run_forever()
         except (SystemExit, KeyboardInterrupt):
             pass
         finally:
+            remaining_tasks = asyncio.all_tasks(loop)
+            for task in remaining_tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*remaining_tasks, return_exceptions=True))
             loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.stop()
             loop.close()
 
+    def shutdown(self) -> None:
+        """
+        Stops the event loop, cancelling all pending tasks,
+        and waits until the thread terminates.
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Schedules the given coroutine in the worker thread and returns
+        the future for its result without blocking.
+        The context variables of the caller are preserved when executing it.
+        """
+        # run_coroutine_threadsafe() copies the current context of the caller thread
+        # when scheduling the task.
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
     def execute(self, coro: Coroutine) -> Any:
-        ctx = copy_context()  # preserve context for the worker thread
-        try:
-            self.work_queue.put((coro, ctx))
-            result = self.done_queue.get()
-            self.done_queue.task_done()
-            if isinstance(result, Exception):
-                raise result
-            return result
-        finally:
-            del ctx
+        return self.submit(coro).result()
 
-    async def agen_wrapper(self, agen):
-        self.agen_shutdown = False
+    async def agen_wrapper(self, agen, stream: _GeneratorStream) -> None:
+        stream.resume_event = asyncio.Event()
         try:
             async for item in agen:
-                self.stream_block.clear()
-                self.stream_queue.put(item)
-                # flow-control the generator.
-                self.stream_block.wait()
-                if self.agen_shutdown:
+                stream.queue.put(item)
+                # flow-control the generator when the buffer is full.
+                if stream.should_pause_producer():
+                    await stream.resume_event.wait()
+                if stream.interrupted:
                     break
         except Exception as e:
-            self.stream_queue.put(e)
+            stream.queue.put(e)
         finally:
-            self.stream_queue.put(sentinel)
+            stream.queue.put(sentinel)
             await agen.aclose()
 
-    def execute_generator(self, asyncgen: AsyncIterator[_Item]) -> Iterator[_Item]:
-        ctx = copy_context()  # preserve context for the worker thread
+    def _resume_stream(self, stream: _GeneratorStream) -> None:
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(stream.resume)
+
+    def execute_generator(
+        self,
+        asyncgen: AsyncIterator[_Item],
+        *,
+        prefetch: int = 1,
+    ) -> Iterator[_Item]:
+        stream = _GeneratorStream(prefetch)
+        self._active_streams.add(stream)
+        fut = self.submit(self.agen_wrapper(asyncgen, stream))
         try:
-            self.work_queue.put((asyncgen, ctx))
             while True:
-                item = self.stream_queue.get()
-                try:
-                    if item is sentinel:
-                        break
-                    if isinstance(item, Exception):
-                        raise item
-                    yield item
-                finally:
-                    self.stream_block.set()
-                    self.stream_queue.task_done()
+                item = stream.queue.get()
+                if stream.should_resume_producer():
+                    self._resume_stream(stream)
+                if item is sentinel:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
         finally:
-            del ctx
+            self._active_streams.discard(stream)
+            if not fut.done():
+                # The caller has stopped consuming the generator early.
+                stream.interrupted = True
+                self._resume_stream(stream)
 
     def interrupt_generator(self):
-        self.agen_shutdown = True
-        self.stream_block.set()
-        self.stream_queue.put(sentinel)
+        for stream in [*self._active_streams]:
+            stream.interrupted = True
+            self._resume_stream(stream)
+            stream.queue.put(sentinel)
+
+
+class SessionBatch:
+    """
+    A context manager returned by :meth:`Session.batch()` which collects
+    the API function calls made inside its context and executes them concurrently
+    when exiting the context.
+
+    Inside the context, the API functions return :class:`concurrent.futures.Future`
+    objects instead of their results.  The futures are resolved (with either
+    the results or the raised exceptions) after exiting the context.
+
+    .. code-block:: python3
+
+      with Session() as session:
+          with session.batch(concurrency=32) as batch:
+              futures = [session.KeyPair(ak).info() for ak in access_keys]
+          infos = [f.result() for f in futures]
+
+    Streaming API functions (which return generators) are not batched and
+    executed as usual.
+    """
+
+    __slots__ = (
+        '_session', '_concurrency', '_items', '_context_token',
+    )
+
+    _items: List[Tuple[Coroutine, concurrent.futures.Future]]
+
+    def __init__(self, session: Session, concurrency: int = 32) -> None:
+        if concurrency <= 0:
+            raise ValueError('The batch concurrency must be a positive integer.')
+        self._session = session
+        self._concurrency = concurrency
+        self._items = []
+
+    def add(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Enqueues the given coroutine to be executed when exiting the batch context
+        and returns the future for its result.
+        """
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        self._items.append((coro, fut))
+        return fut
+
+    async def _execute(self) -> None:
+        sema = asyncio.Semaphore(self._concurrency)
+
+        async def _run(coro: Coroutine, fut: concurrent.futures.Future) -> None:
+            try:
+                async with sema:
+                    result = await coro
+            except asyncio.CancelledError:
+                coro.close()  # in case it has not started yet
+                fut.cancel()
+                raise
+            except BaseException as e:
+                fut.set_exception(e)
+                if not isinstance(e, Exception):
+                    raise
+            else:
+                fut.set_result(result)
+
+        tasks = [asyncio.ensure_future(_run(coro, fut)) for coro, fut in self._items]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Resolve all the remaining futures not to leave their waiters hanging.
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def __enter__(self) -> SessionBatch:
+        assert api_batch.get() is None, 'Cannot nest batch contexts'
+        self._context_token = api_batch.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> Literal[False]:
+        api_batch.reset(self._context_token)
+        try:
+            if exc_info[0] is not None:
+                # Discard the collected calls without executing them.
+                for coro, fut in self._items:
+                    coro.close()
+                    fut.cancel()
+            elif self._items:
+                try:
+                    self._session.worker_thread.execute(self._execute())
+                finally:
+                    for coro, fut in self._items:
+                        if not fut.done():
+                            coro.close()
+                            fut.cancel()
+        finally:
+            self._items = []
+        return False
 
 
 class BaseSession(metaclass=abc.ABCMeta):
@@ -235,7 +501,7 @@ class BaseSession(metaclass=abc.ABCMeta):
     """
 
     __slots__ = (
-        '_config', '_closed', '_context_token', '_proxy_mode',
+        '_config', '_closed', '_context_token', '_proxy_mode', '_gql_batcher',
         'aiohttp_session', 'api_version',
         'System', 'Manager', 'Admin',
         'Agent', 'AgentWatcher', 'ScalingGroup', 'Storage',
@@ -254,6 +520,7 @@ class BaseSession(metaclass=abc.ABCMeta):
     _closed: bool
     _config: APIConfig
     _proxy_mode: bool
+    _gql_batcher: Optional[QueryBatcher]
 
     def __init__(
         self, *,
@@ -309,6 +576,17 @@ class BaseSession(metaclass=abc.ABCMeta):
         self.VFolder = VFolder
         self.Dotfile = Dotfile
         self.ServerLog = ServerLog
+        self._gql_batcher = None
+        if self._config.gql_batch_window > 0:
+            self._gql_batcher = QueryBatcher(self._config.gql_batch_window, Admin._execute_gql)
+
+    @property
+    def gql_batcher(self) -> Optional[QueryBatcher]:
+        """
+        The batcher merging the concurrent GraphQL queries, if enabled by the
+        ``gql_batch_window`` configuration.
+        """
+        return self._gql_batcher
 
     @property
     def proxy_mode(self) -> bool:
@@ -363,26 +641,35 @@ class Session(BaseSession):
     A context manager for API client sessions that makes API requests synchronously.
     You may call simple request-response APIs like a plain Python function,
     but cannot use streaming APIs based on WebSocket and Server-Sent Events.
+
+    A session object may be shared by multiple threads.
+    The API function calls from different threads are executed concurrently
+    while sharing the connection pool of the session.
+    Since context variables are not inherited by new threads, the other threads
+    should run the API functions inside a copy of the context where the session is opened
+    (e.g., ``executor.submit(contextvars.copy_context().run, func)``)
+    or set :data:`api_session` by themselves.
     """
 
     __slots__ = (
         '_worker_thread',
+        '_endpoint_probe_future',
     )
 
+    _endpoint_probe_future: Optional[concurrent.futures.Future]
+
     def __init__(
         self, *,
         config: APIConfig = None,
         proxy_mode: bool = False,
     ) -> None:
         super().__init__(config=config, proxy_mode=proxy_mode)
+        self._endpoint_probe_future = None
         self._worker_thread = _SyncWorkerThread()
         self._worker_thread.start()
 
         async def _create_aiohttp_session() -> aiohttp.ClientSession:
-            ssl = None
-            if self._config.skip_sslcert_validation:
-                ssl = False
-            connector = aiohttp.TCPConnector(ssl=ssl)
+            connector = _create_tcp_connector(self._config)
             return aiohttp.ClientSession(connector=connector)
 
         self.aiohttp_session = self.worker_thread.execute(_create_aiohttp_session())
@@ -392,23 +679,37 @@ class Session(BaseSession):
         if not self._proxy_mode:
             self.api_version = self.worker_thread.execute(
                 _negotiate_api_version(self.aiohttp_session, self.config))
+        if len(self.config.endpoints) > 1 and self.config.circuit_breaker is not None:
+            self._endpoint_probe_future = self.worker_thread.submit(
+                _probe_ejected_endpoints(self.aiohttp_session, self.config),
+            )
 
     def close(self) -> None:
         """
         Terminates the session.  It schedules the ``close()`` coroutine
-        of the underlying aiohttp session and then enqueues a sentinel
-        object to indicate termination.  Then it waits until the worker
+        of the underlying aiohttp session and then stops the event loop
+        of the worker thread.  Then it waits until the worker
         thread to self-terminate by joining.
         """
         if self._closed:
             return
         self._closed = True
+        if self._endpoint_probe_future is not None:
+            self._endpoint_probe_future.cancel()
+            self._endpoint_probe_future = None
         self._worker_thread.interrupt_generator()
         self._worker_thread.execute(_close_aiohttp_session(self.aiohttp_session))
-        self._worker_thread.work_queue.put(sentinel)
-        self._worker_thread.join()
+        self._worker_thread.shutdown()
         api_session.reset(self._context_token)
 
+    def batch(self, concurrency: int = 32) -> SessionBatch:
+        """
+        Returns a context manager to execute the API function calls made inside it
+        concurrently, with at most *concurrency* calls running at the same time.
+        See :class:`SessionBatch` for details.
+        """
+        return SessionBatch(self, concurrency)
+
     @property
     def worker_thread(self):
         """
@@ -442,22 +743,30 @@ class AsyncSession(BaseSession):
     WebSocket-based APIs and SSE-based APIs returns special response types.
     """
 
+    __slots__ = (
+        '_endpoint_probe_task',
+    )
+
+    _endpoint_probe_task: Optional[asyncio.Task]
+
     def __init__(
         self, *,
         config: APIConfig = None,
         proxy_mode: bool = False,
     ) -> None:
         super().__init__(config=config, proxy_mode=proxy_mode)
-        ssl = None
-        if self._config.skip_sslcert_validation:
-            ssl = False
-        connector = aiohttp.TCPConnector(ssl=ssl)
+        self._endpoint_probe_task = None
+        connector = _create_tcp_connector(self._config)
         self.aiohttp_session = aiohttp.ClientSession(connector=connector)
 
     async def _aopen(self) -> None:
         self._context_token = api_session.set(self)
         if not self._proxy_mode:
             self.api_version = await _negotiate_api_version(self.aiohttp_session, self.config)
+        if len(self.config.endpoints) > 1 and self.config.circuit_breaker is not None:
+            self._endpoint_probe_task = asyncio.create_task(
+                _probe_ejected_endpoints(self.aiohttp_session, self.config),
+            )
 
     def open(self) -> Awaitable[None]:
         return self._aopen()
@@ -466,6 +775,13 @@ class AsyncSession(BaseSession):
         if self._closed:
             return
         self._closed = True
+        if self._endpoint_probe_task is not None:
+            self._endpoint_probe_task.cancel()
+            try:
+                await self._endpoint_probe_task
+            except asyncio.CancelledError:
+                pass
+            self._endpoint_probe_task = None
         await _close_aiohttp_session(self.aiohttp_session)
         api_session.reset(self._context_token)
 
@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import asyncio
+from asyncio import constants as asyncio_constants
+from collections import deque
+import enum
+import hashlib
+import io
+import json
+import mmap
+import os
+from pathlib import Path
+import tempfile
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+import aiohttp
+from aiohttp.abc import AbstractStreamWriter
+import attr
+
+from .compat import current_loop
+
+__all__ = (
+    'TransferOrder',
+    'BandwidthLimiter',
+    'TransferScheduler',
+    'SyncDirection',
+    'SyncManifestEntry',
+    'SyncManifest',
+    'hash_file',
+    'MmapFileReader',
+    'FileRangePayload',
+)
+
+_Item = TypeVar('_Item')
+
+
+class TransferOrder(str, enum.Enum):
+    """
+    The order to start transferring multiple files.
+    """
+
+    AS_GIVEN = 'as-given'
+    SMALLEST_FIRST = 'smallest-first'
+    LARGEST_FIRST = 'largest-first'
+
+
+class SyncDirection(str, enum.Enum):
+    """
+    The direction to synchronize a local directory and a virtual folder.
+    """
+
+    UPLOAD = 'upload'
+    DOWNLOAD = 'download'
+
+
+class BandwidthLimiter:
+    """
+    Limits the total throughput of the concurrent transfers sharing this limiter
+    using a token bucket which allows a burst of up to one second worth of bytes.
+
+    :param bytes_per_sec: The maximum average number of bytes per second.
+    """
+
+    def __init__(self, bytes_per_sec: int) -> None:
+        if bytes_per_sec <= 0:
+            raise ValueError('The bandwidth limit must be a positive integer.')
+        self.bytes_per_sec = bytes_per_sec
+        # The theoretical time when all bytes consumed so far would have been sent.
+        self._tat = 0.0
+
+    async def consume(self, nbytes: int) -> None:
+        """
+        Waits until the given number of bytes may be transferred under the limit.
+        It should be called for every chunk before or after transferring it.
+        """
+        now = current_loop().time()
+        self._tat = max(self._tat, now) + nbytes / self.bytes_per_sec
+        delay = self._tat - now - 1.0
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TransferScheduler:
+    """
+    Runs the transfers of multiple files concurrently.
+
+    :param jobs: The maximum number of files transferred at the same time.
+    :param max_bytes_per_sec: The limit of the total throughput of all transfers.
+        It must be applied by the transfer functions via :meth:`consume`.
+    :param order: The order to start the transfers.  The sizes of files are used
+        only when the order is not :attr:`TransferOrder.AS_GIVEN`.
+    """
+
+    def __init__(
+        self,
+        jobs: int = 1,
+        *,
+        max_bytes_per_sec: Optional[int] = None,
+        order: TransferOrder = TransferOrder.AS_GIVEN,
+    ) -> None:
+        if jobs <= 0:
+            raise ValueError('The number of concurrent jobs must be a positive integer.')
+        self.jobs = jobs
+        self.order = TransferOrder(order)
+        self.limiter = BandwidthLimiter(max_bytes_per_sec) if max_bytes_per_sec else None
+
+    async def consume(self, nbytes: int) -> None:
+        if self.limiter is not None:
+            await self.limiter.consume(nbytes)
+
+    def sort(
+        self,
+        items: Sequence[_Item],
+        size_of: Callable[[_Item], Optional[int]],
+    ) -> List[_Item]:
+        """
+        Returns the items in the configured order.  The items with unknown sizes
+        are placed at the end.
+        """
+        if self.order == TransferOrder.AS_GIVEN:
+            return [*items]
+        reverse = self.order == TransferOrder.LARGEST_FIRST
+        sizes = {id(item): size_of(item) for item in items}
+        known = [item for item in items if sizes[id(item)] is not None]
+        unknown = [item for item in items if sizes[id(item)] is None]
+        # list.sort() is stable, so ties keep the given order.
+        known.sort(key=lambda item: sizes[id(item)], reverse=reverse)  # type: ignore
+        return known + unknown
+
+    async def run(
+        self,
+        items: Sequence[_Item],
+        transfer: Callable[[_Item], Awaitable[None]],
+    ) -> None:
+        """
+        Transfers the given items in their order with up to *jobs* transfers at the same time.
+        If any transfer fails, the other ongoing transfers are cancelled
+        and the error is re-raised.
+        """
+        queue: Deque[_Item] = deque(items)
+
+        async def _worker() -> None:
+            while queue:
+                await transfer(queue.popleft())
+
+        workers = [
+            asyncio.ensure_future(_worker())
+            for _ in range(min(self.jobs, len(queue)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class SyncManifestEntry:
+    """
+    The state of a file when it was last synchronized.
+    """
+    size: int
+    mtime_ns: int
+    sha256: Optional[str] = None
+    remote_size: Optional[int] = None
+    remote_mtime: Optional[float] = None
+
+
+class SyncManifest:
+    """
+    Keeps the states of the files synchronized between a local directory and
+    a virtual folder in a JSON file, so that the unchanged files are neither
+    transferred nor hashed again.
+
+    Any I/O errors and broken contents of the manifest file are ignored as it is
+    just a cache.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: Dict[str, SyncManifestEntry] = {}
+
+    @classmethod
+    def for_target(
+        cls,
+        cache_dir: Path,
+        local_dir: Path,
+        vfolder: str,
+        remote_path: str,
+    ) -> SyncManifest:
+        """
+        Returns the manifest for synchronizing the given local directory and
+        the path inside the virtual folder.
+        """
+        key = f"{local_dir.resolve()}\0{vfolder}\0{remote_path}".encode('utf-8')
+        return cls(cache_dir / f"{hashlib.sha256(key).hexdigest()[:32]}.json")
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+            self._entries = {
+                relpath: SyncManifestEntry(**entry)
+                for relpath, entry in data['files'].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = {}
+
+    def save(self) -> None:
+        data = {'files': {relpath: attr.asdict(entry) for relpath, entry in self._entries.items()}}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
+    @property
+    def entries(self) -> Mapping[str, SyncManifestEntry]:
+        return self._entries
+
+    def get(self, relpath: str) -> Optional[SyncManifestEntry]:
+        return self._entries.get(relpath)
+
+    def update(self, relpath: str, entry: SyncManifestEntry) -> None:
+        self._entries[relpath] = entry
+
+    def is_unchanged(self, relpath: str, stat: os.stat_result) -> bool:
+        """
+        Checks if the local file has the same size and modification time
+        as it had when last synchronized.
+        """
+        entry = self._entries.get(relpath)
+        return (
+            entry is not None
+            and entry.size == stat.st_size
+            and entry.mtime_ns == stat.st_mtime_ns
+        )
+
+
+def hash_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Returns the SHA-256 digest of the given file in hexadecimal.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class MmapFileReader(io.RawIOBase):
+    """
+    A read-only binary stream of a file backed by a memory map.
+
+    Unlike the ordinary file objects, :meth:`read` and :meth:`view` return
+    :class:`memoryview` slices of the mapped file instead of copying the contents
+    into new :class:`bytes` objects, so that the chunks are handed to the sockets
+    directly from the page cache.  The returned views must be released
+    (e.g., by using them as context managers) before closing the reader.
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._pos = 0
+        self._mmap: Optional[mmap.mmap]
+        if self._size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+        else:
+            # Empty files cannot be mapped.
+            self._mmap = None
+
+    @property
+    def file(self) -> io.BufferedReader:
+        """
+        The underlying file object, to be used with :meth:`loop.sendfile()
+        <asyncio.loop.sendfile>`.
+        """
+        return self._file
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            pos = offset
+        elif whence == os.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == os.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f'Invalid whence ({whence})')
+        if pos < 0:
+            raise ValueError(f'Negative seek position {pos}')
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def view(self, offset: int, length: int) -> memoryview:
+        """
+        Returns a view of the given byte range without copying it.
+        The range is truncated at the end of the file.
+        """
+        if self._mmap is None:
+            return memoryview(b'')
+        end = min(offset + length, self._size)
+        return memoryview(self._mmap)[offset:max(offset, end)]
+
+    def read(self, size: Optional[int] = -1) -> memoryview:  # type: ignore[override]
+        if size is None or size < 0:
+            size = self._size - self._pos
+        chunk = self.view(self._pos, size)
+        self._pos += len(chunk)
+        return chunk
+
+    def readinto(self, buffer: Any) -> int:
+        with self.read(len(buffer)) as chunk:
+            n = len(chunk)
+            buffer[:n] = chunk
+        return n
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._mmap is not None:
+                self._mmap.close()
+        finally:
+            self._file.close()
+            super().close()
+
+
+class FileRangePayload(aiohttp.payload.Payload):
+    """
+    An aiohttp request body which sends a byte range of a file without copying it
+    into the user space.
+
+    If the connection is a plain TCP connection, the range is sent with the
+    ``sendfile()`` system call via :meth:`loop.sendfile() <asyncio.loop.sendfile>`.
+    Otherwise (e.g., over TLS or when ``sendfile()`` is not available),
+    it writes the :class:`memoryview` slices of the memory-mapped file.
+
+    :param reader: The memory-mapped file to send.
+    :param offset: The position of the range in the file.
+    :param length: The number of bytes to send.
+    :param use_sendfile: Set false to always write the memory-mapped slices.
+    """
+
+    # The size of each slice written to the transport, to keep the write buffer small
+    # when sendfile() is not available.
+    write_size = 256 * 1024
+
+    def __init__(
+        self,
+        reader: MmapFileReader,
+        offset: int,
+        length: int,
+        *,
+        use_sendfile: bool = True,
+        **kwargs,
+    ) -> None:
+        kwargs.setdefault('content_type', 'application/offset+octet-stream')
+        super().__init__(reader, **kwargs)
+        self._reader = reader
+        self._offset = offset
+        self._length = max(0, min(length, reader.size - offset))
+        self._size = self._length
+        self._use_sendfile = use_sendfile
+
+    async def _sendfile(self, writer: AbstractStreamWriter) -> bool:
+        transport = getattr(writer, 'transport', None)
+        if (
+            not self._use_sendfile
+            or not hasattr(os, 'sendfile')
+            or transport is None
+            or transport.get_extra_info('sslcontext') is not None
+            # The loop raises RuntimeError for the transports without the native
+            # sendfile() support (e.g., custom or proxied transports), which cannot be
+            # told apart from the other errors such as writing to a closing transport.
+            or getattr(transport, '_sendfile_compatible', None)
+            is not asyncio_constants._SendfileMode.TRY_NATIVE
+        ):
+            return False
+        try:
+            # The buffered headers are flushed before the file contents.
+            await current_loop().sendfile(
+                transport, self._reader.file, self._offset, self._length, fallback=False,
+            )
+        except (NotImplementedError, asyncio.SendfileNotAvailableError):
+            return False
+        return True
+
+    async def write(self, writer: AbstractStreamWriter) -> None:
+        if self._length == 0 or await self._sendfile(writer):
+            return
+        end = self._offset + self._length
+        for pos in range(self._offset, end, self.write_size):
+            with self._reader.view(pos, min(self.write_size, end - pos)) as chunk:
+                await writer.write(chunk)  # type: ignore[arg-type]
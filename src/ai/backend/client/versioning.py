@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
 from typing import (
+    Any,
     Callable,
+    Dict,
+    Optional,
     Sequence,
     Tuple,
     Union,
     TYPE_CHECKING,
 )
 
+import attr
+from yarl import URL
+
 if TYPE_CHECKING:
     from .func.session import ComputeSession
 
@@ -50,3 +61,78 @@ def apply_version_aware_fields(
         else:
             version_aware_fields.append((f[0], f[1]))
     return version_aware_fields
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class CachedAPIVersion:
+    version: str
+    fetched_at: float
+    etag: Optional[str] = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+class APIVersionCache:
+    """
+    A file-backed cache of the server API versions per endpoint URL,
+    which allows skipping the version negotiation round-trip when opening sessions.
+
+    All I/O errors are silently ignored so that a broken or read-only cache
+    directory never prevents making API requests.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return data
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file and replace atomically to tolerate
+            # concurrent invocations of the client.
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.api-versions.')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
+    def get(self, endpoint: URL) -> Optional[CachedAPIVersion]:
+        entry = self._load().get(str(endpoint))
+        if entry is None:
+            return None
+        try:
+            return CachedAPIVersion(
+                version=entry['version'],
+                fetched_at=float(entry['fetched_at']),
+                etag=entry.get('etag'),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def update(self, endpoint: URL, version: str, etag: Optional[str] = None) -> None:
+        data = self._load()
+        data[str(endpoint)] = {
+            'version': version,
+            'fetched_at': time.time(),
+            'etag': etag,
+        }
+        self._save(data)
+
+    def invalidate(self, endpoint: URL) -> None:
+        data = self._load()
+        if data.pop(str(endpoint), None) is not None:
+            self._save(data)
@@ -0,0 +1,124 @@
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator
+from unittest import mock
+
+import pytest
+from aiohttp import web
+from yarl import URL
+
+from ai.backend.client.config import API_VERSION, APIConfig
+from ai.backend.client.session import Session
+from ai.backend.client.test_utils import AsyncMock
+
+pytest.importorskip('pytest_benchmark')
+
+
+def make_payload(num_items: int = 50) -> Dict[str, Any]:
+    """
+    Returns a response body shaped like the typical list queries.
+    """
+    return {
+        'items': [
+            {
+                'id': f'a1b2c3d4-0000-0000-0000-{i:012d}',
+                'name': f'item-{i}',
+                'status': 'RUNNING',
+                'created_at': '2020-01-01T00:00:00+00:00',
+                'occupied_slots': {'cpu': '1', 'mem': '1073741824'},
+                'tags': ['a', 'b', 'c'],
+            }
+            for i in range(num_items)
+        ],
+        'total_count': num_items,
+    }
+
+
+def measure_per_call(func: Callable[[], Any], iterations: int = 200) -> Dict[str, float]:
+    """
+    Measures the average CPU time, the peak size of the memory allocated during
+    a call, and the size of the memory left allocated after a call of *func*.
+    The results are meant to be recorded in the ``extra_info`` of the benchmark
+    so that they are kept in the saved benchmark data.
+    """
+    func()  # warm up the caches
+    gc.collect()
+    cpu_started_at = time.process_time()
+    for _ in range(iterations):
+        func()
+    cpu_time = (time.process_time() - cpu_started_at) / iterations
+    peak_size = 0
+    retained_size = 0
+    for _ in range(iterations):
+        tracemalloc.start()
+        try:
+            func()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_size += peak
+        retained_size += current
+    return {
+        'cpu_time_per_call': cpu_time,
+        'peak_allocated_bytes_per_call': peak_size / iterations,
+        'retained_bytes_per_call': retained_size / iterations,
+    }
+
+
+@pytest.fixture(scope='session')
+def bench_server() -> Iterator[URL]:
+    """
+    Runs a minimal stand-in of the manager API in a separate thread
+    which returns a fixed JSON body for any request.
+    """
+    loop = asyncio.new_event_loop()
+    body = web.json_response(make_payload()).body
+    started = threading.Event()
+    runner_box: Dict[str, Any] = {}
+
+    async def handler(request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(body=body, content_type='application/json')
+
+    async def _start() -> None:
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        runner_box['runner'] = runner
+        runner_box['port'] = runner.addresses[0][1]
+
+    def _run() -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(_start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(runner_box['runner'].cleanup())
+        loop.close()
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+    started.wait()
+    try:
+        yield URL(f"http://127.0.0.1:{runner_box['port']}")
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+@pytest.fixture
+def bench_session(bench_server, defconfig) -> Iterator[Session]:
+    config = APIConfig(
+        endpoint=bench_server,
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+    )
+    mock_nego_func = AsyncMock(return_value=API_VERSION)
+    with mock.patch('ai.backend.client.session._negotiate_api_version', mock_nego_func):
+        with Session(config=config) as session:
+            yield session
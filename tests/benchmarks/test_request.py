@@ -0,0 +1,150 @@
+"""
+Microbenchmarks of the request hot path: building, signing, sending requests
+and parsing their responses.
+
+They are skipped in the default test runs.  Save a baseline on the base commit
+and compare the changes against it on the same machine:
+
+.. code-block:: console
+
+   $ python -m pytest tests/benchmarks --benchmark-only --benchmark-save=baseline
+   $ python -m pytest tests/benchmarks --benchmark-only \\
+       --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Each benchmark also records the average CPU time and memory allocations
+per call in its ``extra_info`` (see :func:`conftest.measure_per_call`).
+"""
+
+from datetime import datetime
+from decimal import Decimal
+import json
+from pathlib import Path
+
+from dateutil.tz import tzutc
+import pytest
+
+from ai.backend.client.auth import generate_signature
+from ai.backend.client.request import ExtendedJSONEncoder, Request
+
+from .conftest import make_payload, measure_per_call
+
+_date = datetime(2020, 1, 1, tzinfo=tzutc())
+
+
+@pytest.mark.benchmark(group='build')
+def test_request_init(benchmark, bench_session):
+
+    def _run():
+        return Request('POST', '/folders', params={'group_id': 'default'})
+
+    benchmark.extra_info.update(measure_per_call(_run))
+    rqst = benchmark(_run)
+    assert rqst.method == 'POST'
+
+
+@pytest.mark.benchmark(group='build')
+def test_request_build_url(benchmark, bench_session):
+    rqst = Request('GET', '/folders', params={'group_id': 'default'})
+    benchmark.extra_info.update(measure_per_call(rqst._build_url))
+    url = benchmark(rqst._build_url)
+    assert url.path.endswith('/folders')
+
+
+@pytest.mark.benchmark(group='build')
+def test_request_set_json(benchmark, bench_session):
+    rqst = Request('POST', '/folders')
+    body = {
+        'name': 'test',
+        'path': Path('/home/work/data'),
+        'quota': Decimal('1.5'),
+        'options': make_payload(10),
+    }
+
+    def _run():
+        rqst.set_json(body)
+
+    benchmark.extra_info.update(measure_per_call(_run))
+    benchmark(_run)
+    assert json.loads(rqst.content)['name'] == 'test'
+
+
+@pytest.mark.benchmark(group='build')
+def test_extended_json_encoder(benchmark):
+    body = make_payload()
+
+    def _run():
+        return json.dumps(body, cls=ExtendedJSONEncoder)
+
+    benchmark.extra_info.update(measure_per_call(_run))
+    assert json.loads(benchmark(_run)) == body
+
+
+@pytest.mark.benchmark(group='sign')
+def test_generate_signature(benchmark, bench_session):
+    config = bench_session.config
+
+    def _run():
+        return generate_signature(
+            method='GET',
+            version='v6.20220315',
+            endpoint=config.endpoint,
+            date=_date,
+            rel_url='/folders?group_id=default',
+            content_type='application/json',
+            access_key=config.access_key,
+            secret_key=config.secret_key,
+            hash_type=config.hash_type,
+        )
+
+    benchmark.extra_info.update(measure_per_call(_run))
+    headers, signature = benchmark(_run)
+    assert signature in headers['Authorization']
+
+
+@pytest.mark.benchmark(group='sign')
+def test_request_sign(benchmark, bench_session):
+    rqst = Request('GET', '/folders', params={'group_id': 'default'})
+    rqst.date = _date
+    rel_url = rqst._build_url().relative()
+
+    def _run():
+        rqst._sign(rel_url)
+
+    benchmark.extra_info.update(measure_per_call(_run))
+    benchmark(_run)
+    assert 'Authorization' in rqst.headers
+
+
+@pytest.mark.benchmark(group='roundtrip')
+def test_fetch_json_roundtrip(benchmark, bench_session):
+
+    async def _fetch():
+        rqst = Request('GET', '/folders', params={'group_id': 'default'})
+        async with rqst.fetch() as resp:
+            return await resp.json()
+
+    def _run():
+        return bench_session.worker_thread.execute(_fetch())
+
+    benchmark.extra_info.update(measure_per_call(_run, iterations=50))
+    result = benchmark(_run)
+    assert result['total_count'] == 50
+
+
+@pytest.mark.benchmark(group='parse')
+def test_response_json(benchmark, bench_session):
+
+    async def _fetch():
+        rqst = Request('GET', '/folders')
+        async with rqst.fetch() as resp:
+            await resp.raw_response.read()  # let aiohttp cache the body
+            return resp
+
+    resp = bench_session.worker_thread.execute(_fetch())
+
+    def _run():
+        return bench_session.worker_thread.execute(resp.json())
+
+    benchmark.extra_info.update(measure_per_call(_run))
+    result = benchmark(_run)
+    assert result == make_payload()
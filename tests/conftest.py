@@ -5,6 +5,13 @@ import pytest
 from ai.backend.client.config import APIConfig, set_config
 
 
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # The benchmarks are run only when explicitly requested with --benchmark-only.
+    if config.pluginmanager.hasplugin('benchmark') and not config.getoption('benchmark_only'):
+        config.option.benchmark_skip = True
+
+
 @pytest.fixture(autouse=True)
 def defconfig():
     endpoint = os.environ.get('BACKEND_TEST_ENDPOINT', 'http://127.0.0.1:8081')
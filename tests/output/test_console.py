@@ -0,0 +1,50 @@
+import sys
+from unittest import mock
+
+import pytest
+
+from ai.backend.client.config import API_VERSION
+from ai.backend.client.output.console import ConsoleOutputHandler
+from ai.backend.client.output.fields import user_fields
+from ai.backend.client.session import Session
+from ai.backend.client.test_utils import AsyncMock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def api_version():
+    mock_nego_func = AsyncMock()
+    mock_nego_func.return_value = API_VERSION
+    with mock.patch('ai.backend.client.session._negotiate_api_version', mock_nego_func):
+        yield
+
+
+def test_print_paginated_list_with_pager(capsys):
+    requested_offsets = []
+
+    async def _query(query, variables):
+        offset, limit = variables['offset'], variables['limit']
+        requested_offsets.append(offset)
+        return {'user_list': {
+            'items': [{'email': f'user{i}@example.com'} for i in range(offset, min(offset + limit, 5))],
+            'total_count': 5,
+        }}
+
+    output = ConsoleOutputHandler(mock.MagicMock())
+    with Session() as session, \
+         mock.patch.object(session.Admin, '_query', _query), \
+         mock.patch.object(sys.stdout, 'isatty', return_value=True), \
+         mock.patch('ai.backend.client.output.console.get_preferred_page_size', return_value=2):
+        # The following pages are fetched in a background thread,
+        # which must see the current API session.
+        output.print_paginated_list(
+            lambda pg_offset, pg_size: session.User.paginated_list(
+                fields=[user_fields['email']],
+                page_offset=pg_offset,
+                page_size=pg_size,
+            ),
+            initial_page_offset=0,
+        )
+    assert requested_offsets == [0, 2, 4]
+    out = capsys.readouterr().out
+    for i in range(5):
+        assert f'user{i}@example.com' in out
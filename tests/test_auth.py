@@ -1,8 +1,9 @@
 from datetime import datetime
+import hmac
 
 from dateutil.tz import tzutc
 
-from ai.backend.client.auth import generate_signature
+from ai.backend.client.auth import _signing_key_cache, generate_signature
 
 
 def test_generate_signature(defconfig):
@@ -22,3 +23,35 @@ def test_generate_signature(defconfig):
     assert kwargs['hash_type'].upper() in headers['Authorization']
     assert kwargs['access_key'] in headers['Authorization']
     assert signature in headers['Authorization']
+
+
+def test_generate_signature_with_cached_signing_key(defconfig):
+    kwargs = dict(
+        method='GET',
+        version=defconfig.version,
+        endpoint=defconfig.endpoint,
+        date=datetime(2020, 1, 1, tzinfo=tzutc()),
+        rel_url='/path/to/api/',
+        content_type='plain/text',
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        hash_type='sha256',
+    )
+    _signing_key_cache.clear()
+    _, signature = generate_signature(**kwargs)
+    assert len(_signing_key_cache) == 1
+    assert defconfig.secret_key.encode() not in next(iter(_signing_key_cache))
+
+    # The cached key must produce the same signature.
+    _, cached_signature = generate_signature(**kwargs)
+    assert cached_signature == signature
+    assert len(_signing_key_cache) == 1
+
+    sign_key = hmac.new(defconfig.secret_key.encode(), b'20200101', 'sha256').digest()
+    sign_key = hmac.new(sign_key, defconfig.endpoint._val.netloc.encode(), 'sha256').digest()
+    assert _signing_key_cache[next(iter(_signing_key_cache))] == sign_key
+
+    # A different secret key must not hit the cache.
+    _, other_signature = generate_signature(**{**kwargs, 'secret_key': 'other'})
+    assert other_signature != signature
+    assert len(_signing_key_cache) == 2
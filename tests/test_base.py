@@ -1,11 +1,14 @@
 import asyncio
+import concurrent.futures
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import pytest
 
-from ai.backend.client.config import API_VERSION
+from ai.backend.client.config import API_VERSION, APIConfig
 from ai.backend.client.func.base import BaseFunction, api_function
-from ai.backend.client.session import Session, AsyncSession
+from ai.backend.client.session import Session, AsyncSession, api_session
 from ai.backend.client.test_utils import AsyncMock
 
 
@@ -97,3 +100,131 @@ async def test_api_function_metaclass_async():
         assert await Dummy().calculate() == 'done'
         assert await Dummy.get_or_create() == 'created'
         assert await Dummy().calculate() == 'done'
+
+
+def test_api_function_batch():
+
+    class BatchDummy(BaseFunction):
+
+        running = 0
+        max_running = 0
+
+        @api_function
+        @classmethod
+        async def work(cls, value):
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+            await asyncio.sleep(0.01)
+            cls.running -= 1
+            if value < 0:
+                raise ValueError('negative')
+            return value * 2
+
+        @api_function
+        @classmethod
+        async def cancel_self(cls):
+            await asyncio.sleep(0)
+            raise asyncio.CancelledError
+
+    with Session() as session:
+        with session.batch(concurrency=4):
+            futures = [BatchDummy.work(i) for i in range(10)]
+            failed = BatchDummy.work(-1)
+            assert not any(f.done() for f in futures)
+        assert [f.result() for f in futures] == [i * 2 for i in range(10)]
+        with pytest.raises(ValueError):
+            failed.result()
+        assert BatchDummy.max_running == 4
+
+        # outside of the batch context, API functions return results directly.
+        assert BatchDummy.work(1) == 2
+
+        with pytest.raises(RuntimeError):
+            with session.batch():
+                future = BatchDummy.work(1)
+                raise RuntimeError
+        assert future.cancelled()
+
+        # The cancellation of a call cancels the remaining calls instead of
+        # leaving their futures pending.
+        BatchDummy.running = 0
+        with pytest.raises(concurrent.futures.CancelledError):
+            with session.batch(concurrency=2):
+                cancelled = BatchDummy.cancel_self()
+                futures = [BatchDummy.work(i) for i in range(4)]
+        assert cancelled.cancelled()
+        assert all(f.done() for f in futures)
+        assert any(f.cancelled() for f in futures)
+
+
+def test_api_function_concurrent_threads():
+
+    class ThreadDummy(BaseFunction):
+
+        running = 0
+        max_running = 0
+
+        @api_function
+        @classmethod
+        async def echo(cls, value):
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+            await asyncio.sleep(0.02)
+            cls.running -= 1
+            return value
+
+        @api_function
+        @classmethod
+        async def stream(cls, count):
+            for i in range(count):
+                await asyncio.sleep(0)
+                yield i
+
+    with Session() as session:
+
+        def _call(value):
+            # Each thread needs to see the same session.
+            token = api_session.set(session)
+            try:
+                return ThreadDummy.echo(value)
+            finally:
+                api_session.reset(token)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(_call, range(32)))
+        assert results == list(range(32))
+        assert ThreadDummy.max_running > 1
+
+        assert list(ThreadDummy.stream(5)) == [0, 1, 2, 3, 4]
+        gen = ThreadDummy.stream(100)
+        assert next(gen) == 0
+        assert next(gen) == 1
+        gen.close()
+        # The session still works after closing a generator early.
+        assert ThreadDummy.echo('ok') == 'ok'
+
+
+@pytest.mark.parametrize('prefetch', [1, 4])
+def test_api_function_stream_prefetch(prefetch):
+
+    class StreamDummy(BaseFunction):
+
+        produced = 0
+
+        @api_function
+        @classmethod
+        async def stream(cls, count):
+            for i in range(count):
+                cls.produced += 1
+                yield i
+
+    config = APIConfig(stream_prefetch_depth=prefetch)
+    with Session(config=config) as session:
+        assert session.config.stream_prefetch_depth == prefetch
+        gen = StreamDummy.stream(100)
+        assert next(gen) == 0
+        time.sleep(0.05)
+        # The producer runs ahead of the consumer only up to the prefetch depth.
+        assert prefetch <= StreamDummy.produced <= prefetch + 1
+        assert list(gen) == list(range(1, 100))
+        assert StreamDummy.produced == 100
@@ -0,0 +1,99 @@
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from decimal import Decimal
+import enum
+import json
+from pathlib import Path
+import uuid
+
+import pytest
+
+from ai.backend.client import codec
+from ai.backend.client.codec import JSONCodec, OrjsonCodec, StdlibJSONCodec, UjsonCodec
+
+available_codecs = [
+    pytest.param(
+        cls,
+        marks=pytest.mark.skipif(not cls.is_available(), reason=f'{cls.name} is not installed'),
+    )
+    for cls in (StdlibJSONCodec, OrjsonCodec, UjsonCodec)
+]
+
+
+def test_load_codec(mocker):
+    assert isinstance(JSONCodec.load('stdlib'), StdlibJSONCodec)
+    with pytest.raises(ValueError):
+        JSONCodec.load('unknown')
+    mocker.patch.object(codec, 'orjson', None)
+    mocker.patch.object(codec, 'ujson', None)
+    assert isinstance(JSONCodec.load('auto'), StdlibJSONCodec)
+    with pytest.raises(ValueError):
+        JSONCodec.load('orjson')
+
+
+@pytest.mark.parametrize('codec_cls', available_codecs)
+def test_codec_roundtrip(codec_cls):
+    c = codec_cls()
+    value = {
+        'name': 'test',
+        'path': Path('/home/work'),
+        'amount': Decimal('1.5'),
+        'items': [1, 2.5, None, True, '한글', (Decimal('1.10'),)],
+    }
+    encoded = c.dumps(value)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == {
+        'name': 'test',
+        'path': '/home/work',
+        'amount': '1.5',
+        'items': [1, 2.5, None, True, '한글', ['1.10']],
+    }
+    with pytest.raises(TypeError):
+        c.dumps({'x': object()})
+
+    decoded = c.loads('{"b": {"y": 1, "x": 2}, "a": [{"k": 3}]}')
+    assert decoded == {'b': {'y': 1, 'x': 2}, 'a': [{'k': 3}]}
+    assert type(decoded) is dict
+    decoded = c.loads(b'{"b": {"y": 1, "x": 2}, "a": [{"k": 3}]}', ordered=True)
+    assert isinstance(decoded, OrderedDict)
+    assert isinstance(decoded['b'], OrderedDict)
+    assert isinstance(decoded['a'][0], OrderedDict)
+    assert [*decoded.keys()] == ['b', 'a']
+
+
+class _Color(str, enum.Enum):
+    RED = 'red'
+
+
+class _Level(enum.IntEnum):
+    HIGH = 2
+
+
+_Point = namedtuple('_Point', 'x y')
+
+
+@pytest.mark.parametrize('codec_cls', available_codecs)
+@pytest.mark.parametrize('payload', [
+    {'point': _Point(1, Decimal('2.50')), 'nested': ((1, 2), [Path('a/b')])},
+    {1: 'int', 2.5: 'float', False: 'bool', None: 'none', 'str': 'str'},
+    {'color': _Color.RED, 'level': _Level.HIGH, _Color.RED: 1, _Level.HIGH: 2},
+    [2**62, -1.25e-10, '', '\u0000 "quoted" 한글'],
+])
+def test_codec_parity(codec_cls, payload):
+    expected = json.loads(StdlibJSONCodec().dumps(payload))
+    assert json.loads(codec_cls().dumps(payload)) == expected
+
+
+@pytest.mark.parametrize('codec_cls', available_codecs)
+@pytest.mark.parametrize('payload', [
+    {'id': uuid.uuid4()},
+    {'at': datetime(2020, 1, 1)},
+    {'items': {1, 2}},
+    {(1, 2): 'tuple key'},
+    [object()],
+])
+def test_codec_parity_unsupported(codec_cls, payload):
+    with pytest.raises(TypeError):
+        StdlibJSONCodec().dumps(payload)
+    with pytest.raises(TypeError):
+        codec_cls().dumps(payload)
@@ -4,9 +4,14 @@ from unittest import mock
 import pytest
 from yarl import URL
 
+from ai.backend.client.codec import StdlibJSONCodec
 from ai.backend.client.config import (
     get_env, bool_env, APIConfig, get_config, set_config,
 )
+from ai.backend.client.load_balancing import (
+    PeriodicRRLoadBalancer,
+    SimpleRRLoadBalancer,
+)
 
 
 @pytest.fixture
@@ -116,3 +121,88 @@ def test_get_config_return_default_config_when_config_is_none(mocker, cfg_params
     assert cfg.version == APIConfig.DEFAULTS['version']
     assert cfg.access_key == cfg_params['access_key']
     assert cfg.secret_key == cfg_params['secret_key']
+
+
+def test_load_balancer_config(cfg_params):
+    cfg = APIConfig(**cfg_params)
+    assert cfg.load_balancer is None
+    cfg = APIConfig(**cfg_params, load_balancer='simple_rr')
+    assert isinstance(cfg.load_balancer, SimpleRRLoadBalancer)
+    lb = SimpleRRLoadBalancer()
+    cfg = APIConfig(**cfg_params, load_balancer=lb)
+    assert cfg.load_balancer is lb
+    with mock.patch.dict(os.environ, {'BACKEND_LOAD_BALANCER': 'periodic_rr:30'}):
+        cfg = APIConfig(**cfg_params)
+        assert isinstance(cfg.load_balancer, PeriodicRRLoadBalancer)
+        assert cfg.load_balancer.interval == 30.0
+    with pytest.raises(ValueError):
+        APIConfig(**cfg_params, load_balancer='no_such_policy')
+
+
+def test_ejected_endpoints_are_demoted(cfg_params):
+    cfg_params = {
+        **cfg_params,
+        'endpoint': 'http://127.0.0.1:8081,http://127.0.0.2:8081,http://127.0.0.3:8081',
+    }
+    cfg = APIConfig(**cfg_params, endpoint_failure_threshold=1)
+    a, b, c = cfg.endpoints
+    cfg.record_endpoint_failure(a)
+    cfg.load_balance_endpoints()
+    assert cfg.endpoints == [b, c, a]
+    cfg.record_endpoint_failure(b)
+    cfg.rotate_endpoints()
+    assert cfg.endpoints == [c, a, b]
+    # if all endpoints are ejected, keep the current order.
+    cfg.record_endpoint_failure(c)
+    cfg.load_balance_endpoints()
+    assert cfg.endpoints == [c, a, b]
+    cfg.record_endpoint_latency(a, 0.1)
+    cfg.load_balance_endpoints()
+    assert cfg.endpoints == [a, c, b]
+
+    cfg = APIConfig(**cfg_params, endpoint_failure_threshold=0)
+    assert cfg.circuit_breaker is None
+
+
+def test_connection_pool_config(cfg_params):
+    cfg = APIConfig(**cfg_params)
+    assert cfg.connection_pool_size == 100
+    assert cfg.connection_pool_size_per_host == 0
+    assert cfg.keepalive_timeout == 15.0
+    assert cfg.dns_cache_ttl == 10
+    with mock.patch.dict(os.environ, {
+        'BACKEND_CONNECTION_POOL_SIZE': '32',
+        'BACKEND_CONNECTION_POOL_SIZE_PER_HOST': '8',
+        'BACKEND_KEEPALIVE_TIMEOUT': '60',
+        'BACKEND_DNS_CACHE_TTL': '0',
+    }):
+        cfg = APIConfig(**cfg_params)
+        assert cfg.connection_pool_size == 32
+        assert cfg.connection_pool_size_per_host == 8
+        assert cfg.keepalive_timeout == 60.0
+        assert cfg.dns_cache_ttl == 0
+    cfg = APIConfig(**cfg_params, connection_pool_size=4, dns_cache_ttl=300)
+    assert cfg.connection_pool_size == 4
+    assert cfg.dns_cache_ttl == 300
+
+
+def test_json_codec_config(cfg_params):
+    cfg = APIConfig(**cfg_params)
+    assert cfg.json_ordered_dict
+    with mock.patch.dict(os.environ, {
+        'BACKEND_JSON_CODEC': 'stdlib',
+        'BACKEND_JSON_ORDERED_DICT': 'no',
+    }):
+        cfg = APIConfig(**cfg_params)
+        assert isinstance(cfg.json_codec, StdlibJSONCodec)
+        assert not cfg.json_ordered_dict
+    with pytest.raises(ValueError):
+        APIConfig(**cfg_params, json_codec='unknown')
+
+
+def test_gql_persisted_queries_config(cfg_params):
+    cfg = APIConfig(**cfg_params)
+    assert not cfg.gql_persisted_queries
+    with mock.patch.dict(os.environ, {'BACKEND_GQL_PERSISTED_QUERIES': 'yes'}):
+        cfg = APIConfig(**cfg_params)
+        assert cfg.gql_persisted_queries
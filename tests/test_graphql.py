@@ -0,0 +1,181 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+from aioresponses import aioresponses, CallbackResult
+
+from ai.backend.client.config import API_VERSION, APIConfig
+from ai.backend.client.exceptions import BackendAPIError
+from ai.backend.client.graphql import build_query, get_query_hash
+from ai.backend.client.output.fields import user_fields
+from ai.backend.client.session import AsyncSession
+from ai.backend.client.test_utils import AsyncMock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def api_version():
+    mock_nego_func = AsyncMock()
+    mock_nego_func.return_value = API_VERSION
+    with mock.patch('ai.backend.client.session._negotiate_api_version', mock_nego_func):
+        yield
+
+
+def test_build_query():
+    template = '''
+        query($email: String) {
+            # fetch a user
+            user(email: $email) { $fields }
+            domain(name: "two  spaces") { $domain_fields }
+        }
+    '''
+    fields = [user_fields['email'], user_fields['groups']]
+    query = build_query(template, fields, domain_fields='name')
+    assert query == (
+        'query($email: String) { user(email: $email) { email groups { id name } } '
+        'domain(name: "two  spaces") { name } }'
+    )
+    # The same document object is reused for the same template and fields.
+    assert build_query(template, [*fields], domain_fields='name') is query
+    assert build_query(template, ['email', 'groups { id name }'], domain_fields='name') is query
+    assert build_query(template, fields[:1], domain_fields='name') != query
+
+
+@pytest.mark.asyncio
+async def test_persisted_query(defconfig):
+    config = APIConfig(
+        endpoint=defconfig.endpoint,
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        gql_persisted_queries=True,
+    )
+    query = build_query('query { user { $fields } }', [user_fields['email']])
+    sent = []
+    registered = set()
+
+    def _gql(url, **kwargs):
+        body = json.loads(kwargs['data'])
+        sent.append(body)
+        query_hash = body['extensions']['persistedQuery']['sha256Hash']
+        if 'query' in body:
+            registered.add(query_hash)
+        elif query_hash not in registered:
+            return CallbackResult(status=200, payload={
+                'errors': [{
+                    'message': 'PersistedQueryNotFound',
+                    'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'},
+                }],
+            })
+        return CallbackResult(status=200, payload={'data': {'user': {'email': 'a@b.c'}}})
+
+    async with AsyncSession(config=config) as session:
+        with aioresponses() as m:
+            m.post(config.endpoint / 'admin/gql', callback=_gql, repeat=True)
+            assert await session.Admin._query(query) == {'user': {'email': 'a@b.c'}}
+            assert await session.Admin._query(query) == {'user': {'email': 'a@b.c'}}
+    assert [('query' in body) for body in sent] == [False, True, False]
+    assert sent[0]['extensions']['persistedQuery'] == {
+        'version': 1,
+        'sha256Hash': get_query_hash(query),
+    }
+    assert sent[1]['query'] == query
+
+
+@pytest.mark.asyncio
+async def test_query_batching(defconfig):
+    config = APIConfig(
+        endpoint=defconfig.endpoint,
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        gql_batch_window=0.01,
+    )
+    sent = []
+
+    def _gql(url, **kwargs):
+        body = json.loads(kwargs['data'])
+        sent.append(body)
+        if len(sent) > 1:
+            # Individual resends after a document-level failure are not expected here.
+            raise AssertionError('unexpected request')
+        assert body['variables'] == {'b0_status': 'ALIVE', 'b0_limit': 10, 'b1_email': 'a@b.c'}
+        return CallbackResult(status=200, payload={
+            'data': {
+                'b0_agent_list': {'total_count': 1},
+                'b0_n': 2.5,
+                'b1_user': None,
+                'b2_domains': [{'name': 'default'}],
+            },
+            'errors': [{'message': 'No such user', 'path': ['b1_user']}],
+        })
+
+    async with AsyncSession(config=config) as session:
+        with aioresponses() as m:
+            m.post(config.endpoint / 'admin/gql', callback=_gql, repeat=True)
+            results = await asyncio.gather(
+                session.Admin._query(
+                    'query Agents($status: String, $limit: Int!) { '
+                    'agent_list(status: $status, limit: $limit, offset: -1) { total_count } '
+                    'n: ratio(x: 1.5e3, f: "a $b") }',
+                    {'status': 'ALIVE', 'limit': 10},
+                ),
+                session.Admin._query(
+                    'query($email: String) { user(email: $email) { email } }',
+                    {'email': 'a@b.c'},
+                ),
+                session.Admin._query('{ domains { name } }'),
+                return_exceptions=True,
+            )
+    assert len(sent) == 1
+    assert sent[0]['query'] == (
+        'query($b0_status : String , $b0_limit : Int !, $b1_email : String) { '
+        'b0_agent_list: agent_list ( status : $b0_status , limit : $b0_limit , offset : -1 ) '
+        '{ total_count } b0_n: ratio ( x : 1.5e3 , f : "a $b" ) '
+        'b1_user: user ( email : $b1_email ) { email } '
+        'b2_domains: domains { name } }'
+    )
+    assert results[0] == {'agent_list': {'total_count': 1}, 'n': 2.5}
+    assert isinstance(results[1], BackendAPIError)
+    assert results[1].data['data'] == [{'message': 'No such user', 'path': ['user']}]
+    assert results[2] == {'domains': [{'name': 'default'}]}
+
+
+@pytest.mark.asyncio
+async def test_query_batching_fallback(defconfig):
+    config = APIConfig(
+        endpoint=defconfig.endpoint,
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        gql_batch_window=0.01,
+    )
+    sent = []
+
+    def _gql(url, **kwargs):
+        query = json.loads(kwargs['data'])['query']
+        sent.append(query)
+        if 'invalid_field' in query:
+            return CallbackResult(status=200, payload={
+                'data': None,
+                'errors': [{'message': 'Cannot query field "invalid_field"'}],
+            })
+        return CallbackResult(status=200, payload={'data': {'domains': []}})
+
+    async with AsyncSession(config=config) as session:
+        with aioresponses() as m:
+            m.post(config.endpoint / 'admin/gql', callback=_gql, repeat=True)
+            results = await asyncio.gather(
+                session.Admin._query('query { domains { name } }'),
+                session.Admin._query('query { invalid_field }'),
+                # Mutations are not merged.
+                session.Admin._query('mutation { domains { name } }'),
+                return_exceptions=True,
+            )
+    assert results[0] == {'domains': []}
+    assert isinstance(results[1], BackendAPIError)
+    assert results[2] == {'domains': []}
+    # The failed batch is resent as the individual queries.
+    assert sorted(sent) == sorted([
+        'mutation { domains { name } }',
+        'query { b0_domains: domains { name } b1_invalid_field: invalid_field }',
+        'query { domains { name } }',
+        'query { invalid_field }',
+    ])
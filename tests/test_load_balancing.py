@@ -0,0 +1,209 @@
+from unittest import mock
+
+import pytest
+from yarl import URL
+
+from ai.backend.client.load_balancing import (
+    EndpointCircuitBreaker,
+    LatencyStats,
+    LoadBalancer,
+    LoadBalancerConfig,
+    LowestLatencyLoadBalancer,
+    PeriodicRRLoadBalancer,
+    SimpleRRLoadBalancer,
+)
+
+
+def test_clean_config():
+    assert LoadBalancer.clean_config('simple_rr') == LoadBalancerConfig('simple_rr', ())
+    assert LoadBalancer.clean_config('periodic_rr:30') == LoadBalancerConfig('periodic_rr', ('30',))
+    assert LoadBalancer.clean_config('lowest_latency:50, 0.2') == \
+        LoadBalancerConfig('lowest_latency', ('50', '0.2'))
+    assert isinstance(LoadBalancer.load(LoadBalancer.clean_config('simple_rr')), SimpleRRLoadBalancer)
+    lb = LoadBalancer.load(LoadBalancer.clean_config('periodic_rr:30'))
+    assert isinstance(lb, PeriodicRRLoadBalancer)
+    assert lb.interval == 30.0
+    with pytest.raises(ValueError):
+        LoadBalancer.load(LoadBalancer.clean_config('unknown'))
+
+
+def test_latency_stats():
+    stats = LatencyStats(window_size=4, alpha=0.5)
+    assert stats.ewma is None
+    assert stats.p50 is None
+    stats.add_sample(1.0)
+    assert stats.ewma == 1.0
+    stats.add_sample(3.0)
+    assert stats.ewma == 2.0
+    for v in (0.1, 0.2, 0.3, 0.4):
+        stats.add_sample(v)
+    # only the last 4 samples are kept in the window.
+    assert stats.count == 4
+    assert stats.p50 == 0.2
+    assert stats.p99 == 0.4
+    stats.add_failure()
+    stats.add_failure()
+    assert not stats.healthy
+    stats.add_sample(0.1)
+    assert stats.healthy
+
+
+def test_simple_rr():
+    endpoints = [URL('http://a'), URL('http://b'), URL('http://c')]
+    lb = SimpleRRLoadBalancer()
+    lb.rotate(endpoints)
+    assert endpoints == [URL('http://b'), URL('http://c'), URL('http://a')]
+
+
+def test_periodic_rr():
+    endpoints = [URL('http://a'), URL('http://b')]
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=100.0):
+        lb = PeriodicRRLoadBalancer('10')
+        lb.rotate(endpoints)
+    assert endpoints == [URL('http://a'), URL('http://b')]
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=110.0):
+        lb.rotate(endpoints)
+        assert endpoints == [URL('http://b'), URL('http://a')]
+        lb.rotate(endpoints)
+        assert endpoints == [URL('http://b'), URL('http://a')]
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=121.0):
+        lb.rotate(endpoints)
+    assert endpoints == [URL('http://a'), URL('http://b')]
+
+
+def test_lowest_latency():
+    a, b, c = URL('http://a'), URL('http://b'), URL('http://c')
+    endpoints = [a, b, c]
+    lb = LowestLatencyLoadBalancer(window_size='10', alpha='1.0')
+    lb.record_latency(a, 0.5)
+    lb.record_latency(b, 0.1)
+    lb.rotate(endpoints)
+    # unmeasured endpoints are tried first.
+    assert endpoints == [c, b, a]
+    lb.record_latency(c, 0.3)
+    lb.rotate(endpoints)
+    assert endpoints == [b, c, a]
+    # failing endpoints are pushed back.
+    lb.record_failure(b)
+    lb.rotate(endpoints)
+    assert endpoints == [c, a, b]
+    lb.record_latency(b, 0.05)
+    lb.rotate(endpoints)
+    assert endpoints == [b, c, a]
+    assert lb.stats[b].healthy
+
+
+def test_lowest_latency_metric():
+    a, b = URL('http://a'), URL('http://b')
+    lb = LowestLatencyLoadBalancer(window_size='10', alpha='0.9', metric='p99', explore_interval='0')
+    for v in (2.0, 0.1, 0.1, 0.1):
+        lb.record_latency(a, v)
+    for v in (0.3, 0.3, 0.3, 0.3):
+        lb.record_latency(b, v)
+    endpoints = [a, b]
+    lb.rotate(endpoints)
+    # a has the lower EWMA but the higher tail latency.
+    assert lb.stats[a].ewma < lb.stats[b].ewma
+    assert endpoints == [b, a]
+
+
+def test_lowest_latency_exploration():
+    a, b, c = URL('http://a'), URL('http://b'), URL('http://c')
+    endpoints = [a, b, c]
+    lb = LowestLatencyLoadBalancer(window_size='10', alpha='1.0', explore_interval='3')
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=100.0):
+        lb.record_failure(b)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=101.0):
+        lb.record_latency(c, 0.5)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=102.0):
+        lb.record_latency(a, 0.1)
+    lb.rotate(endpoints)
+    assert endpoints == [a, c, b]
+    lb.rotate(endpoints)
+    assert endpoints == [a, c, b]
+    # The endpoint measured least recently gets a request again.
+    lb.rotate(endpoints)
+    assert endpoints == [b, a, c]
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=103.0):
+        lb.record_latency(b, 0.05)
+    lb.rotate(endpoints)
+    assert endpoints == [b, a, c]
+    lb.rotate(endpoints)
+    lb.rotate(endpoints)
+    # The slow endpoint is also re-measured, and it has become faster.
+    assert endpoints == [c, b, a]
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=104.0):
+        lb.record_latency(c, 0.01)
+    lb.rotate(endpoints)
+    assert endpoints == [c, b, a]
+
+
+def test_lowest_latency_invalid_args():
+    with pytest.raises(ValueError):
+        LowestLatencyLoadBalancer(window_size=0)
+    with pytest.raises(ValueError):
+        LowestLatencyLoadBalancer(alpha=0)
+    with pytest.raises(ValueError):
+        LowestLatencyLoadBalancer(metric='p90')
+    with pytest.raises(ValueError):
+        LowestLatencyLoadBalancer(explore_interval=-1)
+
+
+def test_circuit_breaker():
+    a = URL('http://a')
+    cb = EndpointCircuitBreaker(failure_threshold=2, ejection_period=10, max_ejection_period=25)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=100.0):
+        cb.record_failure(a)
+        assert not cb.is_ejected(a)
+        cb.record_failure(a)
+        assert cb.is_ejected(a)
+        assert cb.ejected_endpoints == [a]
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=110.0):
+        # half-open after the ejection period
+        assert not cb.is_ejected(a)
+        assert cb.ejected_endpoints == [a]
+        cb.record_failure(a)
+        assert cb.is_ejected(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=129.0):
+        assert cb.is_ejected(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=130.0):
+        assert not cb.is_ejected(a)
+        cb.record_failure(a)
+    # the period is capped by max_ejection_period
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=154.0):
+        assert cb.is_ejected(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=155.0):
+        assert not cb.is_ejected(a)
+    cb.record_success(a)
+    assert cb.ejected_endpoints == []
+    cb.record_failure(a)
+    assert not cb.is_ejected(a)
+
+
+def test_circuit_breaker_probe_failure():
+    a = URL('http://a')
+    cb = EndpointCircuitBreaker(failure_threshold=1, ejection_period=10, probe_interval=5)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=100.0):
+        cb.record_failure(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=105.0):
+        # A failed probe within the ejection period does not extend it.
+        cb.record_probe_failure(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=110.0):
+        assert not cb.is_ejected(a)
+        # A failed probe after the ejection period keeps it ejected until the next probe
+        # without doubling the period.
+        cb.record_probe_failure(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=114.0):
+        assert cb.is_ejected(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=115.0):
+        assert not cb.is_ejected(a)
+        cb.record_failure(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=134.0):
+        # The next failure of an actual request doubles the initial period only once.
+        assert cb.is_ejected(a)
+    with mock.patch('ai.backend.client.load_balancing.time.monotonic', return_value=135.0):
+        assert not cb.is_ejected(a)
+    cb.record_success(a)
+    # The reinstated endpoint is not ejected again by a stale probe.
+    cb.record_probe_failure(a)
+    assert cb.ejected_endpoints == []
@@ -0,0 +1,217 @@
+import asyncio
+import re
+from unittest import mock
+
+import pytest
+
+from ai.backend.client.config import API_VERSION
+from ai.backend.client.output.fields import user_fields
+from ai.backend.client.pagination import export_paginated_results, iter_paginated_results
+from ai.backend.client.session import AsyncSession
+from ai.backend.client.test_utils import AsyncMock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def api_version():
+    mock_nego_func = AsyncMock()
+    mock_nego_func.return_value = API_VERSION
+    with mock.patch('ai.backend.client.session._negotiate_api_version', mock_nego_func):
+        yield
+
+
+def _make_query_func(total_count, requested_offsets, in_flight):
+
+    async def _query(query, variables):
+        offset, limit = variables['offset'], variables['limit']
+        requested_offsets.append(offset)
+        in_flight.add(offset)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            in_flight.discard(offset)
+        return {'user_list': {
+            'items': [{'email': f'user{i}'} for i in range(offset, min(offset + limit, total_count))],
+            'total_count': total_count,
+        }}
+
+    return _query
+
+
+@pytest.mark.asyncio
+async def test_iter_paginated_results():
+    requested_offsets = []
+    in_flight = set()
+    variables = {
+        'filter': (None, 'String'),
+        'order': (None, 'String'),
+    }
+    async with AsyncSession() as session:
+        query_func = _make_query_func(250, requested_offsets, in_flight)
+        with mock.patch.object(session.Admin, '_query', query_func):
+            items = []
+            async for item in iter_paginated_results(
+                'user_list', dict(variables), [user_fields['email']],
+                page_size=100, prefetch=2,
+            ):
+                if len(items) == 0:
+                    # The following pages are being fetched while consuming the first page.
+                    await asyncio.sleep(0)
+                    assert in_flight == {100, 200}
+                items.append(item['email'])
+            assert items == [f'user{i}' for i in range(250)]
+            assert requested_offsets == [0, 100, 200]
+
+            # Stopping the iteration cancels the prefetching pages.
+            requested_offsets.clear()
+            agen = iter_paginated_results(
+                'user_list', dict(variables), [user_fields['email']],
+                page_offset=50, page_size=50, prefetch=1,
+            )
+            assert (await agen.__anext__())['email'] == 'user50'
+            await asyncio.sleep(0)
+            assert in_flight == {100}
+            await agen.aclose()
+            assert requested_offsets == [50, 100]
+            assert not in_flight
+
+            with pytest.raises(ValueError):
+                async for item in iter_paginated_results(
+                    'user_list', dict(variables), [user_fields['email']], page_size=101,
+                ):
+                    pass
+
+
+@pytest.mark.asyncio
+async def test_export_paginated_results():
+    requested_offsets = []
+    in_flight = set()
+    max_in_flight = 0
+    variables = {
+        'filter': (None, 'String'),
+        'order': (None, 'String'),
+    }
+    written = []
+
+    async def _write(items):
+        nonlocal max_in_flight
+        await asyncio.sleep(0)
+        max_in_flight = max(max_in_flight, len(in_flight))
+        written.append([item['email'] for item in items])
+
+    async with AsyncSession() as session:
+        query_func = _make_query_func(1050, requested_offsets, in_flight)
+        with mock.patch.object(session.Admin, '_query', query_func):
+            count = await export_paginated_results(
+                'user_list', dict(variables), [user_fields['email']], _write,
+                page_size=100, concurrency=4,
+            )
+    assert count == 1050
+    assert sorted(requested_offsets) == [*range(0, 1050, 100)]
+    # The pages are written in order while the following pages are fetched concurrently.
+    assert [item for page in written for item in page] == [f'user{i}' for i in range(1050)]
+    assert len(written) == 11
+    assert max_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_keyset_paginated_list():
+    users = [
+        {'email': f'user{i}', 'created_at': f'2021-01-{i // 2 + 1:02d}T00:00:00', 'uuid': f'id-{i:02d}'}
+        for i in range(7)
+    ]
+    queries = []
+
+    async def _query(query, variables):
+        queries.append((query, dict(variables)))
+        # Emulate the keyset filter on the server side.
+        items = users
+        _, sep, keyset_filter = variables['filter'].partition(' & (')
+        if sep:
+            last_created_at, _, last_uuid = re.findall(r'"([^"]*)"', keyset_filter)
+            items = [
+                u for u in users
+                if (u['created_at'], u['uuid']) > (last_created_at, last_uuid)
+            ]
+        return {'user_list': {
+            'items': items[:variables['limit']],
+            'total_count': len(items),
+        }}
+
+    async with AsyncSession() as session:
+        with mock.patch.object(session.Admin, '_query', _query):
+            emails = []
+            cursor = None
+            while True:
+                result = await session.User.paginated_list(
+                    fields=[user_fields['email']],
+                    page_size=3,
+                    filter='status == "active"',
+                    order='+created_at,+uuid',
+                    keyset=True,
+                    cursor=cursor,
+                )
+                emails.extend(item['email'] for item in result.items)
+                cursor = result.next_cursor
+                if cursor is None:
+                    break
+    assert emails == [f'user{i}' for i in range(7)]
+    assert len(queries) == 3
+    # The sort keys are queried together to build the next cursor.
+    assert 'items { email created_at uuid }' in queries[0][0]
+    assert queries[0][1]['offset'] == 0
+    assert queries[0][1]['filter'] == 'status == "active"'
+    assert queries[1][1]['offset'] == 0
+    assert queries[1][1]['filter'] == (
+        '(status == "active") & ((created_at > "2021-01-02T00:00:00") | '
+        '(created_at == "2021-01-02T00:00:00" & uuid > "id-02"))'
+    )
+
+    # The unique key is appended to the non-unique sort key as the tiebreaker.
+    queries.clear()
+    async with AsyncSession() as session:
+        with mock.patch.object(session.Admin, '_query', _query):
+            emails = []
+            cursor = None
+            while True:
+                result = await session.User.paginated_list(
+                    fields=[user_fields['email']],
+                    page_size=3,
+                    filter='status == "active"',
+                    order='+created_at',
+                    keyset=True,
+                    cursor=cursor,
+                )
+                emails.extend(item['email'] for item in result.items)
+                cursor = result.next_cursor
+                if cursor is None:
+                    break
+    assert emails == [f'user{i}' for i in range(7)]
+    assert queries[0][1]['order'] == '+created_at,+uuid'
+    assert 'items { email created_at uuid }' in queries[0][0]
+
+    async with AsyncSession() as session:
+        users[2]['created_at'] = None
+        with mock.patch.object(session.Admin, '_query', _query):
+            result = await session.User.paginated_list(
+                fields=[user_fields['email']],
+                page_size=3,
+                filter='status == "active"',
+                order='+created_at,+uuid',
+                keyset=True,
+            )
+            # The null values cannot be compared to continue the pagination.
+            with pytest.raises(ValueError):
+                await session.User.paginated_list(
+                    fields=[user_fields['email']],
+                    page_size=3,
+                    filter='status == "active"',
+                    order='+created_at,+uuid',
+                    keyset=True,
+                    cursor=result.next_cursor,
+                )
+
+    async with AsyncSession() as session:
+        with pytest.raises(ValueError):
+            await session.User.paginated_list(keyset=True)
+        with pytest.raises(ValueError):
+            await session.User.paginated_list(order='+uuid', cursor='invalid')
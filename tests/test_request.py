@@ -1,4 +1,5 @@
 import asyncio
+from collections import OrderedDict
 import io
 import json
 from unittest import mock
@@ -7,8 +8,10 @@ import aiohttp
 from aioresponses import aioresponses
 import pytest
 
-from ai.backend.client.config import get_config, API_VERSION
+from ai.backend.client.codec import StdlibJSONCodec
+from ai.backend.client.config import APIConfig, get_config, API_VERSION
 from ai.backend.client.exceptions import BackendClientError, BackendAPIError
+from ai.backend.client.load_balancing import LowestLatencyLoadBalancer
 from ai.backend.client.request import Request, Response, AttachedFile
 from ai.backend.client.session import Session, AsyncSession
 from ai.backend.client.test_utils import AsyncMock
@@ -156,6 +159,48 @@ async def test_fetch(dummy_endpoint):
             assert resp.content_length == len(body)
 
 
+@pytest.mark.asyncio
+async def test_fetch_json_with_codec(dummy_endpoint):
+    config = get_config()
+    body = b'{"b": {"y": 1}, "a": 2}'
+    with aioresponses() as m:
+        m.post(
+            dummy_endpoint + 'function', status=200, body=body,
+            headers={'Content-Type': 'application/json'},
+            repeat=True,
+        )
+        async with AsyncSession(config=config):
+            rqst = Request('POST', 'function')
+            rqst.set_json({'x': 1})
+            assert rqst.content == config.json_codec.dumps({'x': 1})
+            async with rqst.fetch() as resp:
+                result = await resp.json()
+                assert isinstance(result, OrderedDict)
+                assert isinstance(result['b'], OrderedDict)
+                result = await resp.json(ordered=False)
+                assert type(result) is dict
+                assert type(result['b']) is dict
+                assert result == {'b': {'y': 1}, 'a': 2}
+                result = await resp.json(loads=json.loads)
+                assert isinstance(result, OrderedDict)
+
+        config = APIConfig(
+            endpoint=config.endpoint,
+            access_key=config.access_key,
+            secret_key=config.secret_key,
+            json_codec='stdlib',
+            json_ordered_dict=False,
+        )
+        assert isinstance(config.json_codec, StdlibJSONCodec)
+        async with AsyncSession(config=config):
+            rqst = Request('POST', 'function')
+            async with rqst.fetch() as resp:
+                result = await resp.json()
+                assert type(result) is dict
+                result = await resp.json(ordered=True)
+                assert isinstance(result, OrderedDict)
+
+
 @pytest.mark.asyncio
 async def test_streaming_fetch(dummy_endpoint):
     # Read content by chunks.
@@ -199,6 +244,42 @@ async def test_invalid_requests(dummy_endpoint):
             assert e.data['title'] == 'Kernel Not Found'
 
 
+@pytest.mark.asyncio
+async def test_api_version_mismatch_refreshes_version(dummy_endpoint):
+    mock_refresh = AsyncMock()
+    with aioresponses() as m, \
+         mock.patch('ai.backend.client.request._refresh_api_version', mock_refresh):
+        async with AsyncSession():
+            body = json.dumps({
+                'type': 'https://api.backend.ai/probs/generic-bad-request',
+                'title': 'Bad request.',
+                'msg': 'Unsupported API major version.',
+            }).encode('utf8')
+            m.post(dummy_endpoint + 'function', status=400, body=body)
+            rqst = Request('POST', 'function')
+            with pytest.raises(BackendAPIError):
+                async with rqst.fetch():
+                    pass
+            assert mock_refresh.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_session_connector_config(defconfig):
+    config = APIConfig(
+        endpoint=str(defconfig.endpoint),
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        connection_pool_size=7,
+        connection_pool_size_per_host=3,
+        dns_cache_ttl=0,
+    )
+    async with AsyncSession(config=config) as session:
+        connector = session.aiohttp_session.connector
+        assert connector.limit == 7
+        assert connector.limit_per_host == 3
+        assert not connector.use_dns_cache
+
+
 @pytest.mark.asyncio
 async def test_fetch_invalid_method_async():
     async with AsyncSession():
@@ -220,6 +301,98 @@ async def test_fetch_client_error_async(dummy_endpoint):
                     pass
 
 
+@pytest.mark.asyncio
+async def test_fetch_records_endpoint_latency_async(defconfig):
+    lb = LowestLatencyLoadBalancer()
+    config = APIConfig(
+        endpoint='http://127.0.0.1:8081,http://127.0.0.2:8081',
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        load_balancer=lb,
+    )
+    bad_endpoint, good_endpoint = config.endpoints
+    with aioresponses() as m:
+        async with AsyncSession(config=config):
+            m.post(str(bad_endpoint) + '/function',
+                   exception=aiohttp.ClientConnectionError())
+            m.post(str(good_endpoint) + '/function', status=200, body=b'ok')
+            rqst = Request('POST', '/function')
+            async with rqst.fetch() as resp:
+                assert await resp.text() == 'ok'
+    assert not lb.stats[bad_endpoint].healthy
+    assert lb.stats[good_endpoint].count == 1
+    assert config.endpoint == good_endpoint
+
+
+@pytest.mark.asyncio
+async def test_ejected_endpoint_is_reinstated_by_probe_async(defconfig):
+    config = APIConfig(
+        endpoint='http://127.0.0.1:8081,http://127.0.0.2:8081',
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        endpoint_failure_threshold=1,
+    )
+    bad_endpoint, good_endpoint = config.endpoints
+    assert config.circuit_breaker is not None
+    config.circuit_breaker.probe_interval = 0.01
+    with aioresponses() as m:
+        async with AsyncSession(config=config):
+            m.post(str(bad_endpoint) + '/function',
+                   exception=aiohttp.ClientConnectionError())
+            m.post(str(good_endpoint) + '/function', status=200, body=b'ok')
+            rqst = Request('POST', '/function')
+            async with rqst.fetch():
+                pass
+            assert config.circuit_breaker.is_ejected(bad_endpoint)
+            assert config.endpoint == good_endpoint
+            m.get(str(bad_endpoint), status=200, payload={'version': 'v6.20220315'})
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if not config.circuit_breaker.ejected_endpoints:
+                    break
+            assert not config.circuit_breaker.is_ejected(bad_endpoint)
+
+
+@pytest.mark.asyncio
+async def test_reinstated_endpoint_gets_requests_again_async(defconfig):
+    lb = LowestLatencyLoadBalancer(explore_interval=0)
+    config = APIConfig(
+        endpoint='http://127.0.0.1:8081,http://127.0.0.2:8081',
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        load_balancer=lb,
+        endpoint_failure_threshold=1,
+    )
+    bad_endpoint, good_endpoint = config.endpoints
+    assert config.circuit_breaker is not None
+    config.circuit_breaker.probe_interval = 0.01
+    with aioresponses() as m:
+        async with AsyncSession(config=config):
+            m.post(str(bad_endpoint) + '/function',
+                   exception=aiohttp.ClientConnectionError())
+            m.post(str(good_endpoint) + '/function', status=200, body=b'good', repeat=True)
+            rqst = Request('POST', '/function')
+            async with rqst.fetch():
+                pass
+            assert not lb.stats[bad_endpoint].healthy
+            m.get(str(bad_endpoint), status=200, payload={'version': 'v6.20220315'})
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if not config.circuit_breaker.ejected_endpoints:
+                    break
+            assert lb.stats[bad_endpoint].healthy
+            # The good endpoint has become overloaded in the meantime.
+            lb.record_latency(good_endpoint, 10.0)
+            m.post(str(bad_endpoint) + '/function', status=200, body=b'recovered')
+            responses = []
+            for _ in range(2):
+                rqst = Request('POST', '/function')
+                async with rqst.fetch() as resp:
+                    responses.append(await resp.text())
+            # The endpoints are reordered after each request.
+            assert responses == ['good', 'recovered']
+
+
 @pytest.mark.xfail
 @pytest.mark.asyncio
 async def test_fetch_cancellation_async(dummy_endpoint):
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import os
+import secrets
+import time
+
+from aiohttp import web
+import aiohttp
+import pytest
+
+from ai.backend.client.transfer import (
+    BandwidthLimiter,
+    FileRangePayload,
+    MmapFileReader,
+    SyncManifest,
+    SyncManifestEntry,
+    TransferOrder,
+    TransferScheduler,
+    hash_file,
+)
+
+
+@pytest.mark.asyncio
+async def test_bandwidth_limiter():
+    limiter = BandwidthLimiter(10000)
+    started_at = time.monotonic()
+    # A burst of up to one second worth of bytes is allowed.
+    await limiter.consume(10000)
+    assert time.monotonic() - started_at < 0.1
+    await limiter.consume(2000)
+    assert time.monotonic() - started_at >= 0.15
+    with pytest.raises(ValueError):
+        BandwidthLimiter(0)
+
+
+def test_transfer_scheduler_sort():
+    sizes = {'a': 30, 'b': 10, 'c': None, 'd': 20, 'e': 10}
+    scheduler = TransferScheduler()
+    assert scheduler.sort([*sizes], sizes.get) == ['a', 'b', 'c', 'd', 'e']
+    scheduler = TransferScheduler(order=TransferOrder.SMALLEST_FIRST)
+    assert scheduler.sort([*sizes], sizes.get) == ['b', 'e', 'd', 'a', 'c']
+    scheduler = TransferScheduler(order='largest-first')
+    assert scheduler.sort([*sizes], sizes.get) == ['a', 'd', 'b', 'e', 'c']
+
+
+@pytest.mark.asyncio
+async def test_transfer_scheduler_run():
+    running = 0
+    max_running = 0
+    started = []
+
+    async def _transfer(item):
+        nonlocal running, max_running
+        started.append(item)
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    scheduler = TransferScheduler(3)
+    await scheduler.run(range(10), _transfer)
+    assert started == [*range(10)]
+    assert max_running == 3
+
+    with pytest.raises(ValueError):
+        TransferScheduler(0)
+
+
+@pytest.mark.asyncio
+async def test_transfer_scheduler_run_failure():
+    cancelled = []
+
+    async def _transfer(item):
+        if item == 1:
+            raise RuntimeError('failed')
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(item)
+            raise
+
+    scheduler = TransferScheduler(2)
+    with pytest.raises(RuntimeError):
+        await scheduler.run([0, 1, 2, 3], _transfer)
+    # The other ongoing transfer is cancelled and no more transfers are started.
+    assert cancelled == [0]
+
+
+def test_sync_manifest(tmp_path):
+    local_dir = tmp_path / 'data'
+    local_dir.mkdir()
+    (local_dir / 'a.txt').write_bytes(b'hello')
+    manifest = SyncManifest.for_target(tmp_path / 'cache', local_dir, 'vf', 'sub')
+    assert manifest.path != SyncManifest.for_target(tmp_path / 'cache', local_dir, 'vf', '.').path
+    manifest.load()  # not existing yet
+    assert manifest.entries == {}
+
+    stat = (local_dir / 'a.txt').stat()
+    digest = hash_file(local_dir / 'a.txt', chunk_size=2)
+    assert digest == hashlib.sha256(b'hello').hexdigest()
+    manifest.update('a.txt', SyncManifestEntry(
+        size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=digest, remote_size=5,
+    ))
+    manifest.save()
+    assert [*manifest.path.parent.iterdir()] == [manifest.path]
+
+    loaded = SyncManifest(manifest.path)
+    loaded.load()
+    assert loaded.entries == manifest.entries
+    assert loaded.is_unchanged('a.txt', stat)
+    assert not loaded.is_unchanged('b.txt', stat)
+    os.utime(local_dir / 'a.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert not loaded.is_unchanged('a.txt', (local_dir / 'a.txt').stat())
+
+    # A broken manifest is just ignored.
+    manifest.path.write_text('{"files": [')
+    loaded.load()
+    assert loaded.entries == {}
+
+
+def test_mmap_file_reader(tmp_path):
+    data = secrets.token_bytes(1000)
+    (tmp_path / 'a.bin').write_bytes(data)
+    with MmapFileReader(tmp_path / 'a.bin') as reader:
+        assert reader.size == 1000
+        with reader.read(300) as chunk:
+            assert isinstance(chunk, memoryview)
+            assert chunk == data[:300]
+        assert reader.tell() == 300
+        reader.seek(-100, os.SEEK_END)
+        with reader.read() as chunk:
+            assert chunk == data[900:]
+        with reader.read(10) as chunk:
+            assert len(chunk) == 0
+        with reader.view(990, 100) as chunk:
+            assert chunk == data[990:]
+    assert reader.closed
+
+    (tmp_path / 'empty.bin').write_bytes(b'')
+    with MmapFileReader(tmp_path / 'empty.bin') as reader:
+        assert reader.size == 0
+        assert reader.read() == b''
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('use_sendfile', [True, False])
+async def test_file_range_payload(tmp_path, use_sendfile):
+    data = secrets.token_bytes(1024 * 1024 + 100)
+    (tmp_path / 'a.bin').write_bytes(data)
+    received = []
+
+    async def handler(request):
+        received.append(await request.read())
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_route('PATCH', '/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        async with aiohttp.ClientSession() as client:
+            with MmapFileReader(tmp_path / 'a.bin') as reader:
+                for offset in range(0, len(data), 512 * 1024):
+                    payload = FileRangePayload(
+                        reader, offset, 512 * 1024, use_sendfile=use_sendfile,
+                    )
+                    assert payload.size == min(512 * 1024, len(data) - offset)
+                    async with client.patch(f'http://127.0.0.1:{port}/', data=payload) as resp:
+                        assert resp.status == 204
+    finally:
+        await runner.cleanup()
+    assert b''.join(received) == data
+    assert [len(chunk) for chunk in received] == [512 * 1024, 512 * 1024, 100]
+
+
+class _PlainTransport(asyncio.WriteTransport):
+
+    def is_closing(self):
+        return False
+
+
+class _BufferedWriter:
+
+    def __init__(self):
+        self.transport = _PlainTransport()
+        self.chunks = []
+
+    async def write(self, chunk):
+        self.chunks.append(bytes(chunk))
+
+
+@pytest.mark.asyncio
+async def test_file_range_payload_sendfile_unsupported(tmp_path):
+    data = secrets.token_bytes(1000)
+    (tmp_path / 'a.bin').write_bytes(data)
+    writer = _BufferedWriter()
+    with MmapFileReader(tmp_path / 'a.bin') as reader:
+        # The transport does not support sendfile(), so the slices are written instead.
+        await FileRangePayload(reader, 100, 500).write(writer)
+    assert b''.join(writer.chunks) == data[100:600]
+
+
+class _ClosingTransport(_PlainTransport):
+    _sendfile_compatible = asyncio.constants._SendfileMode.TRY_NATIVE
+
+    def is_closing(self):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_file_range_payload_sendfile_closing(tmp_path):
+    (tmp_path / 'a.bin').write_bytes(secrets.token_bytes(1000))
+    writer = _BufferedWriter()
+    writer.transport = _ClosingTransport()
+    with MmapFileReader(tmp_path / 'a.bin') as reader:
+        # The errors of the transport are not hidden by falling back to the plain writes.
+        with pytest.raises(RuntimeError):
+            await FileRangePayload(reader, 0, 1000).write(writer)
+    assert writer.chunks == []
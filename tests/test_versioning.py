@@ -0,0 +1,83 @@
+from unittest import mock
+
+import aiohttp
+from aioresponses import aioresponses
+import pytest
+from yarl import URL
+
+from ai.backend.client.config import APIConfig
+from ai.backend.client.session import _negotiate_api_version
+from ai.backend.client.versioning import APIVersionCache
+
+
+@pytest.fixture
+def version_cache(tmp_path):
+    cache = APIVersionCache(tmp_path / 'api-versions.json')
+    with mock.patch('ai.backend.client.session._get_api_version_cache', return_value=cache):
+        yield cache
+
+
+def test_api_version_cache(tmp_path):
+    cache = APIVersionCache(tmp_path / 'cache' / 'api-versions.json')
+    endpoint = URL('http://127.0.0.1:8081')
+    assert cache.get(endpoint) is None
+    cache.update(endpoint, 'v6.20220315', '"abc"')
+    entry = cache.get(endpoint)
+    assert entry is not None
+    assert entry.version == 'v6.20220315'
+    assert entry.etag == '"abc"'
+    assert entry.is_fresh(60)
+    assert not entry.is_fresh(0)
+    cache.invalidate(endpoint)
+    assert cache.get(endpoint) is None
+
+
+def test_api_version_cache_ignores_broken_file(tmp_path):
+    path = tmp_path / 'api-versions.json'
+    path.write_text('{broken')
+    cache = APIVersionCache(path)
+    assert cache.get(URL('http://127.0.0.1:8081')) is None
+    cache.update(URL('http://127.0.0.1:8081'), 'v6.20220315')
+    assert cache.get(URL('http://127.0.0.1:8081')) is not None
+
+
+@pytest.mark.asyncio
+async def test_negotiate_api_version_with_cache(defconfig, version_cache):
+    config = APIConfig(
+        endpoint=str(defconfig.endpoint),
+        version='v6.20220315',
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+    )
+    with aioresponses() as m:
+        async with aiohttp.ClientSession() as http_session:
+            m.get(str(config.endpoint), status=200,
+                  payload={'version': 'v6.20210815'}, headers={'ETag': '"v1"'})
+            assert await _negotiate_api_version(http_session, config) == (6, '20210815')
+            assert version_cache.get(config.endpoint).etag == '"v1"'
+            # A fresh cache entry is used without making requests.
+            assert await _negotiate_api_version(http_session, config) == (6, '20210815')
+            assert len(m.requests) == 1
+
+            # A stale cache entry is revalidated with its ETag.
+            config._api_version_cache_ttl = 0.000001
+            m.get(str(config.endpoint), status=304)
+            assert await _negotiate_api_version(http_session, config) == (6, '20210815')
+            (_, _), calls = next(iter(m.requests.items()))
+            assert calls[-1].kwargs['headers']['If-None-Match'] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_negotiate_api_version_without_cache(defconfig, version_cache):
+    config = APIConfig(
+        endpoint=str(defconfig.endpoint),
+        version='v6.20220315',
+        access_key=defconfig.access_key,
+        secret_key=defconfig.secret_key,
+        api_version_cache_ttl=0,
+    )
+    with aioresponses() as m:
+        async with aiohttp.ClientSession() as http_session:
+            m.get(str(config.endpoint), status=200, payload={'version': 'v6.20210815'})
+            assert await _negotiate_api_version(http_session, config) == (6, '20210815')
+    assert version_cache.get(config.endpoint) is None
@@ -1,17 +1,22 @@
+import base64
+import hashlib
+import json
+import re
 from pathlib import Path
 from unittest import mock
 
 import secrets
+import aiohttp
 import pytest
-from aioresponses import aioresponses
+from aioresponses import aioresponses, CallbackResult
+from yarl import URL
 
 from ai.backend.client.config import API_VERSION
-from ai.backend.client.session import AsyncSession
+from ai.backend.client.exceptions import BackendClientError
+from ai.backend.client.session import AsyncSession, api_session
 from ai.backend.client.request import Request, Response
 from ai.backend.client.test_utils import AsyncMock
 
-from aiotusclient import client
-
 
 def build_url(config, path: str):
     base_url = config.endpoint.path.rstrip('/')
@@ -21,6 +26,22 @@ def build_url(config, path: str):
     return canonical_url
 
 
+class _BufferWriter:
+    transport = None
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    async def write(self, chunk):
+        self.buffer += chunk
+
+
+async def _read_payload(payload) -> bytes:
+    writer = _BufferWriter()
+    await payload.write(writer)
+    return bytes(writer.buffer)
+
+
 @pytest.fixture(scope='module', autouse=True)
 def api_version():
     mock_nego_func = AsyncMock()
@@ -71,50 +92,31 @@ async def test_tus_upload(tmp_path: Path):
     vfolder_name = 'fake-vfolder-name'
     with aioresponses() as m:
 
-        tus_client = client.TusClient()
-        input_file = open(basedir, "rb")
-        print(f"Uploading {basedir} ...")
-        # TODO: refactor out the progress bar
-        token = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9pwd.\
-            eyJwYXRoIjoiaHR0cDoxMjcuMC4wLjEvZm9sZGVycy9mYWtlLXZmb2xkZXItbmFtZS9yZXF1ZXN0LXVwbG9hZCIsInNpemUiOjEwMjR9.\
-                5IXk0xdrr6aPzVjud4cdfcXWch7Bq-m7SlFhnUv8XL8"
-
-        storage_proxy_payload = {'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers':
-        'Tus-Resumable, Upload-Length, Upload-Metadata, Upload-Offset, Content-Type',
-        'Access-Control-Expose-Headers':
-        'Tus-Resumable, Upload-Length, Upload-Metadata, Upload-Offset, Content-Type',
-        'Access-Control-Allow-Methods': '*',
-        'Cache-Control': 'no-store',
-        'Tus-Resumable': '1.0.0',
-        'Upload-Offset': '1024',
-        'Upload-Length': '1024',
-        'Content-Length': '0',
-        'Content-Type': 'application/octet-stream',
-        'Date': 'Thu, 10 Sep 2020 05:52:12 GMT',
-        'Server': 'Python/3.8 aiohttp/3.6.2'}
-
-        upload_url = 'http://127.0.0.1:6021/upload?token={}'.format(token)
-        m.head('http://127.0.0.1:6021/folders/{}/upload?token={}'.format(vfolder_name, token),
-               status=200)
-        m.patch('http://127.0.0.1:6021/upload?token={}'.format(token),
-                payload=storage_proxy_payload, status=204,
-                headers={'upload-offset': '1024',
-                         'Content-Type': 'application/offset+octet-stream',
-                         'Tus-Resumable': '1.0.0'})
-
-        uploader = tus_client.async_uploader(
-            file_stream=input_file,
-            url=upload_url,
-            upload_checksum=False,
-            chunk_size=1024,
-            retries=1, retry_delay=1)
-
-        res = await uploader.upload()
-        if res is None:
-            assert True
-        else:
-            assert False
+        async with AsyncSession() as session:
+            token = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9pwd.\
+                eyJwYXRoIjoiaHR0cDoxMjcuMC4wLjEvZm9sZGVycy9mYWtlLXZmb2xkZXItbmFtZS9yZXF1ZXN0LXVwbG9hZCIsInNpemUiOjEwMjR9.\
+                    5IXk0xdrr6aPzVjud4cdfcXWch7Bq-m7SlFhnUv8XL8"
+            upload_url = 'http://127.0.0.1:6021/upload'
+            patches = []
+
+            def _upload(url, **kwargs):
+                patches.append(kwargs['headers'])
+                return CallbackResult(status=204, headers={
+                    'upload-offset': '1024',
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Tus-Resumable': '1.0.0',
+                })
+
+            m.post(build_url(session.config, '/folders/{}/request-upload'.format(vfolder_name)),
+                   payload={'token': token, 'url': upload_url}, status=200)
+            m.patch('{}?token={}'.format(upload_url, token), callback=_upload)
+
+            await session.VFolder(vfolder_name).upload(
+                ['example.bin'], basedir=tmp_path, chunk_size=1024,
+            )
+            assert len(patches) == 1
+            assert patches[0]['Tus-Resumable'] == '1.0.0'
+            assert patches[0]['Upload-Offset'] == '0'
 
 
 @pytest.mark.asyncio
@@ -152,6 +154,678 @@ async def test_vfolder_download(mocker):
 
             # 2. Client to Manager through TusClient. Upload url
             m.get(storage_path + "?token={}".format(payload['token']),
-                  headers={'Content-Length': '527'}, status=200)
+                  body=b'x' * 527, headers={'Content-Length': '527'}, status=200)
             await session.VFolder(vfolder_name).download([mock_file])
             assert Path("fake-file1").exists() == 1
+
+
+def _mock_request_download(m, config, vfolder_name, storage_path, token):
+    m.post(build_url(config, '/folders/{}/request-download'.format(vfolder_name)),
+           payload={'token': token, 'url': storage_path},
+           status=200, repeat=True)
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_resume(tmp_path):
+    data = secrets.token_bytes(1000)
+    (tmp_path / 'fake-file2.partial').write_bytes(data[:300])
+    (tmp_path / 'fake-file2.partial.resume').write_text(json.dumps({'validator': '"v1"', 'size': 1000}))
+    requests = []
+
+    def _respond(url, **kwargs):
+        requests.append((kwargs['headers'].get('Range'), kwargs['headers'].get('If-Range')))
+        return CallbackResult(
+            status=206, body=data[300:],
+            headers={'Content-Length': '700', 'Content-Range': 'bytes 300-999/1000', 'ETag': '"v1"'},
+        )
+
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            storage_path = 'http://127.0.0.1:6021/download'
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', callback=_respond)
+            await session.VFolder('fake-vfolder-name').download(['fake-file2'], basedir=tmp_path)
+
+    assert requests == [('bytes=300-', '"v1"')]
+    assert (tmp_path / 'fake-file2').read_bytes() == data
+    assert not (tmp_path / 'fake-file2.partial').exists()
+    assert not (tmp_path / 'fake-file2.partial.resume').exists()
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_resume_stale(tmp_path):
+    data = secrets.token_bytes(1000)
+    storage_path = 'http://127.0.0.1:6021/download'
+
+    # The file has been modified, so the server sends the whole file.
+    (tmp_path / 'fake-file2.partial').write_bytes(b'x' * 300)
+    (tmp_path / 'fake-file2.partial.resume').write_text(json.dumps({'validator': '"v1"', 'size': 1000}))
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', status=200, body=data,
+                  headers={'Content-Length': '1000', 'ETag': '"v2"'})
+            await session.VFolder('fake-vfolder-name').download(['fake-file2'], basedir=tmp_path)
+    assert (tmp_path / 'fake-file2').read_bytes() == data
+
+    # The total size of the file has changed though the validator matches.
+    requests = []
+
+    def _respond(url, **kwargs):
+        range_hdr = kwargs['headers'].get('Range')
+        requests.append(range_hdr)
+        if range_hdr is None:
+            return CallbackResult(status=200, body=data, headers={'Content-Length': '1000'})
+        return CallbackResult(
+            status=206, body=data[300:],
+            headers={'Content-Length': '700', 'Content-Range': 'bytes 300-999/1000'},
+        )
+
+    (tmp_path / 'fake-file3.partial').write_bytes(b'x' * 300)
+    (tmp_path / 'fake-file3.partial.resume').write_text(json.dumps({'validator': '"v1"', 'size': 2000}))
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', callback=_respond, repeat=True)
+            await session.VFolder('fake-vfolder-name').download(['fake-file3'], basedir=tmp_path)
+    assert requests == ['bytes=300-', None]
+    assert (tmp_path / 'fake-file3').read_bytes() == data
+
+    # A partial file without the validator is not resumed.
+    requests.clear()
+    (tmp_path / 'fake-file4.partial').write_bytes(b'x' * 300)
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', callback=_respond, repeat=True)
+            await session.VFolder('fake-vfolder-name').download(['fake-file4'], basedir=tmp_path)
+    assert requests == [None]
+    assert (tmp_path / 'fake-file4').read_bytes() == data
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_retry(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._DOWNLOAD_RETRY_DELAY', 0)
+    data = secrets.token_bytes(1000)
+    requested_ranges = []
+
+    def _respond(url, **kwargs):
+        requested_ranges.append(kwargs['headers'].get('Range'))
+        if len(requested_ranges) == 1:
+            # The connection is dropped in the middle of the transfer.
+            return CallbackResult(status=200, body=data[:400], headers={
+                'Content-Length': '1000',
+                'Last-Modified': 'Mon, 14 Sep 2020 01:45:29 GMT',
+            })
+        assert kwargs['headers'].get('If-Range') == 'Mon, 14 Sep 2020 01:45:29 GMT'
+        return CallbackResult(
+            status=206, body=data[400:],
+            headers={'Content-Length': '600', 'Content-Range': 'bytes 400-999/1000'},
+        )
+
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            storage_path = 'http://127.0.0.1:6021/download'
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', exception=aiohttp.ClientConnectionError())
+            m.get(storage_path + '?token=tok', callback=_respond, repeat=True)
+            await session.VFolder('fake-vfolder-name').download(['fake-file3'], basedir=tmp_path)
+
+    assert requested_ranges == [None, 'bytes=400-']
+    assert (tmp_path / 'fake-file3').read_bytes() == data
+
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            # Non-retriable errors are raised immediately.
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', status=404)
+            with pytest.raises(aiohttp.ClientResponseError):
+                await session.VFolder('fake-vfolder-name').download(['fake-file4'], basedir=tmp_path)
+
+
+def _make_ranged_responder(data, requested_ranges, fail_once_at=None, etag='"v1"'):
+    failed = set()
+
+    def _respond(url, **kwargs):
+        range_hdr = kwargs['headers'].get('Range')
+        if_range = kwargs['headers'].get('If-Range')
+        requested_ranges.append(range_hdr)
+        if range_hdr is None or (if_range is not None and if_range != etag):
+            return CallbackResult(status=200, body=data, headers={
+                'Content-Length': str(len(data)),
+                'ETag': etag,
+            })
+        start, _, end = range_hdr[len('bytes='):].partition('-')
+        start = int(start)
+        end = int(end) if end else len(data) - 1
+        body = data[start:end + 1]
+        if start == fail_once_at and start not in failed:
+            # The connection is dropped in the middle of the transfer.
+            failed.add(start)
+            return CallbackResult(status=206, body=body[:10], headers={
+                'Content-Length': str(len(body)),
+                'Content-Range': f'bytes {start}-{end}/{len(data)}',
+                'ETag': etag,
+            })
+        return CallbackResult(status=206, body=body, headers={
+            'Content-Length': str(len(body)),
+            'Content-Range': f'bytes {start}-{end}/{len(data)}',
+            'ETag': etag,
+        })
+
+    return _respond
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_segmented(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._DOWNLOAD_RETRY_DELAY', 0)
+    mocker.patch('ai.backend.client.func.vfolder._MIN_SEGMENT_SIZE', 100)
+    data = secrets.token_bytes(1000)
+    requested_ranges = []
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            storage_path = 'http://127.0.0.1:6021/download'
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', repeat=True,
+                  callback=_make_ranged_responder(data, requested_ranges, fail_once_at=250))
+            await session.VFolder('fake-vfolder-name').download(
+                ['fake-file5'], basedir=tmp_path, segments=4,
+            )
+
+    assert requested_ranges[0] == 'bytes=0-0'
+    assert sorted(requested_ranges[1:]) == [
+        'bytes=0-249', 'bytes=250-499', 'bytes=260-499', 'bytes=500-749', 'bytes=750-999',
+    ]
+    assert (tmp_path / 'fake-file5').read_bytes() == data
+    assert not (tmp_path / 'fake-file5.partial').exists()
+    assert not (tmp_path / 'fake-file5.partial.segments').exists()
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_segmented_resume(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._MIN_SEGMENT_SIZE', 100)
+    data = secrets.token_bytes(1000)
+    partial = bytearray(1000)
+    partial[0:500] = data[0:500]
+    partial[500:600] = data[500:600]
+    (tmp_path / 'fake-file6.partial').write_bytes(partial)
+    (tmp_path / 'fake-file6.partial.segments').write_text(json.dumps({
+        'size': 1000,
+        'validator': '"v1"',
+        'segments': [[0, 500, 500], [500, 600, 1000]],
+    }))
+    requested_ranges = []
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            storage_path = 'http://127.0.0.1:6021/download'
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', repeat=True,
+                  callback=_make_ranged_responder(data, requested_ranges))
+            # The saved segments are continued even without the segments option.
+            await session.VFolder('fake-vfolder-name').download(['fake-file6'], basedir=tmp_path)
+
+    assert requested_ranges == ['bytes=0-0', 'bytes=600-999']
+    assert (tmp_path / 'fake-file6').read_bytes() == data
+    assert not (tmp_path / 'fake-file6.partial.segments').exists()
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_segmented_resume_stale(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._MIN_SEGMENT_SIZE', 100)
+    data = secrets.token_bytes(1000)
+    storage_path = 'http://127.0.0.1:6021/download'
+
+    # The file has been replaced with another one of the same size.
+    (tmp_path / 'fake-file6.partial').write_bytes(b'x' * 1000)
+    (tmp_path / 'fake-file6.partial.segments').write_text(json.dumps({
+        'size': 1000,
+        'validator': '"v1"',
+        'segments': [[0, 500, 500], [500, 600, 1000]],
+    }))
+    requested_ranges = []
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', repeat=True,
+                  callback=_make_ranged_responder(data, requested_ranges, etag='"v2"'))
+            await session.VFolder('fake-vfolder-name').download(
+                ['fake-file6'], basedir=tmp_path, segments=2,
+            )
+    assert sorted(requested_ranges[1:]) == ['bytes=0-499', 'bytes=500-999']
+    assert (tmp_path / 'fake-file6').read_bytes() == data
+
+    # The file is replaced during the download.
+    etags = iter(['"v1"', '"v2"', '"v2"'])
+
+    def _respond(url, **kwargs):
+        return _make_ranged_responder(data, [], etag=next(etags))(url, **kwargs)
+
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', repeat=True, callback=_respond)
+            with pytest.raises(BackendClientError):
+                await session.VFolder('fake-vfolder-name').download(
+                    ['fake-file7'], basedir=tmp_path, segments=2,
+                )
+    assert not (tmp_path / 'fake-file7').exists()
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_segmented_fallback(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._MIN_SEGMENT_SIZE', 100)
+    data = secrets.token_bytes(1000)
+    requested_ranges = []
+
+    def _respond(url, **kwargs):
+        # The storage proxy ignores range requests.
+        requested_ranges.append(kwargs['headers'].get('Range'))
+        return CallbackResult(status=200, body=data, headers={'Content-Length': '1000'})
+
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            storage_path = 'http://127.0.0.1:6021/download'
+            _mock_request_download(m, session.config, 'fake-vfolder-name', storage_path, 'tok')
+            m.get(storage_path + '?token=tok', repeat=True, callback=_respond)
+            await session.VFolder('fake-vfolder-name').download(
+                ['fake-file7'], basedir=tmp_path, segments=4,
+            )
+
+    assert requested_ranges == ['bytes=0-0', None]
+    assert (tmp_path / 'fake-file7').read_bytes() == data
+
+
+@pytest.mark.asyncio
+async def test_vfolder_download_multiple_files(tmp_path):
+    data = {
+        'a.bin': secrets.token_bytes(300),
+        'sub/b.bin': secrets.token_bytes(100),
+        'sub/c.bin': secrets.token_bytes(200),
+    }
+    requested = []
+
+    def _request_download(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        return CallbackResult(status=200, payload={
+            'token': path, 'url': 'http://127.0.0.1:6021/download',
+        })
+
+    def _download(url, **kwargs):
+        path = url.query['token']
+        requested.append(path)
+        return CallbackResult(status=200, body=data[path], headers={
+            'Content-Length': str(len(data[path])),
+        })
+
+    def _list_files(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        files = [
+            {'filename': Path(p).name, 'size': len(v)}
+            for p, v in data.items() if str(Path(p).parent) == path
+        ]
+        return CallbackResult(status=200, payload={'files': json.dumps(files)})
+
+    (tmp_path / 'sub').mkdir()
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            vfolder_name = 'fake-vfolder-name'
+            m.post(build_url(session.config, '/folders/{}/request-download'.format(vfolder_name)),
+                   callback=_request_download, repeat=True)
+            m.get(build_url(session.config, '/folders/{}/files'.format(vfolder_name)),
+                  callback=_list_files, repeat=True)
+            m.get(re.compile(r'^http://127\.0\.0\.1:6021/download\?token=.*$'),
+                  callback=_download, repeat=True)
+            await session.VFolder(vfolder_name).download(
+                [*data], basedir=tmp_path, jobs=2, order='smallest-first',
+            )
+
+    assert requested == ['sub/b.bin', 'sub/c.bin', 'a.bin']
+    for path, content in data.items():
+        assert (tmp_path / path).read_bytes() == content
+
+
+@pytest.mark.asyncio
+async def test_vfolder_upload_multiple_files(tmp_path):
+    data = {
+        'a.bin': secrets.token_bytes(300),
+        'b.bin': secrets.token_bytes(100),
+    }
+    for path, content in data.items():
+        (tmp_path / path).write_bytes(content)
+    uploaded = {}
+
+    def _request_upload(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        return CallbackResult(status=200, payload={
+            'token': path, 'url': 'http://127.0.0.1:6021/upload',
+        })
+
+    async def _upload(url, **kwargs):
+        path = url.query['token']
+        offset = int(kwargs['headers']['Upload-Offset'])
+        chunk = await _read_payload(kwargs['data'])
+        uploaded[path] = uploaded.get(path, b'') + chunk
+        return CallbackResult(status=204, headers={'upload-offset': str(offset + len(chunk))})
+
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            vfolder_name = 'fake-vfolder-name'
+            m.post(build_url(session.config, '/folders/{}/request-upload'.format(vfolder_name)),
+                   callback=_request_upload, repeat=True)
+            m.patch(re.compile(r'^http://127\.0\.0\.1:6021/upload\?token=.*$'),
+                    callback=_upload, repeat=True)
+            await session.VFolder(vfolder_name).upload(
+                [*data], basedir=tmp_path, chunk_size=64, jobs=2,
+            )
+
+    assert uploaded == data
+
+
+@pytest.mark.asyncio
+async def test_vfolder_sync(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder.local_cache_path', tmp_path / 'cache')
+    local_dir = tmp_path / 'data'
+    (local_dir / 'sub').mkdir(parents=True)
+    (local_dir / 'a.bin').write_bytes(secrets.token_bytes(100))
+    (local_dir / 'sub' / 'b.bin').write_bytes(secrets.token_bytes(200))
+    (local_dir / 'sub' / 'b.bin.partial').write_bytes(b'ignored')
+    # The remote files as {path: (content, mtime)}.
+    remote = {'dst/old.bin': (secrets.token_bytes(50), 1000.0)}
+    uploaded = {}
+    created_dirs = []
+
+    def _list_files(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        if path != 'dst' and path not in created_dirs:
+            return CallbackResult(status=200, payload={'error_msg': 'No such file'})
+        entries = {}
+        for p, (content, mtime) in remote.items():
+            if p.startswith(path + '/'):
+                name, _, rest = p[len(path) + 1:].partition('/')
+                entries[name] = {
+                    'filename': name,
+                    'size': len(content) if not rest else 4096,
+                    'mtime': mtime,
+                    'mode': '-rw-r--r--' if not rest else 'drwxr-xr-x',
+                }
+        for d in created_dirs:
+            if str(Path(d).parent) == path and Path(d).name not in entries:
+                entries[Path(d).name] = {
+                    'filename': Path(d).name, 'size': 4096, 'mtime': 0.0, 'mode': 'drwxr-xr-x',
+                }
+        return CallbackResult(status=200, payload={'files': json.dumps([*entries.values()])})
+
+    def _mkdir(url, **kwargs):
+        created_dirs.append(json.loads(kwargs['data'])['path'])
+        return CallbackResult(status=201, body='')
+
+    def _request_upload(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        return CallbackResult(status=200, payload={
+            'token': path, 'url': 'http://127.0.0.1:6021/upload',
+        })
+
+    async def _upload(url, **kwargs):
+        path = url.query['token']
+        offset = int(kwargs['headers']['Upload-Offset'])
+        chunk = await _read_payload(kwargs['data'])
+        uploaded[path] = uploaded.get(path, b'') + chunk
+        remote[path] = (uploaded[path], 2000.0)
+        return CallbackResult(status=204, headers={'upload-offset': str(offset + len(chunk))})
+
+    def _request_download(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        return CallbackResult(status=200, payload={
+            'token': path, 'url': 'http://127.0.0.1:6021/download',
+        })
+
+    def _download(url, **kwargs):
+        content = remote[url.query['token']][0]
+        return CallbackResult(status=200, body=content, headers={
+            'Content-Length': str(len(content)),
+        })
+
+    async def _sync(vfolder, **kwargs):
+        with aioresponses() as m:
+            config = api_session.get().config
+            m.get(build_url(config, '/folders/fake-vfolder-name/files'),
+                  callback=_list_files, repeat=True)
+            m.post(build_url(config, '/folders/fake-vfolder-name/mkdir'),
+                   callback=_mkdir, repeat=True)
+            m.post(build_url(config, '/folders/fake-vfolder-name/request-upload'),
+                   callback=_request_upload, repeat=True)
+            m.patch(re.compile(r'^http://127\.0\.0\.1:6021/upload\?token=.*$'),
+                    callback=_upload, repeat=True)
+            m.post(build_url(config, '/folders/fake-vfolder-name/request-download'),
+                   callback=_request_download, repeat=True)
+            m.get(re.compile(r'^http://127\.0\.0\.1:6021/download\?token=.*$'),
+                  callback=_download, repeat=True)
+            return await vfolder.sync(local_dir, 'dst', chunk_size=64, **kwargs)
+
+    async with AsyncSession() as session:
+        vfolder = session.VFolder('fake-vfolder-name')
+        result = await _sync(vfolder, dry_run=True)
+        assert result == {'transferred': ['a.bin', 'sub/b.bin'], 'skipped': []}
+        assert uploaded == {}
+
+        result = await _sync(vfolder, checksum=True)
+        assert result == {'transferred': ['a.bin', 'sub/b.bin'], 'skipped': []}
+        assert created_dirs == ['dst/sub']
+        assert uploaded['dst/a.bin'] == (local_dir / 'a.bin').read_bytes()
+        assert uploaded['dst/sub/b.bin'] == (local_dir / 'sub' / 'b.bin').read_bytes()
+
+        # Only the changed files are transferred.
+        uploaded.clear()
+        (local_dir / 'a.bin').touch()
+        (local_dir / 'sub' / 'b.bin').write_bytes(secrets.token_bytes(200))
+        result = await _sync(vfolder, checksum=True, jobs=2)
+        assert result == {'transferred': ['sub/b.bin'], 'skipped': ['a.bin']}
+        assert [*uploaded] == ['dst/sub/b.bin']
+
+        # Download the remote-only files and the remotely changed files.
+        remote['dst/a.bin'] = (secrets.token_bytes(120), 3000.0)
+        result = await _sync(vfolder, direction='download')
+        assert result == {'transferred': ['a.bin', 'old.bin'], 'skipped': ['sub/b.bin']}
+        assert (local_dir / 'old.bin').read_bytes() == remote['dst/old.bin'][0]
+        assert (local_dir / 'old.bin').stat().st_mtime == 1000.0
+        assert (local_dir / 'a.bin').read_bytes() == remote['dst/a.bin'][0]
+
+        result = await _sync(vfolder, direction='download')
+        assert result['transferred'] == []
+
+
+@pytest.mark.asyncio
+async def test_vfolder_stage_files(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder.local_cache_path', tmp_path / 'cache')
+    local_dir = tmp_path / 'data'
+    (local_dir / 'sub').mkdir(parents=True)
+    content = secrets.token_bytes(100)
+    (local_dir / 'a.txt').write_bytes(content)
+    (local_dir / 'b.txt').write_bytes(content)
+    (local_dir / 'sub' / 'c.bin').write_bytes(secrets.token_bytes(200))
+    (local_dir / 'empty').touch()
+    files = [local_dir / 'a.txt', local_dir / 'b.txt', local_dir / 'sub' / 'c.bin',
+             local_dir / 'empty']
+    remote = {}
+    created_dirs = []
+
+    def _list_files(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        if path not in created_dirs:
+            return CallbackResult(status=200, payload={'error_msg': 'No such file'})
+        entries = [
+            {'filename': p[len(path) + 1:], 'size': len(data), 'mtime': 0.0, 'mode': '-rw-r--r--'}
+            for p, data in remote.items() if str(Path(p).parent) == path
+        ]
+        entries += [
+            {'filename': Path(d).name, 'size': 4096, 'mtime': 0.0, 'mode': 'drwxr-xr-x'}
+            for d in created_dirs if str(Path(d).parent) == path
+        ]
+        return CallbackResult(status=200, payload={'files': json.dumps(entries)})
+
+    def _mkdir(url, **kwargs):
+        created_dirs.append(json.loads(kwargs['data'])['path'])
+        return CallbackResult(status=201, body='')
+
+    def _request_upload(url, **kwargs):
+        path = json.loads(kwargs['data'])['path']
+        return CallbackResult(status=200, payload={
+            'token': path, 'url': 'http://127.0.0.1:6021/upload',
+        })
+
+    async def _upload(url, **kwargs):
+        path = url.query['token']
+        offset = int(kwargs['headers']['Upload-Offset'])
+        chunk = await _read_payload(kwargs['data'])
+        remote[path] = remote.get(path, b'') + chunk
+        return CallbackResult(status=204, headers={'upload-offset': str(offset + len(chunk))})
+
+    async def _stage(vfolder):
+        with aioresponses() as m:
+            config = api_session.get().config
+            m.get(build_url(config, '/folders/fake-vfolder-name/files'),
+                  callback=_list_files, repeat=True)
+            m.post(build_url(config, '/folders/fake-vfolder-name/mkdir'),
+                   callback=_mkdir, repeat=True)
+            m.post(build_url(config, '/folders/fake-vfolder-name/request-upload'),
+                   callback=_request_upload, repeat=True)
+            m.patch(re.compile(r'^http://127\.0\.0\.1:6021/upload\?token=.*$'),
+                    callback=_upload, repeat=True)
+            return await vfolder.stage_files(files, basedir=local_dir, chunk_size=64)
+
+    async with AsyncSession() as session:
+        vfolder = session.VFolder('fake-vfolder-name')
+        script_path = await _stage(vfolder)
+        assert created_dirs == [
+            '.backend.ai-staging',
+            '.backend.ai-staging/objects',
+            '.backend.ai-staging/manifests',
+        ]
+        digest_a = hashlib.sha256(content).hexdigest()
+        digest_c = hashlib.sha256((local_dir / 'sub' / 'c.bin').read_bytes()).hexdigest()
+        # The identical contents are uploaded only once.
+        assert sorted(remote) == sorted([
+            f'.backend.ai-staging/objects/{digest_a}',
+            f'.backend.ai-staging/objects/{digest_c}',
+            script_path,
+        ])
+        assert script_path.startswith('.backend.ai-staging/manifests/')
+        script = remote[script_path].decode('utf-8')
+        assert f'cp "$staging_dir/objects/{digest_a}" a.txt' in script
+        assert f'cp "$staging_dir/objects/{digest_a}" b.txt' in script
+        assert 'mkdir -p sub' in script
+        assert f'cp "$staging_dir/objects/{digest_c}" sub/c.bin' in script
+        assert ': > empty' in script
+
+        # Nothing is uploaded again for the same set of files.
+        uploaded_before = dict(remote)
+        assert await _stage(vfolder) == script_path
+        assert remote == uploaded_before
+        assert len(created_dirs) == 3
+
+
+class _FakeTusServer:
+
+    def __init__(self, extensions, fail_at=None):
+        self.extensions = extensions
+        self.fail_at = fail_at
+        self.uploads = {}
+        self.patches = []
+        self.concatenated = None
+
+    def mock(self, m, config, vfolder_name):
+        m.post(build_url(config, '/folders/{}/request-upload'.format(vfolder_name)),
+               payload={'token': 'tok', 'url': 'http://127.0.0.1:6021/upload'}, repeat=True)
+        pattern = re.compile(r'^http://127\.0\.0\.1:6021/upload.*$')
+        m.options(pattern, callback=self._options, repeat=True)
+        m.head(pattern, callback=self._head, repeat=True)
+        m.patch(pattern, callback=self._patch, repeat=True)
+        m.post(pattern, callback=self._post, repeat=True)
+
+    def _options(self, url, **kwargs):
+        return CallbackResult(status=204, headers={
+            'Tus-Extension': ','.join(self.extensions),
+            'Tus-Checksum-Algorithm': 'md5,sha1',
+        })
+
+    def _head(self, url, **kwargs):
+        return CallbackResult(status=200, headers={
+            'Upload-Offset': str(len(self.uploads.get(url.path, b''))),
+        })
+
+    async def _patch(self, url, **kwargs):
+        headers = kwargs['headers']
+        offset = int(headers['Upload-Offset'])
+        chunk = await _read_payload(kwargs['data'])
+        self.patches.append((url.path, offset, headers.get('Upload-Checksum')))
+        if 'Upload-Checksum' in headers:
+            algorithm, _, digest = headers['Upload-Checksum'].partition(' ')
+            assert algorithm == 'sha1'
+            assert base64.b64decode(digest) == hashlib.sha1(chunk).digest()
+        data = self.uploads.get(url.path, b'')
+        assert offset == len(data)
+        if (url.path, offset) == self.fail_at:
+            # The connection is dropped after the half of the chunk is received.
+            self.uploads[url.path] = data + chunk[:len(chunk) // 2]
+            return CallbackResult(status=502, reason='Bad Gateway')
+        self.uploads[url.path] = data + chunk
+        return CallbackResult(status=204, headers={'Upload-Offset': str(offset + len(chunk))})
+
+    def _post(self, url, **kwargs):
+        concat = kwargs['headers']['Upload-Concat']
+        if concat == 'partial':
+            location = f'/upload/partial-{len(self.uploads)}'
+            self.uploads[location] = b''
+            return CallbackResult(status=201, headers={'Location': location})
+        assert concat.startswith('final;')
+        partial_urls = concat[len('final;'):].split(' ')
+        self.concatenated = b''.join(self.uploads[URL(u).path] for u in partial_urls)
+        return CallbackResult(status=201)
+
+
+@pytest.mark.asyncio
+async def test_vfolder_upload_resume_with_checksum(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._DOWNLOAD_RETRY_DELAY', 0)
+    data = secrets.token_bytes(300)
+    (tmp_path / 'a.bin').write_bytes(data)
+    server = _FakeTusServer(['checksum'], fail_at=('/upload', 64))
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            server.mock(m, session.config, 'fake-vfolder-name')
+            await session.VFolder('fake-vfolder-name').upload(
+                ['a.bin'], basedir=tmp_path, chunk_size=64, checksum=True,
+            )
+
+    assert server.uploads['/upload'] == data
+    # It continues from the offset reported by the storage proxy.
+    assert [offset for _, offset, _ in server.patches] == [0, 64, 96, 160, 224, 288]
+    assert all(checksum is not None for _, _, checksum in server.patches)
+
+
+@pytest.mark.asyncio
+async def test_vfolder_upload_segmented(tmp_path, mocker):
+    mocker.patch('ai.backend.client.func.vfolder._DOWNLOAD_RETRY_DELAY', 0)
+    mocker.patch('ai.backend.client.func.vfolder._MIN_SEGMENT_SIZE', 100)
+    data = secrets.token_bytes(1000)
+    (tmp_path / 'a.bin').write_bytes(data)
+    server = _FakeTusServer(['creation', 'concatenation'], fail_at=('/upload/partial-2', 128))
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            server.mock(m, session.config, 'fake-vfolder-name')
+            await session.VFolder('fake-vfolder-name').upload(
+                ['a.bin'], basedir=tmp_path, chunk_size=128, segments=4,
+            )
+
+    assert server.concatenated == data
+    assert [len(server.uploads[f'/upload/partial-{i}']) for i in range(4)] == [250] * 4
+    assert {path for path, _, _ in server.patches} == {f'/upload/partial-{i}' for i in range(4)}
+
+    # Without the concatenation extension, the file is uploaded as a whole.
+    server = _FakeTusServer(['creation'])
+    with aioresponses() as m:
+        async with AsyncSession() as session:
+            server.mock(m, session.config, 'fake-vfolder-name')
+            await session.VFolder('fake-vfolder-name').upload(
+                ['a.bin'], basedir=tmp_path, chunk_size=128, segments=4,
+            )
+    assert server.uploads == {'/upload': data}